@@ -0,0 +1,10 @@
+# @Filename: __init__.py
+#
+# Benchmark suite of the `reluctant_walks` package.
+#
+# The modules `bench_*.py` follow the conventions of airspeed velocity (asv):
+# classes with `params`/`param_names`, a `setup()` method, and `time_*` and
+# `peakmem_*` methods. They can be run either with asv (see `asv.conf.json` at
+# the root of the repository), or without any extra dependency with:
+#
+#     python -m benchmarks.run
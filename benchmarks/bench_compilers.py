@@ -0,0 +1,47 @@
+# @Filename: bench_compilers.py
+#
+# Grammar compilers: compilation of the equations for every model, and the
+# full `generate()` round-trip through the GenRGenS and Maple backends (or
+# their local stand-ins, see `benchmarks.common`).
+
+from reluctant_walks.compilers import BoltzOCWalkCompiler as _BoltzOCWalkCompiler
+from reluctant_walks.compilers import CombstructWalkCompiler as _CombstructWalkCompiler
+from reluctant_walks.compilers import GenRGenSWalkCompiler as _GenRGenSWalkCompiler
+from reluctant_walks.compilers import MapleWalkCompiler as _MapleWalkCompiler
+
+from benchmarks.common import MODEL_IDS, WALK_LENGTHS, GENERATE_COUNT
+from benchmarks.common import get_model, backend_compiler
+
+# ==============================================================================
+
+_COMPILERS = {
+    'boltzoc': _BoltzOCWalkCompiler,
+    'combstruct': _CombstructWalkCompiler,
+    'genrgens': _GenRGenSWalkCompiler,
+    'maple': _MapleWalkCompiler,
+}
+
+class CompileEquations(object):
+
+    params = (MODEL_IDS, sorted(_COMPILERS.keys()))
+    param_names = ['model', 'compiler']
+
+    def setup(self, model, compiler):
+        self.compiler = _COMPILERS[compiler](get_model(model))
+
+    def time_compile_equations(self, model, compiler):
+        self.compiler.compile_equations()
+
+class Generate(object):
+
+    params = (MODEL_IDS, ['genrgens', 'maple'], WALK_LENGTHS)
+    param_names = ['model', 'backend', 'size']
+
+    def setup(self, model, backend, size):
+        self.compiler = backend_compiler(backend)(get_model(model),
+                                                  retention="none")
+
+    def time_generate(self, model, backend, size):
+        self.compiler.generate(GENERATE_COUNT, size)
+
+    peakmem_generate = time_generate
@@ -0,0 +1,102 @@
+# @Filename: bench_counting.py
+#
+# Counting engines: the dense table of `tabulate_all_walks`, the table of the
+# recursive method, `naive_random_generation_precompute`, the exit-time
+# distribution of `exit_time_distribution`, the growth of an
+# `IncrementalCountTable` by one more size, and the endpoints of unconstrained
+# walks, `unconstrained_endpoints` (by FFT, on longer walks), and the walks
+# confined to a box, through the powers of its `TransferMatrix`.
+
+import warnings as _warnings
+
+from reluctant_walks import reference as _reference
+from reluctant_walks.counting import IncrementalCountTable as _IncrementalCountTable
+from reluctant_walks.counting import unconstrained_endpoints as _unconstrained_endpoints
+from reluctant_walks.transfer import TransferMatrix as _TransferMatrix
+
+from benchmarks.common import MODEL_IDS, COUNTING_LENGTHS, get_model
+
+# ==============================================================================
+
+class TabulateAllWalks(object):
+
+    params = (MODEL_IDS, COUNTING_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.stepset = get_model(model)
+
+    def time_tabulate_all_walks(self, model, length):
+        # The counts are `int64`, and overflow for the longest walks of the
+        # models with many steps: this is part of what is being measured.
+        with _warnings.catch_warnings():
+            _warnings.filterwarnings("ignore", "overflow encountered",
+                                     RuntimeWarning)
+            _reference.tabulate_all_walks(self.stepset, side=length+1,
+                                          N=length)
+
+    peakmem_tabulate_all_walks = time_tabulate_all_walks
+
+class RecursivePrecompute(object):
+
+    params = (MODEL_IDS, COUNTING_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.steps = list(get_model(model))
+
+    def time_naive_random_generation_precompute(self, model, length):
+        _reference.naive_random_generation_precompute(self.steps, length)
+
+    peakmem_naive_random_generation_precompute = \
+        time_naive_random_generation_precompute
+
+class ExitTimeDistribution(object):
+
+    params = (MODEL_IDS, COUNTING_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.stepset = get_model(model)
+
+    def time_exit_time_distribution(self, model, length):
+        _reference.exit_time_distribution(self.stepset, length)
+
+class IncrementalGrowth(object):
+
+    params = (MODEL_IDS, COUNTING_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.table = _IncrementalCountTable(get_model(model)).extend(length)
+
+    def time_extend_one(self, model, length):
+        self.table.extend(1)
+
+class UnconstrainedEndpoints(object):
+
+    params = (MODEL_IDS, [100, 1000])
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.stepset = get_model(model)
+
+    def time_unconstrained_endpoints(self, model, length):
+        _unconstrained_endpoints(self.stepset, length)
+
+    def time_unconstrained_endpoints_exact(self, model, length):
+        _unconstrained_endpoints(self.stepset, length // 10, exact=True)
+
+class TransferMatrixBox(object):
+
+    params = (MODEL_IDS, [100, 10000])
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.stepset = get_model(model)
+
+    def time_endpoints(self, model, length):
+        _TransferMatrix(self.stepset, 5, 5).endpoints(length)
+
+    def time_sample(self, model, length):
+        _TransferMatrix(self.stepset, 5, 5).sample(10, length, exact=False)
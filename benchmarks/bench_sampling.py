@@ -0,0 +1,36 @@
+# @Filename: bench_sampling.py
+#
+# Sampling with the recursive method, `naive_random_generation` (which
+# includes the precomputation of its table).
+
+import random as _random
+
+from reluctant_walks import reference as _reference
+from reluctant_walks.counting import clear_table_cache as _clear_table_cache
+
+from benchmarks.common import MODEL_IDS, SAMPLING_LENGTHS, SAMPLING_COUNT
+from benchmarks.common import SEED, get_model
+
+# ==============================================================================
+
+class RecursiveSampling(object):
+
+    params = (MODEL_IDS, SAMPLING_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.steps = list(get_model(model))
+        _random.seed(SEED)
+        # Both variants include the precomputation of their table.
+        _clear_table_cache()
+
+    def time_naive_random_generation(self, model, length):
+        _reference.naive_random_generation(self.steps, length, SAMPLING_COUNT)
+
+    peakmem_naive_random_generation = time_naive_random_generation
+
+    def time_naive_random_generation_float(self, model, length):
+        _reference.naive_random_generation(self.steps, length, SAMPLING_COUNT,
+                                           precision="float")
+
+    peakmem_naive_random_generation_float = time_naive_random_generation_float
@@ -0,0 +1,46 @@
+# @Filename: bench_walks.py
+#
+# Linear passes over batches of (unconstrained) walks: exit detection and
+# tabulation of the endpoints.
+
+from reluctant_walks import reference as _reference
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.walkstats import EndpointHistogram as _EndpointHistogram
+from reluctant_walks.walkstats import WalkStatistics as _WalkStatistics
+
+from benchmarks.common import MODEL_IDS, WALK_LENGTHS, WALK_COUNT
+from benchmarks.common import get_model, random_walks
+
+# ==============================================================================
+
+class WalkPasses(object):
+
+    params = (MODEL_IDS, WALK_LENGTHS)
+    param_names = ['model', 'length']
+
+    def setup(self, model, length):
+        self.walks = random_walks(get_model(model), length, WALK_COUNT)
+        self.batch = _WalkBatch.from_walks(self.walks, get_model(model))
+
+    def time_walk_exit_step(self, model, length):
+        for walk in self.walks:
+            _reference.walk_exit_step(walk)
+
+    def time_is_quarter_plane(self, model, length):
+        for walk in self.walks:
+            _reference.is_quarter_plane(walk)
+
+    def time_tabulate_endpoints_sparse(self, model, length):
+        _reference.tabulate_endpoints_sparse(self.walks)
+
+    def time_tabulate_endpoints_dense(self, model, length):
+        _reference.tabulate_endpoints_dense(self.walks, side=length+1)
+
+    def time_endpoint_histogram(self, model, length):
+        _EndpointHistogram().add(self.batch)
+
+    def time_walk_statistics(self, model, length):
+        _WalkStatistics().add(self.batch)
+
+    peakmem_tabulate_endpoints_sparse = time_tabulate_endpoints_sparse
+    peakmem_tabulate_endpoints_dense = time_tabulate_endpoints_dense
@@ -0,0 +1,117 @@
+# @Filename: common.py
+#
+# Shared fixtures of the benchmark suite: the 79 reference models, the sweeps
+# of lengths, random (unconstrained) walks, and local stand-ins for the
+# external backends (GenRGenS, Maple) used when they are not installed.
+
+import random as _random
+import sys as _sys
+
+from reluctant_walks import reference as _reference
+from reluctant_walks.config import package_ensure as _package_ensure
+from reluctant_walks.compilers import GenRGenSWalkCompiler as _GenRGenSWalkCompiler
+from reluctant_walks.compilers import MapleWalkCompiler as _MapleWalkCompiler
+from reluctant_walks.compilers import _run_process
+
+# ==============================================================================
+
+SEED = 42
+
+MODEL_IDS = sorted(_reference.POSSIBLE_NT_IDS)
+
+# Lengths of the sweeps: the counting engines are cubic (or worse) in the
+# length, so they are benchmarked on shorter walks than the linear passes.
+COUNTING_LENGTHS = [8, 16, 24]
+SAMPLING_LENGTHS = [8, 16, 24]
+WALK_LENGTHS = [10, 100, 1000]
+
+SAMPLING_COUNT = 10
+WALK_COUNT = 200
+GENERATE_COUNT = 10
+
+__models = None
+
+def get_model(model_id):
+    """
+    Returns the `StepSet` of the reference model with identifier `model_id`.
+    """
+    global __models
+    if __models == None:
+        __models = dict(map(lambda r: (r['id'], r['stepset']),
+                            _reference.get_nontrivial_qw_model()))
+    return __models[model_id]
+
+def random_walks(stepset, length, count, seed=SEED):
+    """
+    Returns `count` unconstrained walks of size `length` (as lists of steps),
+    drawn uniformly with a fixed seed.
+    """
+    rng = _random.Random(seed)
+    steps = list(stepset)
+    return [ [ rng.choice(steps) for _ in range(length) ]
+                for _ in range(count) ]
+
+# ==============================================================================
+# Local stand-ins for the external backends.
+#
+# The stand-in is a Python subprocess that reads the script it is given and
+# writes random words in the output format of the backend: this exercises the
+# same code path (script compilation, temporary file, subprocess pipes,
+# parsing and symbol lookup) as the real backend, minus the sampling itself.
+
+_STAND_IN_SCRIPT = """
+import random, sys
+(fmt, filename, times, size) = sys.argv[1:5]
+symbols = sys.argv[5:]
+open(filename).read()
+rng = random.Random(int(times) * 7919 + int(size))
+out = sys.stdout
+for _ in range(int(times)):
+    word = [ rng.choice(symbols) for _ in range(int(size)) ]
+    if fmt == "maple":
+        out.write("[" + ", ".join(word) + "]\\n")
+    else:
+        out.write(" ".join(word) + "\\n")
+"""
+
+def _run_stand_in(fmt, stepset, times, size, filename):
+    symbols = list(map(lambda s: s.symbol, stepset))
+    cmdline = [ _sys.executable, "-c", _STAND_IN_SCRIPT,
+                fmt, filename, str(times), str(size) ] + symbols
+    return _run_process(cmdline, fmt)
+
+class StandInGenRGenSWalkCompiler(_GenRGenSWalkCompiler):
+
+    def __init__(self, stepset, retention=None):
+        self.__stepset = stepset
+        super(StandInGenRGenSWalkCompiler, self).__init__(stepset, retention)
+
+    def run_genrgens(self, times, size, filename):
+        return _run_stand_in("genrgens", self.__stepset, times, size, filename)
+
+class StandInMapleWalkCompiler(_MapleWalkCompiler):
+
+    def __init__(self, stepset, retention=None):
+        self.__stepset = stepset
+        super(StandInMapleWalkCompiler, self).__init__(stepset, retention)
+
+    def _run_maple(self, times, size, filename):
+        return _run_stand_in("maple", self.__stepset, times, size, filename)
+
+def backend_compiler(backend):
+    """
+    Returns the compiler class for `backend` ('genrgens' or 'maple'): the
+    actual one if the backend is installed, a local stand-in otherwise.
+    """
+    if backend == "genrgens":
+        if (_package_ensure('genrgens', fail=False) and
+                _package_ensure('java', fail=False)):
+            return _GenRGenSWalkCompiler
+        return StandInGenRGenSWalkCompiler
+
+    elif backend == "maple":
+        if _package_ensure('maple', fail=False):
+            return _MapleWalkCompiler
+        return StandInMapleWalkCompiler
+
+    raise ValueError("Unknown backend '{}'.".format(backend))
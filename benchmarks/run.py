@@ -0,0 +1,253 @@
+# @Filename: run.py
+#
+# Minimal runner for the benchmark suite, for environments where airspeed
+# velocity (asv) is not installed. It runs the `time_*` and `peakmem_*`
+# benchmarks of the `bench_*.py` modules, reports the (best) wall-clock time
+# and the peak memory allocated (measured with `tracemalloc`), and saves the
+# results as JSON so that different versions can be compared:
+#
+#     python -m benchmarks.run --bench Counting --models 0 1 2
+#     python -m benchmarks.run --compare OLD.json NEW.json
+
+from __future__ import print_function
+
+import argparse as _argparse
+import datetime as _datetime
+import importlib as _importlib
+import itertools as _itertools
+import json as _json
+import os as _os
+import pkgutil as _pkgutil
+import platform as _platform
+import re as _re
+import subprocess as _subprocess
+import sys as _sys
+import timeit as _timeit
+
+# ==============================================================================
+
+_RESULTS_DIR = _os.path.join(_os.path.dirname(_os.path.abspath(__file__)),
+                             "results")
+
+_DEFAULT_REPEAT = 3
+_DEFAULT_THRESHOLD = 1.1
+
+# ==============================================================================
+
+def discover_benchmarks(pattern=None):
+    """
+    Yields tuples `(name, class, method_name)` for every benchmark of the
+    suite whose name ("module.Class.method") matches the regular expression
+    `pattern`.
+    """
+    import benchmarks as _benchmarks
+
+    regexp = _re.compile(pattern) if pattern else None
+
+    for (_, module_name, _) in _pkgutil.iter_modules(_benchmarks.__path__):
+        if not module_name.startswith("bench_"):
+            continue
+        module = _importlib.import_module("benchmarks." + module_name)
+        for (class_name, cls) in sorted(vars(module).items()):
+            if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                continue
+            for method_name in sorted(dir(cls)):
+                if not method_name.startswith(("time_", "peakmem_")):
+                    continue
+                name = "{}.{}.{}".format(module_name, class_name, method_name)
+                if regexp == None or regexp.search(name):
+                    yield (name, cls, method_name)
+
+def _param_combinations(cls, models=None):
+    params = getattr(cls, "params", [])
+    names = getattr(cls, "param_names", [])
+    if len(params) > 0 and not isinstance(params[0], (list, tuple)):
+        params = [params]
+    for combination in _itertools.product(*params):
+        values = dict(zip(names, combination))
+        if models != None and "model" in values:
+            if values["model"] not in models:
+                continue
+        yield (combination, values)
+
+def _param_key(values):
+    return ",".join("{}={}".format(k, values[k]) for k in sorted(values))
+
+def _measure_time(bench, method, args, repeat):
+    timings = _timeit.repeat(lambda: method(bench, *args),
+                             repeat=repeat, number=1)
+    timings.sort()
+    return { 'time': timings[0], 'time_median': timings[len(timings)//2] }
+
+def _measure_peakmem(bench, method, args):
+    import tracemalloc as _tracemalloc
+    _tracemalloc.start()
+    try:
+        method(bench, *args)
+        peak = _tracemalloc.get_traced_memory()[1]
+    finally:
+        _tracemalloc.stop()
+    return { 'peakmem': peak }
+
+def run_benchmarks(pattern=None, models=None, repeat=_DEFAULT_REPEAT,
+                   stream=_sys.stdout):
+    """
+    Runs the benchmarks matching `pattern` (restricted to the models whose
+    identifiers are in `models`, if specified), and returns the results as
+    a dictionary mapping the name of the benchmark to a dictionary mapping
+    the parameters to the measurements.
+    """
+    results = {}
+
+    for (name, cls, method_name) in discover_benchmarks(pattern):
+        method = getattr(cls, method_name)
+        results[name] = {}
+        for (combination, values) in _param_combinations(cls, models):
+            bench = cls()
+            if hasattr(bench, "setup"):
+                bench.setup(*combination)
+
+            if method_name.startswith("time_"):
+                measure = _measure_time(bench, method, combination, repeat)
+            else:
+                measure = _measure_peakmem(bench, method, combination)
+
+            if hasattr(bench, "teardown"):
+                bench.teardown(*combination)
+
+            key = _param_key(values)
+            results[name][key] = measure
+
+            if stream != None:
+                print("{:<64} {:<32} {}".format(name, key,
+                                                _format_measure(measure)),
+                      file=stream)
+                stream.flush()
+
+    return results
+
+# ==============================================================================
+
+def _format_measure(measure):
+    if 'time' in measure:
+        value = measure['time']
+        for (unit, factor) in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+            if value >= factor:
+                break
+        return "{:9.3f} {}".format(value / factor, unit)
+    value = float(measure['peakmem'])
+    for (unit, factor) in (("G", 2.**30), ("M", 2.**20), ("k", 2.**10)):
+        if value >= factor:
+            break
+    return "{:9.3f} {}".format(value / factor, unit)
+
+def _environment():
+    try:
+        commit = _subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=open(_os.devnull, "w")).decode("utf-8").strip()
+    except (OSError, _subprocess.CalledProcessError):
+        commit = None
+
+    try:
+        # Python 3.8+
+        from importlib.metadata import version
+        package_version = version("reluctant_walks")
+    except Exception:
+        package_version = None
+
+    return {
+        'commit': commit,
+        'version': package_version,
+        'python': _platform.python_version(),
+        'machine': _platform.machine(),
+        'platform': _platform.platform(),
+        'date': _datetime.datetime.now().isoformat(),
+    }
+
+def save_results(results, path=None):
+    """
+    Saves the results (along with a description of the environment), by
+    default in `benchmarks/results/`, and returns the path of the file.
+    """
+    env = _environment()
+    if path == None:
+        if not _os.path.isdir(_RESULTS_DIR):
+            _os.makedirs(_RESULTS_DIR)
+        stamp = _datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = _os.path.join(_RESULTS_DIR, "{}-{}.json".format(
+            env['commit'] or "unknown", stamp))
+
+    with open(path, "w") as f:
+        _json.dump({ 'environment': env, 'results': results }, f,
+                   indent=1, sort_keys=True)
+    return path
+
+def compare_results(old_path, new_path, threshold=_DEFAULT_THRESHOLD,
+                    stream=_sys.stdout):
+    """
+    Compares two result files, and reports the measurements that changed by
+    more than a factor `threshold`. Returns the number of regressions.
+    """
+    with open(old_path) as f:
+        old = _json.load(f)['results']
+    with open(new_path) as f:
+        new = _json.load(f)['results']
+
+    regressions = 0
+    for name in sorted(set(old) & set(new)):
+        for key in sorted(set(old[name]) & set(new[name])):
+            for field in ('time', 'peakmem'):
+                if field not in old[name][key] or field not in new[name][key]:
+                    continue
+                (a, b) = (old[name][key][field], new[name][key][field])
+                if a <= 0 or b <= 0:
+                    continue
+                ratio = float(b) / a
+                if ratio > threshold:
+                    label = "REGRESSION"
+                    regressions += 1
+                elif ratio < 1. / threshold:
+                    label = "improved"
+                else:
+                    continue
+                print("{:<10} {:6.2f}x {:<64} {}".format(
+                    label, ratio, name, key), file=stream)
+
+    return regressions
+
+# ==============================================================================
+
+def main(argv=None):
+    parser = _argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Runs the benchmark suite of reluctant_walks.")
+    parser.add_argument("--bench", "-b", default=None,
+                        help="regular expression to select benchmarks")
+    parser.add_argument("--models", "-m", type=int, nargs="+", default=None,
+                        help="identifiers of the reference models to use")
+    parser.add_argument("--repeat", "-r", type=int, default=_DEFAULT_REPEAT,
+                        help="number of timed runs (the best is kept)")
+    parser.add_argument("--output", "-o", default=None,
+                        help="file in which to save the results")
+    parser.add_argument("--no-save", action="store_true",
+                        help="do not save the results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=_DEFAULT_THRESHOLD,
+                        help="ratio above which a change is reported")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare_results(args.compare[0], args.compare[1],
+                                      threshold=args.threshold)
+        return 1 if regressions > 0 else 0
+
+    results = run_benchmarks(pattern=args.bench, models=args.models,
+                             repeat=args.repeat)
+    if not args.no_save:
+        print("Results saved in {}".format(save_results(results, args.output)))
+    return 0
+
+if __name__ == "__main__":
+    _sys.exit(main())
@@ -0,0 +1,10 @@
+# @Date:   2026-10-18-11:20
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: __main__.py
+# @Last modified time: 2026-10-18-11:20
+
+import sys as _sys
+
+from reluctant_walks.cli import main
+
+_sys.exit(main())
@@ -0,0 +1,450 @@
+# @Date:   2026-10-18-11:52
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: batch.py
+# @Last modified time: 2026-10-18-11:52
+
+# Array-backed storage of many walks. Instead of a Python list of `Step`
+# objects per walk, a `WalkBatch` stores all the walks as one contiguous array
+# of small integers (the index of each step in its `StepSet`), along with the
+# offsets at which each walk starts, so that walks of different sizes can be
+# stored together. This uses one byte per step (instead of a pointer), and
+# allows the walks to be processed with vectorized `numpy` operations.
+
+from reluctant_walks.config import package_raise as _package_raise
+
+# ==============================================================================
+
+def _numpy():
+    # NOTE: Imported on demand, so that importing this module (which the
+    # compilers do) does not load numpy.
+    try:
+        import numpy as np
+    except ImportError:
+        _package_raise("numpy")
+    return np
+
+def _index_dtype(count):
+    np = _numpy()
+    return np.uint8 if count <= 256 else np.uint16
+
+# ==============================================================================
+
+class WalkBatch(object):
+
+    def __init__(self, stepset, steps, offsets=None):
+        """
+        Creates a batch of walks on `stepset`, from the array `steps` of the
+        indices of their steps (in the order of iteration of `stepset`). If
+        `steps` is two-dimensional, each row is a walk; otherwise the walks
+        are concatenated, and walk `i` is `steps[offsets[i]:offsets[i+1]]`.
+        """
+        np = _numpy()
+        self.__stepset = stepset
+        self.__steps_list = list(stepset)
+
+        steps = np.asarray(steps)
+        if steps.ndim == 2:
+            (count, length) = steps.shape
+            offsets = np.arange(0, (count + 1) * length, length,
+                                dtype=np.int64) if length > 0 else \
+                      np.zeros(count + 1, dtype=np.int64)
+            steps = steps.reshape(-1)
+        elif offsets is None:
+            offsets = np.array([0, len(steps)], dtype=np.int64)
+
+        # NOTE: The walks always start at the beginning of the buffer (the
+        # first offset is 0, and the last is the size of the buffer).
+        self.__offsets = np.asarray(offsets, dtype=np.int64)
+        self.__steps = steps[:self.__offsets[-1]]
+        self.__trajectories = None
+
+    # ==========================================================================
+    # Conversions
+
+    @classmethod
+    def from_walks(cls, walks, stepset):
+        """
+        Creates a batch from walks given as lists of `Step` objects (of
+        `stepset`, matched by symbol, or by coordinates otherwise).
+        """
+        np = _numpy()
+        steps_list = list(stepset)
+        by_symbol = dict(map(lambda p: (p[1].symbol, p[0]),
+                             enumerate(steps_list)))
+        by_coord = dict(map(lambda p: ((p[1].x, p[1].y), p[0]),
+                            reversed(list(enumerate(steps_list)))))
+
+        def index(step):
+            i = by_symbol.get(step.symbol, None)
+            if i == None:
+                i = by_coord[(step.x, step.y)]
+            return i
+
+        walks = list(map(list, walks))
+        lengths = np.fromiter(map(len, walks), dtype=np.int64,
+                              count=len(walks))
+        offsets = np.zeros(len(walks) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        steps = np.fromiter((index(s) for w in walks for s in w),
+                            dtype=_index_dtype(len(steps_list)),
+                            count=int(offsets[-1]))
+        return cls(stepset, steps, offsets)
+
+    @classmethod
+    def from_symbols(cls, words, stepset):
+        """
+        Creates a batch from walks given as lists of symbols (as output by the
+        backends of the compilers), with the same matching as `StepSet.get`.
+        """
+        np = _numpy()
+        index = {}
+        for (i, step) in enumerate(stepset):
+            index[step.symbol] = i
+            if step.symbol.startswith("Z"):
+                index.setdefault(step.symbol[1:], i)
+
+        words = list(words)
+        lengths = np.fromiter(map(len, words), dtype=np.int64,
+                              count=len(words))
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        steps = np.fromiter((index[symbol] for w in words for symbol in w),
+                            dtype=_index_dtype(len(index)),
+                            count=int(offsets[-1]))
+        return cls(stepset, steps, offsets)
+
+    def swapped(self, stepset=None):
+        """
+        Returns the mirror images of the walks (by the reflection `(x, y) ->
+        (y, x)`), on `stepset` (by default, `self.stepset.swapped()`, which
+        keeps the same step indices, so that the steps are shared without
+        copy); the steps are mapped by coordinates otherwise.
+        """
+        np = _numpy()
+        if stepset == None:
+            stepset = self.__stepset.swapped()
+        target = list(map(lambda s: (s.y, s.x), stepset))
+        mirror = list(map(lambda s: (s.x, s.y), self.__steps_list))
+        if target == mirror:
+            return WalkBatch(stepset, self.__steps, self.__offsets)
+        index = dict(map(lambda p: (p[1], p[0]), reversed(list(
+            enumerate(target)))))
+        mapping = np.array(list(map(lambda p: index[p], mirror)),
+                           dtype=_index_dtype(len(target)))
+        return WalkBatch(stepset, mapping[self.__steps], self.__offsets)
+
+    def to_walks(self):
+        """
+        Returns the walks as lists of `Step` objects (the legacy form).
+        """
+        return list(iter(self))
+
+    def __iter__(self):
+        steps_list = self.__steps_list
+        indices = self.__steps.tolist()
+        offsets = self.__offsets.tolist()
+        for i in range(len(offsets) - 1):
+            yield [ steps_list[j] for j in indices[offsets[i]:offsets[i+1]] ]
+
+    # ==========================================================================
+    # Access
+
+    def __len__(self):
+        return len(self.__offsets) - 1
+
+    def __getitem__(self, key):
+        """
+        Returns walk `key` as a list of `Step` objects if `key` is an integer,
+        and a new `WalkBatch` if `key` is a slice, an array of indices or a
+        boolean mask.
+        """
+        np = _numpy()
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError("Walk index out of range.")
+            (start, end) = (self.__offsets[key], self.__offsets[key+1])
+            return [ self.__steps_list[j]
+                     for j in self.__steps[start:end].tolist() ]
+
+        if isinstance(key, slice):
+            (start, stop, stride) = key.indices(len(self))
+            if stride == 1:
+                # Contiguous walks: a view on the same buffer.
+                offsets = self.__offsets[start:max(start, stop)+1]
+                return WalkBatch(self.__stepset,
+                                 self.__steps[offsets[0]:offsets[-1]],
+                                 offsets - offsets[0])
+            key = np.arange(start, stop, stride)
+
+        key = np.asarray(key)
+        if key.dtype == bool:
+            key = np.flatnonzero(key)
+        return self.take(key)
+
+    def take(self, indices):
+        """
+        Returns a new batch with the walks of the given indices.
+        """
+        np = _numpy()
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.__offsets[:-1][indices]
+        lengths = self.lengths[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Position of each selected step in the original buffer.
+        positions = (np.arange(offsets[-1], dtype=np.int64) -
+                     np.repeat(offsets[:-1] - starts, lengths))
+        return WalkBatch(self.__stepset, self.__steps[positions], offsets)
+
+    @property
+    def stepset(self):
+        return self.__stepset
+
+    @property
+    def steps(self):
+        """
+        Array of the indices of the steps of all the walks, concatenated.
+        """
+        return self.__steps
+
+    @property
+    def offsets(self):
+        return self.__offsets
+
+    @property
+    def lengths(self):
+        np = _numpy()
+        return np.diff(self.__offsets)
+
+    @property
+    def total_steps(self):
+        return int(self.__offsets[-1])
+
+    @property
+    def nbytes(self):
+        return self.__steps.nbytes + self.__offsets.nbytes
+
+    @property
+    def is_uniform(self):
+        lengths = self.lengths
+        return len(lengths) == 0 or bool((lengths == lengths[0]).all())
+
+    def as_array(self):
+        """
+        Returns the walks as a two-dimensional array (a view, without copy);
+        all the walks must have the same size.
+        """
+        if not self.is_uniform:
+            raise ValueError("The walks of the batch do not have the same size.")
+        length = int(self.lengths[0]) if len(self) > 0 else 0
+        return self.__steps.reshape(len(self), length)
+
+    def deltas(self):
+        """
+        Returns the arrays `(dx, dy)` of the coordinates of the steps of the
+        stepset, indexed like `steps`.
+        """
+        np = _numpy()
+        dx = np.array(list(map(lambda s: s.x, self.__steps_list)), dtype=np.int64)
+        dy = np.array(list(map(lambda s: s.y, self.__steps_list)), dtype=np.int64)
+        return (dx, dy)
+
+    def __repr__(self):
+        return "WalkBatch({} walks, {} steps)".format(len(self),
+                                                      self.total_steps)
+
+    # ==========================================================================
+    # Vectorized computations (see `Trajectories`)
+
+    @property
+    def trajectories(self):
+        """
+        The `Trajectories` of the walks, computed on first access and then
+        shared by all the computations below.
+        """
+        if self.__trajectories == None:
+            self.__trajectories = Trajectories(self)
+        return self.__trajectories
+
+    def positions(self):
+        """
+        Returns the arrays `(x, y)` of the positions reached after each step
+        of each walk (concatenated like `steps`).
+        """
+        return self.trajectories.positions
+
+    def endpoints(self):
+        """
+        Returns the arrays `(x, y)` of the endpoints of the walks.
+        """
+        return self.trajectories.endpoints
+
+    def exit_steps(self):
+        """
+        Returns, for each walk, the step at which it first exits the quarter
+        plane (counting from 1), or its size if it never does, like
+        `reference.walk_exit_step`.
+        """
+        return self.trajectories.exit_steps.copy()
+
+    def in_quarter_plane(self):
+        """
+        Returns a boolean mask of the walks that never exit the quarter plane.
+        """
+        return self.trajectories.in_quarter_plane.copy()
+
+# ==============================================================================
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+class Trajectories(object):
+
+    def __init__(self, batch):
+        """
+        Lazy view on the trajectories of the walks of `batch`: the positions
+        are computed (by a single cumulative sum over the whole buffer) the
+        first time they are needed, and everything else (endpoints, prefix
+        minima, exits) is derived from them. All the arrays are read-only.
+        """
+        self.__batch = batch
+        self.__sums = None
+        self.__positions = None
+        self.__endpoints = None
+        self.__minima = None
+        self.__exits = None
+
+    def __coordinate_dtype(self):
+        np = _numpy()
+        batch = self.__batch
+        (dx, dy) = batch.deltas()
+        longest = int(batch.lengths.max()) if len(batch) > 0 else 0
+        reach = longest * max([1] + list(map(abs, dx.tolist() + dy.tolist())))
+        return np.int32 if reach < 2**31 else np.int64
+
+    @property
+    def prefix_sums(self):
+        """
+        Cumulative sums `(cx, cy)` of the coordinates of the steps over the
+        whole buffer, starting with 0: the displacement of the steps `i` to
+        `j` (excluded) of the buffer is `c[j] - c[i]`.
+        """
+        if self.__sums == None:
+            np = _numpy()
+            batch = self.__batch
+            (dx, dy) = batch.deltas()
+            # NOTE: The sums over the whole buffer can exceed the coordinates
+            # of a single walk, hence the wider type.
+            cx = np.zeros(batch.total_steps + 1, dtype=np.int64)
+            cy = np.zeros(batch.total_steps + 1, dtype=np.int64)
+            np.cumsum(dx[batch.steps], out=cx[1:])
+            np.cumsum(dy[batch.steps], out=cy[1:])
+            self.__sums = (_read_only(cx), _read_only(cy))
+        return self.__sums
+
+    @property
+    def positions(self):
+        """
+        Arrays `(x, y)` of the positions reached after each step of each walk
+        (concatenated like the steps of the batch).
+        """
+        if self.__positions == None:
+            np = _numpy()
+            batch = self.__batch
+            (cx, cy) = self.prefix_sums
+            starts = np.repeat(batch.offsets[:-1], batch.lengths)
+            dtype = self.__coordinate_dtype()
+            self.__positions = (
+                _read_only((cx[1:] - cx[starts]).astype(dtype, copy=False)),
+                _read_only((cy[1:] - cy[starts]).astype(dtype, copy=False)))
+        return self.__positions
+
+    def walk(self, i):
+        """
+        Returns the arrays `(x, y)` of the positions of walk `i` (views).
+        """
+        (x, y) = self.positions
+        (start, end) = self.__batch.offsets[i:i+2]
+        return (x[start:end], y[start:end])
+
+    @property
+    def endpoints(self):
+        """
+        Arrays `(x, y)` of the endpoints of the walks.
+        """
+        if self.__endpoints == None:
+            (cx, cy) = self.prefix_sums
+            offsets = self.__batch.offsets
+            (starts, ends) = (offsets[:-1], offsets[1:])
+            self.__endpoints = (_read_only(cx[ends] - cx[starts]),
+                                _read_only(cy[ends] - cy[starts]))
+        return self.__endpoints
+
+    @property
+    def prefix_minima(self):
+        """
+        Arrays `(mx, my)` of the minimum of the coordinates of each walk up to
+        each step (included), concatenated like the positions.
+        """
+        if self.__minima == None:
+            np = _numpy()
+            batch = self.__batch
+            walks = np.repeat(np.arange(len(batch), dtype=np.int64),
+                              batch.lengths)
+            minima = []
+            for coordinates in self.positions:
+                # Shifting each walk below all the previous ones restarts the
+                # running minimum at the beginning of each walk.
+                span = 2 * int(np.abs(coordinates).max(initial=0)) + 1
+                shifted = coordinates.astype(np.int64) - walks * span
+                np.minimum.accumulate(shifted, out=shifted)
+                shifted += walks * span
+                minima.append(_read_only(shifted.astype(coordinates.dtype,
+                                                        copy=False)))
+            self.__minima = tuple(minima)
+        return self.__minima
+
+    @property
+    def exit_steps(self):
+        """
+        For each walk, the step at which it first exits the quarter plane
+        (counting from 1), or its size if it never does.
+        """
+        if self.__exits == None:
+            np = _numpy()
+            batch = self.__batch
+            (x, y) = self.positions
+            outside = np.flatnonzero((x < 0) | (y < 0))
+            walks = np.searchsorted(batch.offsets, outside, side='right') - 1
+            (walks, first) = np.unique(walks, return_index=True)
+            exits = batch.lengths
+            exits[walks] = outside[first] - batch.offsets[walks] + 1
+            inside = np.ones(len(batch), dtype=bool)
+            inside[walks] = False
+            self.__exits = (_read_only(exits), _read_only(inside))
+        return self.__exits[0]
+
+    @property
+    def in_quarter_plane(self):
+        """
+        Boolean mask of the walks that never exit the quarter plane.
+        """
+        self.exit_steps
+        return self.__exits[1]
+
+def concatenate(batches):
+    """
+    Concatenates batches of walks on the same stepset into a single batch.
+    """
+    np = _numpy()
+    batches = list(batches)
+    if len(batches) == 0:
+        raise ValueError("Cannot concatenate an empty list of batches.")
+    steps = np.concatenate(list(map(lambda b: b.steps, batches)))
+    lengths = np.concatenate(list(map(lambda b: b.lengths, batches)))
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return WalkBatch(batches[0].stepset, steps, offsets)
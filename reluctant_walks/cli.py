@@ -0,0 +1,363 @@
+# @Date:   2026-10-18-11:20
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: cli.py
+# @Last modified time: 2026-10-18-11:20
+
+# Command-line entry point (installed as `reluctant-walks`):
+#
+#     reluctant-walks sample --model 12 --length 500 --count 10000 \
+#                            --jobs 4 --out walks.txt
+#     reluctant-walks count --model "(0,1) (1,-1) (-1,-1)" --length 30
+#     reluctant-walks tabulate --model 12 --length 20
+#     reluctant-walks sample --model 12 --length 500 --count 10000 \
+#                            --format binary --out walks.rwlk
+#
+# A model is either the identifier of one of the 79 non-trivial models of
+# `reference.py`, or a list of steps. Walks are written one per line, as the
+# indices of their steps in the stepset (listed in a header line starting with
+# '#'), batch after batch, so that they are never all held in memory; or, with
+# `--format binary`, in the bit-packed format of `walkfile.py`.
+
+from __future__ import print_function
+
+import argparse as _argparse
+import re as _re
+import sys as _sys
+import time as _time
+
+from reluctant_walks.plane import StepSet as _StepSet
+import reluctant_walks.reference as _reference
+
+# ==============================================================================
+
+_DEFAULT_BATCH = 1000
+
+_RE_STEP = _re.compile(r"\(?\s*(-?\d+)\s*,\s*(-?\d+)\s*\)?")
+
+def parse_model(text):
+    """
+    Returns the `StepSet` described by `text`: either the identifier of one
+    of the non-trivial models of `reference.py` (in which case its cached best
+    slope is available), or a list of steps such as "(0,1) (1,-1) (-1,-1)".
+    """
+    text = text.strip()
+    if _re.match(r"^\d+$", text):
+        records = list(_reference.get_nontrivial_qw_model(by_id=set([int(text)])))
+        if len(records) == 0:
+            raise ValueError("Unknown model identifier '{}'.".format(text))
+        return records[0]['stepset']
+
+    steps = list(map(lambda m: (int(m[0]), int(m[1])), _RE_STEP.findall(text)))
+    if len(steps) == 0:
+        raise ValueError("Cannot parse model '{}'.".format(text))
+    return _StepSet(init_set=steps)
+
+def _stepset_header(stepset):
+    return "# steps: {}\n".format(" ".join(
+        map(lambda s: "({},{})".format(s.x, s.y), stepset)))
+
+def _open_output(path):
+    if path == None or path == "-":
+        return _sys.stdout
+    return open(path, "w")
+
+# ==============================================================================
+# Sampling (possibly in several processes)
+
+# State of a sampling process (set up once per process, by `_init_sampler`).
+__sampler = None
+
+def _init_sampler(steps, slope, cached_bestslope, strategy, length,
+                  fmt='text', table=None):
+    global __sampler
+
+    stepset = _StepSet(init_set=steps, cached_bestslope=cached_bestslope)
+    stepset.slope = slope
+    if strategy == 'recursive':
+        # The count table is computed once, by the parent process: either it
+        # is given (single process), or this attaches to its shared copy.
+        from reluctant_walks.counting import DenseCountTable
+        if not isinstance(table, DenseCountTable):
+            table = DenseCountTable.attach(table)
+    __sampler = (stepset, strategy, length, table, fmt)
+
+def _sample_batch(args):
+    (seed, size) = args
+    (stepset, strategy, length, table, fmt) = __sampler
+
+    import random as _random
+    if seed != None:
+        _random.seed(seed)
+
+    steps = list(stepset)
+    if strategy == 'recursive':
+        # The choices that the floating-point counts cannot decide are made
+        # with exact counts, so that the walks are exactly uniform.
+        batch = table.sample(stepset, size, length, exact=True)
+        if fmt == 'binary':
+            return (size, batch.as_array().tobytes())
+        if len(steps) <= 10:
+            from reluctant_walks.batch import _numpy
+            np = _numpy()
+            lines = np.empty((size, length + 1), dtype=np.uint8)
+            lines[:, :length] = batch.as_array() + ord("0")
+            lines[:, length] = ord("\n")
+            return lines.tobytes().decode("ascii")
+        walks = batch
+    elif strategy == 'rejection':
+        (walks, _) = _reference._naive_rejection_generation_sample(
+            steps, length, size)
+    else:
+        from reluctant_walks.planner import plan_sampler
+        walks = plan_sampler(stepset, length, size, strategies=[strategy],
+                             pilot=False).run()
+
+    # Encode the walks as the indices of their steps, to keep what is sent
+    # between processes (and written to disk) small.
+    if fmt == 'binary':
+        index = dict(map(lambda p: (p[1].symbol, p[0]), enumerate(steps)))
+        return (size, bytes(bytearray(index[s.symbol]
+                                      for w in walks for s in w)))
+
+    index = dict(map(lambda p: (p[1].symbol, "%d" % p[0]), enumerate(steps)))
+    sep = "" if len(steps) <= 10 else " "
+    return "".join(map(lambda w: sep.join(map(lambda s: index[s.symbol], w))
+                                 + "\n", walks))
+
+def _batches(count, batch, seed):
+    i = 0
+    while count > 0:
+        size = min(batch, count)
+        yield (None if seed == None else seed + i, size)
+        count -= size
+        i += 1
+
+def resolve_strategy(stepset, length, count, strategy='auto',
+                     memory_cap=None):
+    """
+    Returns the name of the strategy with which `sample()` draws `count`
+    walks of size `length`: `strategy`, or the one chosen by the planner if
+    it is 'auto'.
+    """
+    if strategy == 'auto':
+        from reluctant_walks.planner import plan_sampler
+        plan = plan_sampler(stepset, length, count, memory_cap=memory_cap)
+        if plan.strategy == None:
+            raise MemoryError(plan.explain())
+        strategy = plan.strategy
+    return strategy
+
+def sample(stepset, length, count, out, jobs=1, batch=_DEFAULT_BATCH,
+           strategy='auto', seed=None, memory_cap=None):
+    """
+    Samples `count` walks of size `length` and writes them to `out`, in
+    batches of `batch` walks, using `jobs` processes: `out` is either a text
+    stream, or a `walkfile.WalkFileWriter`. Returns the name of the strategy
+    used.
+    """
+    strategy = resolve_strategy(stepset, length, count, strategy, memory_cap)
+
+    binary = hasattr(out, "stepset")
+    table = None
+    if strategy == 'recursive':
+        # The table is shared with the reflection of the model (a transposed
+        # view), which then draws the walks of `stepset` directly.
+        from reluctant_walks.counting import cached_table
+        table = cached_table(stepset, length)
+    init_args = [list(map(lambda s: (s.x, s.y), stepset)), stepset.slope,
+                 _safe_best_slope(stepset), strategy, length,
+                 'binary' if binary else 'text', table]
+
+    if binary:
+        from reluctant_walks.batch import WalkBatch, _numpy
+        np = _numpy()
+        # NOTE: The size of the batch is sent along with its steps, since it
+        # cannot be deduced from them for walks of size 0.
+        write = lambda data: out.write(WalkBatch(
+            out.stepset, np.frombuffer(data[1], dtype=np.uint8).reshape(
+                data[0], length)))
+    else:
+        out.write(_stepset_header(stepset))
+        write = out.write
+
+    if jobs <= 1:
+        _init_sampler(*init_args)
+        for data in map(_sample_batch, _batches(count, batch, seed)):
+            write(data)
+    else:
+        import multiprocessing as _multiprocessing
+        if table != None:
+            # The workers attach to a single shared copy of the table.
+            init_args[-1] = table.share()
+        try:
+            pool = _multiprocessing.Pool(processes=jobs,
+                                         initializer=_init_sampler,
+                                         initargs=init_args)
+            try:
+                for data in pool.imap(_sample_batch,
+                                      _batches(count, batch, seed)):
+                    write(data)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            if table != None:
+                table.unlink()
+
+    return strategy
+
+def _safe_best_slope(stepset):
+    from reluctant_walks.config import UnavailableException
+    try:
+        return stepset.get_best_slope()
+    except UnavailableException:
+        return None
+
+# ==============================================================================
+# Counting
+
+def count(stepset, length, out, jobs=1):
+    """
+    Writes, for each size from 0 to `length`, the number of walks of the
+    quarter plane (computed exactly, modulo several primes in `jobs`
+    processes if they do not fit in 64 bits).
+    """
+    from reluctant_walks.config import UnavailableException
+    steps = list(stepset)
+    # No walk of size at most `length` leaves this box.
+    side = max([0] + [ max(s.x, s.y) for s in steps ]) * length + 1
+    try:
+        totals = _reference.tabulate_all_walks(stepset, side=side, N=length,
+                                               output="totals", exact=True,
+                                               jobs=jobs).tolist()
+    except UnavailableException:
+        table = _reference.naive_random_generation_precompute(steps, length)
+        totals = [ table.get((0, 0, i), 0) for i in range(length + 1) ]
+    for i in range(length + 1):
+        out.write("{} {}\n".format(i, totals[i]))
+
+def tabulate(stepset, length, out, side=None, jobs=1):
+    """
+    Writes the number of walks of size `length` (in the box of width `side`)
+    ending at each point, as lines "x y count" (computed exactly, like
+    `count()`).
+    """
+    if side == None:
+        side = length + 1
+    table = _reference.tabulate_all_walks(stepset, side=side, N=length,
+                                          exact=True, jobs=jobs)
+    for x in range(side):
+        for y in range(side):
+            if table[x, y] != 0:
+                out.write("{} {} {}\n".format(x, y, table[x, y]))
+
+# ==============================================================================
+
+def _add_model_arguments(parser):
+    parser.add_argument("--model", "-m", required=True,
+                        help="identifier of a reference model (0-78), "
+                             "or list of steps such as '(0,1) (1,-1) (-1,-1)'")
+    parser.add_argument("--length", "-n", type=int, required=True,
+                        help="size of the walks")
+    parser.add_argument("--out", "-o", default="-",
+                        help="output file (default: standard output)")
+
+def _build_parser():
+    parser = _argparse.ArgumentParser(
+        prog="reluctant-walks",
+        description="Sample, count and tabulate quarter-plane walks.")
+    commands = parser.add_subparsers(dest="command")
+
+    p = commands.add_parser("sample", help="sample walks uniformly at random")
+    _add_model_arguments(p)
+    p.add_argument("--count", "-c", type=int, required=True,
+                   help="number of walks")
+    p.add_argument("--jobs", "-j", type=int, default=1,
+                   help="number of processes")
+    p.add_argument("--batch", "-b", type=int, default=_DEFAULT_BATCH,
+                   help="number of walks sampled and written at once")
+    p.add_argument("--strategy", "-s", default="auto",
+                   choices=["auto", "recursive", "rejection",
+                            "genrgens", "maple"],
+                   help="sampling algorithm (default: chosen by the planner)")
+    p.add_argument("--memory-cap", type=float, default=None,
+                   help="memory cap in bytes (for the planner)")
+    p.add_argument("--seed", type=int, default=None,
+                   help="seed of the random generator")
+    p.add_argument("--format", "-f", default="text",
+                   choices=["text", "binary"],
+                   help="output format (binary: bit-packed walk file, "
+                        "which requires --out)")
+
+    p = commands.add_parser("count",
+                            help="count quarter-plane walks of each size")
+    _add_model_arguments(p)
+    p.add_argument("--jobs", "-j", type=int, default=1,
+                   help="number of processes (for the exact counts)")
+
+    p = commands.add_parser("tabulate",
+                            help="count walks ending at each point")
+    _add_model_arguments(p)
+    p.add_argument("--side", type=int, default=None,
+                   help="side of the box (default: length + 1)")
+    p.add_argument("--jobs", "-j", type=int, default=1,
+                   help="number of processes (for the exact counts)")
+
+    return parser
+
+def main(argv=None):
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command == None:
+        parser.print_help()
+        return 2
+
+    try:
+        stepset = parse_model(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == "sample":
+        # The strategy is recorded in the metadata of the binary format.
+        strategy = resolve_strategy(stepset, args.length, args.count,
+                                    args.strategy, args.memory_cap)
+    if args.command == "sample" and args.format == "binary":
+        if args.out == "-":
+            parser.error("The binary format requires an output file (--out).")
+        from reluctant_walks.walkfile import WalkFileWriter
+        out = WalkFileWriter(args.out, stepset=stepset, metadata={
+            'length': args.length, 'seed': args.seed,
+            'strategy': strategy,
+        })
+    else:
+        out = _open_output(args.out)
+    started = _time.time()
+    try:
+        if args.command == "sample":
+            sample(stepset, args.length, args.count, out, jobs=args.jobs,
+                   batch=args.batch, strategy=strategy, seed=args.seed)
+        elif args.command == "count":
+            count(stepset, args.length, out, jobs=args.jobs)
+        elif args.command == "tabulate":
+            tabulate(stepset, args.length, out, side=args.side,
+                     jobs=args.jobs)
+    finally:
+        if out is not _sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    elapsed = max(_time.time() - started, 1e-9)
+
+    if args.command == "sample":
+        print("Sampled {} walks of size {} in {:.3f}s with '{}' "
+              "({:.1f} walks/s, {:.0f} steps/s).".format(
+                  args.count, args.length, elapsed, strategy,
+                  args.count / elapsed, args.count * args.length / elapsed),
+              file=_sys.stderr)
+    else:
+        print("Done in {:.3f}s.".format(elapsed), file=_sys.stderr)
+
+    return 0
+
+if __name__ == "__main__":
+    _sys.exit(main())
@@ -7,15 +7,54 @@
 #from ..config import package_ensure as _package_ensure
 from reluctant_walks.config import package_info as _package_info
 from reluctant_walks.config import package_ensure as _package_ensure
+import reluctant_walks.instrumentation as _instrumentation
+from reluctant_walks.compilers.retention import make_retention as _make_retention
 
 # ==============================================================================
 
+def _run_process(cmdline, stage_prefix):
+    """
+    Runs `cmdline` and returns its standard output (as bytes). When
+    instrumentation is enabled, the time until the process starts writing
+    ("<prefix>.startup") is recorded separately from the time spent reading
+    the rest of its output ("<prefix>.output").
+    """
+    import os as _os
+    from subprocess import Popen, PIPE
+
+    with open(_os.devnull, "w") as devnull:
+        if not _instrumentation.enabled():
+            return Popen(cmdline, stdout=PIPE,
+                         stderr=devnull).communicate()[0]
+
+        with _instrumentation.stage(stage_prefix + ".startup") as stage:
+            process = Popen(cmdline, stdout=PIPE, stderr=devnull)
+            first = _os.read(process.stdout.fileno(), 65536)
+            stage.count(bytes=len(first))
+
+        with _instrumentation.stage(stage_prefix + ".output") as stage:
+            rest = process.stdout.read()
+            process.stdout.close()
+            process.wait()
+            stage.count(bytes=len(rest))
+
+    return first + rest
+
+# ==============================================================================
+
+# Number of walks requested from the backend at once, in streaming mode.
+_STREAM_CHUNK = 1000
+
 class WalkCompiler(object):
 
-    def __init__(self, stepset):
+    def __init__(self, stepset, retention=None):
+        """
+        Creates a compiler for `stepset`; `retention` decides which of the
+        generated walks are kept in `walks` (see `retention.make_retention`).
+        """
         self.__stepset = stepset
         self.__equations = ""
-        self.__walks = []
+        self.__retention = _make_retention(retention)
 
     def compile_equations(self):
         pass
@@ -23,9 +62,51 @@ class WalkCompiler(object):
     def compile(self):
         pass
 
+    @property
+    def retention(self):
+        return self.__retention
+
+    @retention.setter
+    def retention(self, value):
+        self.__retention = _make_retention(value)
+
     @property
     def walks(self):
-        return self.__walks
+        return self.__retention.walks
+
+    def _generate(self, times, size, as_batch=False):
+        """
+        Draws `times` walks of size `size` from the backend (implemented by
+        the subclasses), as a list of walks or as a `WalkBatch`.
+        """
+        raise NotImplementedError
+
+    def generate(self, times, size, as_batch=False, stream=False,
+                 chunk=_STREAM_CHUNK):
+        """
+        Returns `times` walks of size `size` (as a `WalkBatch` if `as_batch`
+        is set), and keeps them according to the retention policy. If
+        `stream` is set, returns instead an iterator over the walks (or over
+        batches), which requests `chunk` walks at a time from the backend and
+        does not keep them.
+        """
+        if stream:
+            return self.__stream(times, size, as_batch, chunk)
+        walks = self._generate(times, size, as_batch)
+        self.__retention.add(walks, self.__stepset)
+        return walks
+
+    def __stream(self, times, size, as_batch, chunk):
+        while times > 0:
+            walks = self._generate(min(times, chunk), size, as_batch)
+            if len(walks) == 0:
+                return
+            times -= len(walks)
+            if as_batch:
+                yield walks
+            else:
+                for walk in walks:
+                    yield walk
 
 # ==============================================================================
 
@@ -33,3 +114,5 @@ from reluctant_walks.compilers.boltzoc import BoltzOCWalkCompiler
 from reluctant_walks.compilers.combstruct import CombstructWalkCompiler
 from reluctant_walks.compilers.genrgens import GenRGenSWalkCompiler
 from reluctant_walks.compilers.maple import MapleWalkCompiler
+from reluctant_walks.compilers.retention import KeepAll, KeepNone, KeepLast
+from reluctant_walks.compilers.retention import SpillToFile
@@ -7,36 +7,44 @@
 #from . import WalkCompiler
 from reluctant_walks.compilers import _package_info, _package_ensure
 from reluctant_walks.compilers import WalkCompiler
+from reluctant_walks.batch import WalkBatch as _WalkBatch
 
 # ==============================================================================
 
 class BoltzOCWalkCompiler(WalkCompiler):
 
-    def __init__(self, stepset):
+    def __init__(self, stepset, retention=None):
         self.__stepset = stepset
         self.__equations = ""
-        self.__walks = []
-
-    @property
-    def walks(self):
-        return self.__walks
-
-    def generate(self, times, size):
+        try:
+            # Python 3
+            super().__init__(stepset=stepset, retention=retention)
+        except TypeError:
+            # Python 2
+            super(BoltzOCWalkCompiler, self).__init__(stepset=stepset,
+                                                      retention=retention)
+
+    def _generate(self, times, size, as_batch=False):
         grammar = self.compile_equations()
         try:
             self.__latest_output = self.run_boltzmann(grammar, times, size)
         except:
             return []
         string_walks = self.__latest_output.strip().split('\n')
+        if as_batch:
+            walks = _WalkBatch.from_symbols(
+                map(lambda sw: sw[:-1].split(','), string_walks),
+                self.__stepset)
+            return walks
         walks = []
         for sw in string_walks:
-            walks += [ map(lambda n: self.__stepset.get(n), sw[:-1].split(',')) ]
-        self.__walks += walks
+            walks += [ list(map(lambda n: self.__stepset.get(n),
+                                sw[:-1].split(','))) ]
         return walks
 
     def run_boltzmann(self, grammar, times, size):
         # NOTE: requires the GenRGenS binary be installed.
-        _ensure_package('boltzoc')
+        _package_ensure('boltzoc')
         PATH_TO_BOLTZOC = _package_info('boltzoc').get('path', '')
 
         # FIXME: ensure Python 2/3 compatibility.
@@ -67,7 +75,7 @@ class BoltzOCWalkCompiler(WalkCompiler):
          return "(%s)" % (op.join(lst))
      else:
          halves = self.split_seq(lst, 2)
-         halves = map(lambda x: self.make_op(op, x), halves)
+         halves = list(map(lambda x: self.make_op(op, x), halves))
          return "(%s)" % (op.join(halves))
 
     def compile_equations(self):
@@ -79,7 +87,7 @@ class BoltzOCWalkCompiler(WalkCompiler):
 
         # D equation
         max_k = min(stepset.max_up, stepset.min_down)
-        zds = map(lambda s: "(%s.DD)" % s.symbol, stepset.select(0))
+        zds = list(map(lambda s: "(%s.DD)" % s.symbol, stepset.select(0)))
         lrs = [ "(L%d.R%d)" % (k,k) for k in range(1, max_k + 1) ]
         d_equation = "DD=%s" % self.make_op("+", ["E"] + zds + lrs)
 
@@ -92,7 +100,8 @@ class BoltzOCWalkCompiler(WalkCompiler):
         # Li equations
         li_equations = []
         for i in range(1, stepset.max_up + 1):
-            zdsi = map(lambda s: "(%s.DD)" % s.symbol, stepset.select(i))
+            zdsi = list(map(lambda s: "(%s.DD)" % s.symbol,
+                            stepset.select(i)))
             max_k = min(stepset.max_up, i + stepset.min_down)
             lrsi = [ "(L%d.R%d)" % (k, k-i)
                              for k in range(i+1, max_k + 1) ]
@@ -103,7 +112,8 @@ class BoltzOCWalkCompiler(WalkCompiler):
         # Rj equations
         rj_equations = []
         for j in range(1, stepset.min_down + 1):
-            zdsj = map(lambda s: "(%s.DD)" % s.symbol, stepset.select(-j))
+            zdsj = list(map(lambda s: "(%s.DD)" % s.symbol,
+                            stepset.select(-j)))
             max_k = min(j + stepset.max_up, stepset.min_down)
             lrsj = [ "(L%d.R%d)" % (k-j, k)
                              for k in range(j+1, max_k + 1) ]
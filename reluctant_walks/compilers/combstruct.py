@@ -25,22 +25,23 @@ Sys := {
 
 class CombstructWalkCompiler(WalkCompiler):
 
-    def __init__(self, stepset):
+    def __init__(self, stepset, retention=None):
         self.__stepset = stepset
         self.__equations = ""
         self.__equations_list = []
-        self.__walks = []
+        try:
+            # Python 3
+            super().__init__(stepset=stepset, retention=retention)
+        except TypeError:
+            # Python 2
+            super(CombstructWalkCompiler, self).__init__(stepset=stepset,
+                                                         retention=retention)
 
     @property
     def equations(self):
         return self.__equations_list
 
-    @property
-    def walks(self):
-        raise Exception(
-            "The 'combstruct' abstract class cannot generate objects.")
-
-    def generate(self, times, size):
+    def _generate(self, times, size, as_batch=False):
         raise Exception(
             "The 'combstruct' abstract class cannot generate objects.")
 
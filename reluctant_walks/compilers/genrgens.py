@@ -12,8 +12,12 @@ except ImportError:
 
 from reluctant_walks.compilers import _package_info, _package_ensure
 from reluctant_walks.compilers import WalkCompiler
+from reluctant_walks.compilers import _run_process
+import reluctant_walks.instrumentation as _instrumentation
+from reluctant_walks.batch import WalkBatch as _WalkBatch
 
 from reluctant_walks.config import package_raise as _package_raise
+from reluctant_walks.config import UnavailableException as _UnavailableException
 
 # ==============================================================================
 
@@ -29,47 +33,60 @@ RULES =
 
 class GenRGenSWalkCompiler(WalkCompiler):
 
-    def __init__(self, stepset):
+    def __init__(self, stepset, retention=None):
         self.__stepset = stepset
         self.__equations = ""
-        self.__walks = []
-
-    @property
-    def walks(self):
-        return self.__walks
-
-    def generate(self, times, size):
+        try:
+            # Python 3
+            super().__init__(stepset=stepset, retention=retention)
+        except TypeError:
+            # Python 2
+            super(GenRGenSWalkCompiler, self).__init__(stepset=stepset,
+                                                       retention=retention)
+
+    def _generate(self, times, size, as_batch=False):
         # Call GenRGenS and capture stdout
-        self.call_script(times, size)
+        output = self.call_script(times, size)
 
         # Parse the output and create the actual walks
-        string_walks = self.__latest_output.strip().split('\n')
-
-        walks = []
-        for sw in string_walks:
-            string_steps = sw.split(' ')
-            walks.append(list(map(
-                lambda n: self.__stepset.get(n), string_steps)))
-
-        self.__walks.append(walks)
+        with _instrumentation.stage("genrgens.parse"):
+            string_walks = list(map(lambda sw: sw.split(' '),
+                                    output.strip().split('\n')))
+
+        with _instrumentation.stage("genrgens.map_symbols") as stage:
+            if as_batch:
+                walks = _WalkBatch.from_symbols(string_walks, self.__stepset)
+            else:
+                walks = []
+                for string_steps in string_walks:
+                    walks.append(list(map(
+                        lambda n: self.__stepset.get(n), string_steps)))
+            stage.count(walks=len(walks))
 
         return walks
 
     def call_script(self, times, size):
-        # NOTE: requires the GenRGenS binary be installed.
-        _package_ensure('genrgens')
-        _package_ensure('java')
-        #
+        # NOTE: requires the GenRGenS binary be installed (which is checked
+        # by `run_genrgens()`).
         from tempfile import NamedTemporaryFile
-        self.compile(times, size)
+        with _instrumentation.stage("genrgens.compile"):
+            self.compile(times, size)
         try:
-            script_file = NamedTemporaryFile()
-            script_file.write(self.__script)
-            script_file.flush()
-            self.__latest_output = self.run_genrgens(times, size, script_file.name)
+            with _instrumentation.stage("genrgens.write_script") as stage:
+                script = self.__script.encode("utf-8")
+                script_file = NamedTemporaryFile()
+                script_file.write(script)
+                script_file.flush()
+                stage.count(bytes=len(script))
+            output = self.run_genrgens(times, size, script_file.name)
+            if isinstance(output, bytes):
+                output = output.decode("utf-8")
+            self.__latest_output = output
             script_file.close()
         except KeyboardInterrupt:
             raise
+        except _UnavailableException:
+            raise
         except:
             self.__latest_output = ""
         return self.__latest_output
@@ -84,8 +101,6 @@ class GenRGenSWalkCompiler(WalkCompiler):
         if not _os.path.exists(PATH_TO_GENRGENS):
             _package_raise('genrgens')
 
-        # FIXME: ensure this is Python 2/3 compatible.
-        from subprocess import Popen, PIPE
         genrgens_cmdline = [ "java", "-cp",
                              PATH_TO_GENRGENS,
                              "GenRGenS.GenRGenS",
@@ -93,11 +108,7 @@ class GenRGenSWalkCompiler(WalkCompiler):
                              "-size", str(size),
                              filename ]
 
-        output = Popen(genrgens_cmdline,
-                       stdout=PIPE,
-                       stderr=open("/dev/null", "w")).communicate()[0]
-
-        return output
+        return _run_process(genrgens_cmdline, "genrgens")
 
     def compile(self, times, size):
         self.compile_equations()
@@ -105,7 +116,11 @@ class GenRGenSWalkCompiler(WalkCompiler):
         return self.__script
 
     def gcd(self, *numbers):
-        from fractions import gcd
+        try:
+            # Python 3.5+
+            from math import gcd
+        except ImportError:
+            from fractions import gcd
         return reduce(gcd, numbers)
 
     def lcm(self, *numbers):
@@ -122,37 +137,39 @@ class GenRGenSWalkCompiler(WalkCompiler):
 
         # D = eps + Z(0)s D + { Li Ri, i = 1 .. k }
         d_equations = [ "" ]     # epsilon
-        d_equations += map(lambda s: "%s DD" % s.symbol, stepset.select(0))
+        d_equations += list(map(lambda s: "%s DD" % s.symbol, stepset.select(0)))
         max_k = min(stepset.max_up, stepset.min_down)
         d_equations += [ "L%d R%d" % (k,k) for k in range(1, max_k + 1) ]
-        d_equations = map(lambda x: "DD -> %s" % x, d_equations)
+        d_equations = list(map(lambda x: "DD -> %s" % x, d_equations))
 
         # Paux = eps + Z(0)s P + { Li P, i = 1 .. k }
         p_equations = [ "" ]
         #p_equations += map(lambda s: "%s Paux" % s.symbol, stepset.select(0))
         p_equations += [ "L%d Paux" % k for k in range(1, stepset.max_up + 1) ]
-        p_equations = map(lambda x: "Paux -> %s" % x, p_equations)
+        p_equations = list(map(lambda x: "Paux -> %s" % x, p_equations))
 
         # Li = Z(i)s D + { Lk R(k-i), k = i+1..a }
         li_equations = []
         for i in range(1, lparam + 1):
-            zdsi = map(lambda s: "%s DD" % s.symbol, stepset.select(i))
+            zdsi = list(map(lambda s: "%s DD" % s.symbol, stepset.select(i)))
             max_k = min(stepset.max_up, i + stepset.min_down)
             lrsi = [ "L%d R%d" % (k, k-i)
                              for k in range(i+1, max_k + 1) ]
             if len(zdsi) + len(lrsi) == 0:
                 li_equations += [ "L%d ->" % i ]
-            li_equations += map(lambda x: "L%d -> %s" % (i, x), zdsi + lrsi)
+            li_equations += list(map(lambda x: "L%d -> %s" % (i, x),
+                                     zdsi + lrsi))
 
         # Rj equations
         # Rj = Z(-j)s D + { L(k-j) Rk, k = j+1..b }
         rj_equations = []
         for j in range(1, rparam + 1):
-            zdsj = map(lambda s: "%s DD" % s.symbol, stepset.select(-j))
+            zdsj = list(map(lambda s: "%s DD" % s.symbol, stepset.select(-j)))
             max_k = min(j+stepset.max_up, stepset.min_down)
             lrsj = [ "L%d R%d" % (k-j, k)
                              for k in range(j+1, max_k + 1) ]
-            rj_equations += map(lambda x: "R%d -> %s" % (j, x), zdsj + lrsj)
+            rj_equations += list(map(lambda x: "R%d -> %s" % (j, x),
+                                     zdsj + lrsj))
 
         all_equations = (["PP -> DD Paux"] +
                                          p_equations +
@@ -275,6 +292,6 @@ def sys_genrs(system):
         elif type(rule) == str:
             rules += [ "%s -> %s" % (symbol, rule) ]
         else:
-            print rule
+            print(rule)
     # Assembly
     return ";\n".join(rules)
@@ -6,7 +6,11 @@
 #from . import _package_ensure, _package_info
 #from . import CombstructWalkCompiler
 from reluctant_walks.compilers import _package_info, _package_ensure
+from reluctant_walks.compilers import _run_process
 from reluctant_walks.compilers.combstruct import CombstructWalkCompiler
+import reluctant_walks.instrumentation as _instrumentation
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.config import UnavailableException as _UnavailableException
 
 # ==============================================================================
 
@@ -28,50 +32,58 @@ quit():"""
 
 class MapleWalkCompiler(CombstructWalkCompiler):
 
-    def __init__(self, stepset):
+    def __init__(self, stepset, retention=None):
         self.__stepset = stepset
         self.__equations = ""
         self.__equations_list = []
-        self.__walks = []
         try:
             # Python 3
-            super().__init__(stepset=stepset)
+            super().__init__(stepset=stepset, retention=retention)
         except:
             # Python 2
-            super(MapleWalkCompiler, self).__init__(stepset=stepset)
-
-    @property
-    def walks(self):
-        return self.__walks
-
-    def generate(self, times, size):
-        # NOTE: requires the Maple binary be installed.
-        _package_ensure('maple')
-
-        #
-        self.call_script(times, size)
-        string_walks = self.__latest_output.strip().split('\n')
-        walks = []
-        for sw in string_walks:
-            walks += [ map(lambda n: self.__stepset.get(n), sw[1:-1].split(', ')) ]
-        self.__walks += walks
+            super(MapleWalkCompiler, self).__init__(stepset=stepset,
+                                                    retention=retention)
+
+    def _generate(self, times, size, as_batch=False):
+        # NOTE: requires the Maple binary be installed (which is checked
+        # by `_run_maple()`).
+        output = self.call_script(times, size)
+        with _instrumentation.stage("maple.parse"):
+            string_walks = list(map(lambda sw: sw[1:-1].split(', '),
+                                    output.strip().split('\n')))
+        with _instrumentation.stage("maple.map_symbols") as stage:
+            if as_batch:
+                walks = _WalkBatch.from_symbols(string_walks, self.__stepset)
+            else:
+                walks = []
+                for string_steps in string_walks:
+                    walks += [ list(map(lambda n: self.__stepset.get(n),
+                                        string_steps)) ]
+            stage.count(walks=len(walks))
         return walks
 
     def call_script(self, times, size):
-        # NOTE: requires the GenRGenS binary be installed.
-        _package_ensure('maple')
-
-        #
+        # NOTE: requires the Maple binary be installed (which is checked
+        # by `_run_maple()`).
         from tempfile import NamedTemporaryFile
-        self.compile(times, size)
+        with _instrumentation.stage("maple.compile"):
+            self.compile(times, size)
         try:
-            script_file = NamedTemporaryFile()
-            script_file.write(self.__script)
-            script_file.flush()
-            self.__latest_output = self._run_maple(times, size, script_file.name)
+            with _instrumentation.stage("maple.write_script") as stage:
+                script = self.__script.encode("utf-8")
+                script_file = NamedTemporaryFile()
+                script_file.write(script)
+                script_file.flush()
+                stage.count(bytes=len(script))
+            output = self._run_maple(times, size, script_file.name)
+            if isinstance(output, bytes):
+                output = output.decode("utf-8")
+            self.__latest_output = output
             script_file.close()
         except KeyboardInterrupt:
             raise
+        except _UnavailableException:
+            raise
         except Exception as e:
             print("There was an exception:")
             print(e)
@@ -86,13 +98,7 @@ class MapleWalkCompiler(CombstructWalkCompiler):
         _package_ensure('maple')
         PATH_TO_MAPLE = _package_info('maple').get('path', '')
 
-        # FIXME: check Python 2/3 compatibility
-        from subprocess import Popen, PIPE
-        output = Popen([PATH_TO_MAPLE, "-q", filename ],
-                       stdout=PIPE,
-                       stderr=open("/dev/null", "w")).communicate()[0]
-
-        return output
+        return _run_process([PATH_TO_MAPLE, "-q", filename ], "maple")
 
     def compile_equations(self):
         try:
@@ -101,7 +107,8 @@ class MapleWalkCompiler(CombstructWalkCompiler):
             # Python 2
             self.__equations_list = super(MapleWalkCompiler,
                                           self).compile_equations()
-        self.__equations = ", \n".join(self.__equations)
+        self.__equations = ", \n".join(self.__equations_list)
+        return self.__equations_list
 
     def compile(self, times, size):
         """
@@ -0,0 +1,202 @@
+# @Date:   2026-10-18-13:10
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: retention.py
+# @Last modified time: 2026-10-18-13:10
+
+# Policies deciding which of the walks generated by a `WalkCompiler` are kept
+# (and returned by its `walks` property): all of them (the historical
+# behavior), none, the last K, or all of them but on disk, in a walk file
+# (see `walkfile.py`). Each call of `generate()` hands its walks, as a list of
+# walks or as a `WalkBatch`, to the `add()` method of the policy.
+
+from collections import deque as _deque
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+
+# ==============================================================================
+
+def _walks_of(chunks):
+    # Flattens chunks (lists of walks, or batches) into a list of walks.
+    walks = []
+    for chunk in chunks:
+        walks += list(chunk)
+    return walks
+
+class KeepAll(object):
+
+    def __init__(self):
+        """
+        Keeps all the walks in memory.
+        """
+        self.__chunks = []
+        self.__count = 0
+
+    def add(self, walks, stepset):
+        self.__chunks.append(walks)
+        self.__count += len(walks)
+
+    @property
+    def walks(self):
+        return _walks_of(self.__chunks)
+
+    def __len__(self):
+        return self.__count
+
+    def clear(self):
+        self.__chunks = []
+        self.__count = 0
+
+class KeepNone(object):
+
+    def __init__(self):
+        """
+        Does not keep any walk.
+        """
+        pass
+
+    def add(self, walks, stepset):
+        pass
+
+    @property
+    def walks(self):
+        return []
+
+    def __len__(self):
+        return 0
+
+    def clear(self):
+        pass
+
+class KeepLast(object):
+
+    def __init__(self, count):
+        """
+        Keeps (in memory) only the last `count` walks, as a ring buffer.
+        """
+        if count < 0:
+            raise ValueError("The number of walks kept must be non-negative.")
+        self.__capacity = count
+        self.__chunks = _deque()
+        self.__count = 0
+
+    def add(self, walks, stepset):
+        if len(walks) == 0:
+            return
+        self.__chunks.append(walks)
+        self.__count += len(walks)
+
+        # Drop the oldest chunks, then trim the oldest remaining one.
+        while self.__count - len(self.__chunks[0]) >= self.__capacity:
+            self.__count -= len(self.__chunks.popleft())
+            if len(self.__chunks) == 0:
+                return
+        excess = self.__count - self.__capacity
+        if excess > 0:
+            first = self.__chunks[0]
+            if isinstance(first, _WalkBatch):
+                # NOTE: A copy (rather than a view) releases the old buffer.
+                first = first.take(range(excess, len(first)))
+            else:
+                first = first[excess:]
+            self.__chunks[0] = first
+            self.__count -= excess
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @property
+    def walks(self):
+        return _walks_of(self.__chunks)
+
+    def __len__(self):
+        return self.__count
+
+    def clear(self):
+        self.__chunks.clear()
+        self.__count = 0
+
+class SpillToFile(object):
+
+    def __init__(self, path, bits=None, metadata=None):
+        """
+        Writes all the walks to the walk file `path` (which is created, or
+        appended to if it exists); `walks` then returns a `WalkFileReader`.
+        """
+        self.__path = path
+        self.__bits = bits
+        self.__metadata = metadata
+        self.__writer = None
+        self.__reader = None
+
+    def __close_reader(self):
+        if self.__reader != None:
+            self.__reader.close()
+            self.__reader = None
+
+    def add(self, walks, stepset):
+        from reluctant_walks.walkfile import WalkFileWriter
+        self.__close_reader()
+        if self.__writer == None:
+            self.__writer = WalkFileWriter(self.__path, stepset=stepset,
+                                           bits=self.__bits,
+                                           metadata=self.__metadata,
+                                           append=True)
+        self.__writer.write(walks)
+
+    def flush(self):
+        """
+        Closes the file being written (so that it is complete on disk); the
+        next walks are appended to it.
+        """
+        if self.__writer != None:
+            self.__writer.close()
+            self.__writer = None
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def walks(self):
+        from reluctant_walks.walkfile import WalkFileReader
+        import os as _os
+        self.flush()
+        if self.__reader == None:
+            if not _os.path.exists(self.__path):
+                return []
+            self.__reader = WalkFileReader(self.__path)
+        return self.__reader
+
+    def __len__(self):
+        if self.__writer != None:
+            return len(self.__writer)
+        return len(self.walks)
+
+    def clear(self):
+        self.flush()
+        self.__close_reader()
+        import os as _os
+        if _os.path.exists(self.__path):
+            _os.remove(self.__path)
+
+    def close(self):
+        self.flush()
+        self.__close_reader()
+
+# ==============================================================================
+
+def make_retention(policy):
+    """
+    Returns a retention policy from `policy`: a policy object, `None` or
+    "all" (keep all the walks), "none", or an integer K (keep the last K).
+    """
+    if policy == None or policy == "all":
+        return KeepAll()
+    if policy == "none":
+        return KeepNone()
+    if isinstance(policy, int) and not isinstance(policy, bool):
+        return KeepLast(policy)
+    if hasattr(policy, "add") and hasattr(policy, "walks"):
+        return policy
+    raise ValueError("Unknown retention policy {!r}.".format(policy))
@@ -6,6 +6,12 @@
 import os as _os
 import platform as _platform
 import subprocess as _subprocess
+try:
+    # Python 3
+    from collections.abc import Mapping as _Mapping
+except ImportError:
+    # Python 2
+    from collections import Mapping as _Mapping
 
 # ==============================================================================
 
@@ -17,6 +23,15 @@ _ENV_GENRGENS_PATH='GENRGENS_PATH'
 
 _BIN_MAPLE_DEFAULT = "/Library/Frameworks/Maple.framework/Versions/{}/bin/maple"
 
+# The result of `detect_env()` is cached on disk, keyed by the environment
+# variables (and interpreter) that can change its outcome; set the variable
+# below to a directory to relocate the cache, or to an empty string to
+# disable it.
+_ENV_CACHE_DIR='RELUCTANT_WALKS_CACHE_DIR'
+_ENV_CACHE_KEYS=('PATH', 'JAVA_HOME', 'SAGE_ROOT', 'PYTHONPATH',
+                 _ENV_MAPLE_PATH, _ENV_BOLTZ_PATH, _ENV_GENRGENS_PATH)
+_ENV_CACHE_VERSION = 1
+
 _STR_UNAVAILABLE_MSG="Requested feature requires '{}', detected as unavailable."
 
 # ==============================================================================
@@ -26,7 +41,37 @@ class UnavailableException(Exception):
 
 # ==============================================================================
 
+def _to_str(value):
+    if isinstance(value, bytes) and not isinstance(value, str):
+        return value.decode("utf-8", "replace")
+    return value
+
+def _package_path():
+    return _os.path.dirname(_os.path.abspath(__file__))
+
+def _which(name):
+    """
+    Looks up an executable on the `PATH`, without spawning a shell.
+    """
+    try:
+        # Python 3
+        from shutil import which
+        return which(name)
+    except ImportError:
+        pass
+
+    # Python 2
+    for folder in _os.environ.get('PATH', '').split(_os.pathsep):
+        candidate = _os.path.join(folder, name)
+        if _os.path.isfile(candidate) and _os.access(candidate, _os.X_OK):
+            return candidate
+    return None
+
 def detect_env():
+    """
+    Probes the environment for the optional dependencies (Sage, Java, Maple,
+    GenRGenS). This is relatively slow, see `load_env()` for a cached version.
+    """
 
     info = {}
 
@@ -61,9 +106,6 @@ def detect_env():
                 "Sage present, but seems broken (sage.all not found): {}".format(e)
                 )
 
-    # Detect availability of "which"
-    has_which = (_os.system("which which 1> /dev/null 2> /dev/null") == 0)
-
     # Detect availability of Java/JRE/JDK
     java_info['available'] = False
 
@@ -83,35 +125,32 @@ def detect_env():
             # If error code is 1 (or more) then no VM available
             java_info['available'] = False
             java_info['error'] = 5
-            java_info['message'] = e.output
+            java_info['message'] = _to_str(e.output)
 
     if 'error' not in java_info:
 
         if _os.environ.get('JAVA_HOME', "") != "":
             java_info['available'] = True
 
-        if has_which:
-            if _os.system("which java 1> /dev/null 2> /dev/null") == 0:
-                java_info['available'] = True
-                java_info['path'] = _subprocess.check_output(
-                    "which java", shell=True)
-
-                # Remove whitespace if any
-                if java_info['path'] != None:
-                    java_info['path'] = java_info['path'].strip()
-            else:
-                java_info['available'] = False
+        java_path = _which("java")
+        if java_path != None:
+            java_info['available'] = True
+            java_info['path'] = java_path
+        else:
+            java_info['available'] = False
 
 
     # Detect availability of Maple
-    maple_info['available'] = has_which and (
-        _os.system("which maple 1> /dev/null 2> /dev/null") == 0)
+    maple_path = _which("maple")
+    maple_info['available'] = (maple_path != None)
+    if maple_info['available']:
+        maple_info['path'] = maple_path
 
     if not maple_info['available'] and _os.environ.get(_ENV_MAPLE_PATH, '') != '':
         # Check environment variable
         maple_path = _os.environ.get(_ENV_MAPLE_PATH, '')
 
-        if file.exists(maple_path):
+        if _os.path.exists(maple_path):
             maple_info['available'] = True
             maple_info['path'] = maple_path
 
@@ -139,26 +178,26 @@ def detect_env():
 
     # Detect GenRGenS' availability
     genrgens_info['available'] = False
-    import reluctant_walks as _rw
+    package_path = _package_path()
 
     # Look for the .jar file
     _opa = lambda s: s
     if _MAKE_ABS:
         _opa = _os.path.abspath
 
-    files_a = _os.listdir(_os.path.join(_rw.__path__[0], "."))
-    files_b = _os.listdir(_os.path.join(_rw.__path__[0], ".."))
+    files_a = _os.listdir(_os.path.join(package_path, "."))
+    files_b = _os.listdir(_os.path.join(package_path, ".."))
     tmp_lambda = (lambda x: "GenRGenS" in x and "-bin.jar" in x)
     files_a = list(filter(tmp_lambda, files_a))
     files_b = list(filter(tmp_lambda, files_b))
     if len(files_a) > 0:
         genrgens_info['available'] = True
         genrgens_info['path'] = _os.path.join(_opa(
-            _os.path.join(_rw.__path__[0], ".")), files_a[0])
+            _os.path.join(package_path, ".")), files_a[0])
     if len(files_b) > 0:
         genrgens_info['available'] = True
         genrgens_info['path'] = _os.path.join(_opa(
-            _os.path.join(_rw.__path__[0], "..")), files_b[0])
+            _os.path.join(package_path, "..")), files_b[0])
 
     if _os.environ.get(_ENV_GENRGENS_PATH, '') != '':
         s = _os.environ.get(_ENV_GENRGENS_PATH)
@@ -177,7 +216,124 @@ def detect_env():
 
     return info
 
-SETUP_INFO = detect_env()
+# ==============================================================================
+
+def _env_cache_path():
+    cache_dir = _os.environ.get(_ENV_CACHE_DIR, None)
+    if cache_dir == None:
+        cache_dir = _os.environ.get('XDG_CACHE_HOME', '') or \
+            _os.path.join(_os.path.expanduser("~"), ".cache")
+        cache_dir = _os.path.join(cache_dir, "reluctant_walks")
+    if cache_dir == '':
+        return None
+
+    import hashlib as _hashlib
+    import sys as _sys
+
+    # Anything that may change the outcome of the probe is part of the key:
+    # environment variables, the interpreter and the folders searched for
+    # the GenRGenS archive (through their modification time).
+    package_path = _package_path()
+    key_items = [str(_ENV_CACHE_VERSION), _sys.executable, package_path,
+                 _platform.system()]
+    key_items += [_os.environ.get(k, '') for k in _ENV_CACHE_KEYS]
+    for folder in (package_path, _os.path.join(package_path, "..")):
+        try:
+            key_items.append(repr(_os.stat(folder).st_mtime))
+        except OSError:
+            key_items.append('')
+    key = _hashlib.sha1("\0".join(key_items).encode("utf-8")).hexdigest()
+
+    return _os.path.join(cache_dir, "env-{}.json".format(key[:16]))
+
+def _env_cache_valid(info):
+    # Binaries may have been uninstalled since the probe was cached.
+    for pkg_info in info.values():
+        path = pkg_info.get('path', None)
+        if pkg_info.get('available', False) and path != None:
+            if not _os.path.exists(path):
+                return False
+    return True
+
+def load_env(use_cache=True, refresh=False):
+    """
+    Returns the result of `detect_env()`, reusing the result of a previous
+    probe cached on disk if the environment has not changed since.
+    """
+    import json as _json
+
+    cache_path = _env_cache_path() if use_cache else None
+
+    if cache_path != None and not refresh:
+        try:
+            with open(cache_path) as f:
+                info = _json.load(f)
+            if _env_cache_valid(info):
+                return info
+        except (IOError, OSError, ValueError):
+            pass
+
+    info = detect_env()
+
+    if cache_path != None:
+        # Best effort: a read-only home directory should not prevent the
+        # package from working.
+        try:
+            import tempfile as _tempfile
+            cache_dir = _os.path.dirname(cache_path)
+            if not _os.path.isdir(cache_dir):
+                _os.makedirs(cache_dir)
+            (fd, tmp_path) = _tempfile.mkstemp(dir=cache_dir)
+            with _os.fdopen(fd, "w") as f:
+                _json.dump(info, f)
+            _os.rename(tmp_path, cache_path)
+        except (IOError, OSError, TypeError, ValueError):
+            pass
+
+    return info
+
+class _LazySetupInfo(_Mapping):
+    """
+    Read-only mapping that only probes the environment (see `load_env()`)
+    the first time it is accessed.
+    """
+
+    def __init__(self):
+        self.__info = None
+
+    def __load(self):
+        if self.__info == None:
+            self.__info = load_env()
+        return self.__info
+
+    def refresh(self, use_cache=True):
+        """
+        Probes the environment again, and (unless `use_cache` is false)
+        replaces the cached result on disk, which other processes read: the
+        cache cannot tell that a dependency has been installed since.
+        """
+        self.__info = load_env(use_cache=use_cache, refresh=True)
+        return self
+
+    @property
+    def loaded(self):
+        return self.__info != None
+
+    def __getitem__(self, key):
+        return self.__load()[key]
+
+    def __iter__(self):
+        return iter(self.__load())
+
+    def __len__(self):
+        return len(self.__load())
+
+    def __repr__(self):
+        if not self.loaded:
+            return "<SETUP_INFO (not probed yet)>"
+        return repr(self.__info)
+
+SETUP_INFO = _LazySetupInfo()
 
 # ==============================================================================
 
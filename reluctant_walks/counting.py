@@ -0,0 +1,1333 @@
+# @Date:   2026-10-18-13:40
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: counting.py
+# @Last modified time: 2026-10-18-13:40
+
+# Dense count tables for the recursive sampler. The table of
+# `reference.naive_random_generation_precompute` maps `(x, y, i)` to the
+# number of walks of size `i` that start at `(x, y)` and remain in the region;
+# it is a `dict` of Python integers, which is large, slow to build, and which
+# each process of a parallel sampler would have to rebuild (or unpickle).
+#
+# A `DenseCountTable` stores the same counts in a `numpy` array indexed by
+# `[i, x - x0, y - y0]` (exactly, as `int64`, when they fit, and as `float64`
+# otherwise, which is enough to sample); like the `dict`, it is only filled, for
+# each size `i`, over the frontier of the points from which the walks drawn
+# from the origin can continue. It can be published in shared memory
+# (or in a memory-mapped file), to which other processes attach read-only and
+# without copy:
+#
+#     table = DenseCountTable.compute(stepset, length)
+#     handle = table.share()                  # in the parent process
+#     ...
+#     table = DenseCountTable.attach(handle)  # in each worker
+#     batch = table.sample(stepset, 1000)
+#
+# `tabulate_exact()` counts walks exactly, however long, with `int64` arrays
+# (modulo several primes, combined by the Chinese remainder theorem).
+#
+# An `IncrementalCountTable` counts the walks from the origin by endpoint
+# instead, so that it can be extended to longer walks (and saved and resumed)
+# without computing the shorter ones again; the walks are drawn backwards.
+
+import collections as _collections
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.batch import _numpy
+import reluctant_walks.instrumentation as _instrumentation
+
+# ==============================================================================
+
+# What a process needs to attach to a shared table (this is picklable): the
+# kind of storage ("shm" or "mmap"), its name (or path), the layout, and the
+# region of the walks (if it is not the quarter plane).
+SharedTableHandle = _collections.namedtuple(
+    "SharedTableHandle", ["kind", "name", "shape", "dtype", "origin",
+                          "frontier", "exponents", "rounding", "region"])
+
+def _shared_memory():
+    # Returns the `multiprocessing.shared_memory` module (Python 3.8+), or
+    # `None` if it is not available.
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        return None
+    return shared_memory
+
+def _open_shared_memory(name):
+    # Attaches to an existing segment, without tracking it (only the process
+    # that created it destroys it).
+    # NOTE: Before Python 3.13, the segment is also registered with the
+    # resource tracker, which is harmless for the workers of a pool (they
+    # share the tracker of their parent).
+    shared_memory = _shared_memory()
+    try:
+        # Python 3.13+
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _shift_add(curr, prev, dx, dy):
+    # curr[x, y] += prev[x + dx, y + dy], for the cells where both exist (the
+    # arrays may have different shapes).
+    (w, h) = curr.shape
+    (pw, ph) = prev.shape
+    (x0, x1) = (max(0, -dx), min(w, pw - dx))
+    (y0, y1) = (max(0, -dy), min(h, ph - dy))
+    if x0 >= x1 or y0 >= y1:
+        return
+    curr[x0:x1, y0:y1] += prev[x0 + dx:x1 + dx, y0 + dy:y1 + dy]
+
+def _tabulate(deltas, side, length, output, dtype, modulus=None):
+    # Counts the walks of the steps `deltas` (pairs of coordinates) from the
+    # origin that remain in the box of side `side`, size after size, by
+    # adding shifted slices of the previous layer (modulo `modulus`, if
+    # given); see `reference.tabulate_all_walks`. Returns the result and the
+    # number of cells updated.
+    np = _numpy()
+    east = max(0, max(map(lambda d: d[0], deltas)))
+    north = max(0, max(map(lambda d: d[1], deltas)))
+
+    (prev, curr) = (np.zeros((side, side), dtype=dtype),
+                    np.zeros((side, side), dtype=dtype))
+    if side > 0:
+        curr[0, 0] = 1
+    totals = np.zeros(length + 1, dtype=dtype)
+    totals[0] = curr.sum()
+    if output == "layers":
+        layers = np.zeros((length + 1, side, side), dtype=dtype)
+        layers[0] = curr
+
+    cells = 0
+    for step in range(length):
+        (prev, curr) = (curr, prev)
+        # The walks of size `step + 1` are within this window.
+        (w, h) = (min(side, east*(step+1) + 1), min(side, north*(step+1) + 1))
+        window = curr[:w, :h]
+        window[...] = 0
+        for (dx, dy) in deltas:
+            _shift_add(window, prev[:w, :h], -dx, -dy)
+        if modulus != None:
+            window %= modulus
+            totals[step + 1] = window.sum() % modulus
+        else:
+            totals[step + 1] = window.sum()
+        if output == "layers":
+            layers[step + 1, :w, :h] = window
+        cells += w * h
+
+    if output == "layers":
+        return (layers, cells)
+    if output == "totals":
+        return (totals, cells)
+    return (curr, cells)
+
+# ==============================================================================
+# Exact counting
+#
+# The counts of the walks of size `n` are at most `|S|^n`: when this bound is
+# below 2^63, they are computed directly as `int64`. Otherwise, the same
+# computation is done (with `int64` arrays) modulo primes below 2^31, whose
+# product exceeds the bound, one prime per process; the counts are then
+# reconstructed from their residues by the Chinese remainder theorem.
+
+_MODULAR_BITS = 31
+
+def fits_int64(stepset, length):
+    """
+    Returns whether the number of walks of `stepset` of size `length` (in any
+    region) provably fits in an `int64`.
+    """
+    return len(list(stepset)) ** length < 2**63
+
+def _is_prime(n):
+    # Deterministic Miller-Rabin test for n < 3,215,031,751.
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7):
+        if n % p == 0:
+            return n == p
+    (d, r) = (n - 1, 0)
+    while d % 2 == 0:
+        (d, r) = (d // 2, r + 1)
+    for a in (2, 3, 5, 7):
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+__primes = []
+
+def modular_primes(bound):
+    """
+    Returns the largest primes below 2^31, as few as needed for their product
+    to exceed `bound`.
+    """
+    (primes, product) = ([], 1)
+    for p in __primes:
+        if product > bound:
+            break
+        primes.append(p)
+        product *= p
+    candidate = (__primes[-1] if __primes else 2**_MODULAR_BITS + 1) - 2
+    while product <= bound:
+        if _is_prime(candidate):
+            __primes.append(candidate)
+            primes.append(candidate)
+            product *= candidate
+        candidate -= 2
+    return primes
+
+def crt(residues, primes):
+    """
+    Reconstructs the integers (in `[0, prod(primes))`) whose residues modulo
+    `primes` are the arrays `residues` (of the same shape), as an array of
+    Python integers; only the non-zero values go through big integers. The
+    mixed-radix digits (Garner's algorithm) are computed with `int64` arrays.
+    """
+    np = _numpy()
+    residues = list(map(lambda r: np.asarray(r, dtype=np.int64), residues))
+    shape = residues[0].shape
+    result = np.zeros(shape, dtype=object)
+    nonzero = np.zeros(shape, dtype=bool)
+    for r in residues:
+        nonzero |= r != 0
+    digits = []
+    for (j, p) in enumerate(primes):
+        t = residues[j][nonzero]
+        for (i, q) in enumerate(primes[:j]):
+            t = (t - digits[i] % p) % p * pow(q % p, p - 2, p) % p
+        digits.append(t)
+    values = np.zeros(int(nonzero.sum()), dtype=object)
+    for (digit, p) in reversed(list(zip(digits, primes))):
+        values = values * p + digit.astype(object)
+    result[nonzero] = values
+    return result
+
+def _tabulate_modulo(args):
+    # Worker of `tabulate_exact()` (at the top level, so that it can be
+    # pickled).
+    (deltas, side, length, output, modulus) = args
+    np = _numpy()
+    return _tabulate(deltas, side, length, output, np.int64, modulus)[0]
+
+@_instrumentation.timed("counting.tabulate_exact")
+def tabulate_exact(stepset, side, length, output="final", jobs=1):
+    """
+    Exact version of `reference.tabulate_all_walks`: returns `int64` counts
+    if they provably fit (see `fits_int64()`), and otherwise Python integers
+    (in an array of objects) computed modulo several primes (in `jobs`
+    processes) and reconstructed with `crt()`.
+    """
+    np = _numpy()
+    deltas = list(map(lambda s: (s.x, s.y), stepset))
+    if fits_int64(stepset, length):
+        return _tabulate(deltas, side, length, output, np.int64)[0]
+
+    primes = modular_primes(len(deltas) ** length)
+    tasks = [ (deltas, side, length, output, p) for p in primes ]
+    if jobs == None or jobs <= 1:
+        residues = list(map(_tabulate_modulo, tasks))
+    else:
+        import multiprocessing as _multiprocessing
+        pool = _multiprocessing.Pool(processes=min(jobs, len(tasks)))
+        try:
+            residues = pool.map(_tabulate_modulo, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    _instrumentation.count("counting.tabulate_exact", primes=len(primes))
+    return crt(residues, primes)
+
+# ==============================================================================
+# Unconstrained endpoints
+#
+# The number of unconstrained walks of size `n` that end at `(x, y)` is the
+# coefficient of `x^i y^j` in `P(x, y)^n`, where `P` is the inventory
+# polynomial of the steps (see `StepSet.solve_inventory_equation()`). It is
+# computed by repeated squaring, with 2-D convolutions by FFT: in floating
+# point (for the distribution), or exactly modulo primes below 2^31 (whose
+# residues are split in pieces of `_PIECE_BITS` bits, or `_SMALL_PIECE_BITS`
+# bits when the operands have more than `_LARGE_CELLS` cells, so that the
+# products of the FFT remain exact once rounded, which is checked), combined
+# with `crt()`.
+
+_PIECE_BITS = 8
+_SMALL_PIECE_BITS = 5
+_LARGE_CELLS = 1 << 20
+
+def _fast_length(n):
+    # The smallest integer at least `n` whose prime factors are 2, 3 and 5.
+    best = 1
+    while best < n:
+        best *= 2
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            m = p35
+            while m < n:
+                m *= 2
+            best = min(best, m)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+def _convolve_spectra(spectra_a, spectra_b, shape, fft_shape):
+    # The products of all the pairs of pieces, grouped by the sum of their
+    # indices, transformed back.
+    np = _numpy()
+    results = []
+    for k in range(len(spectra_a) + len(spectra_b) - 1):
+        total = 0
+        for i in range(max(0, k - len(spectra_b) + 1),
+                       min(k, len(spectra_a) - 1) + 1):
+            total = total + spectra_a[i] * spectra_b[k - i]
+        results.append(np.fft.irfft2(total, fft_shape)[:shape[0], :shape[1]])
+    return results
+
+def _convolve(a, b, modulus=None):
+    # The 2-D (full) convolution of `a` and `b`, as floats, or modulo
+    # `modulus` (as `int64`).
+    np = _numpy()
+    shape = (a.shape[0] + b.shape[0] - 1, a.shape[1] + b.shape[1] - 1)
+    fft_shape = (_fast_length(shape[0]), _fast_length(shape[1]))
+    if modulus == None:
+        (fa, fb) = (np.fft.rfft2(a, fft_shape), np.fft.rfft2(b, fft_shape))
+        return _convolve_spectra([fa], [fb], shape, fft_shape)[0]
+
+    # The sums of products of pieces grow with the number of terms.
+    bits = _PIECE_BITS if min(a.size, b.size) <= _LARGE_CELLS else \
+           _SMALL_PIECE_BITS
+
+    def pieces(c):
+        mask = (1 << bits) - 1
+        count = -(-modulus.bit_length() // bits)
+        return [ np.fft.rfft2(((c >> (bits * k)) & mask)
+                              .astype(np.float64), fft_shape)
+                 for k in range(count) ]
+
+    spectra_a = pieces(a)
+    spectra_b = spectra_a if b is a else pieces(b)
+    result = np.zeros(shape, dtype=np.int64)
+    for (k, c) in enumerate(_convolve_spectra(spectra_a, spectra_b, shape,
+                                              fft_shape)):
+        # NOTE: Beyond 2^52, all the floats are integers (and the rounding
+        # errors are not visible).
+        rounded = np.rint(c)
+        if c.size > 0 and (np.abs(c).max() >= 2**52 or
+                           np.abs(c - rounded).max() >= 0.25):
+            raise ArithmeticError("The FFT is not precise enough to count "
+                                  "exactly (operands of {} and {} cells)."
+                                  .format(a.size, b.size))
+        c = rounded.astype(np.int64) % modulus
+        result = (result + c * pow(2, bits * k, modulus)) % modulus
+    return result
+
+def _inventory(deltas, dtype):
+    # The coefficients of the inventory polynomial, from its lowest point.
+    np = _numpy()
+    (x0, y0) = (min(map(lambda d: d[0], deltas)),
+                min(map(lambda d: d[1], deltas)))
+    shape = (max(map(lambda d: d[0], deltas)) - x0 + 1,
+             max(map(lambda d: d[1], deltas)) - y0 + 1)
+    base = np.zeros(shape, dtype=dtype)
+    for (dx, dy) in deltas:
+        base[dx - x0, dy - y0] += 1
+    return (base, (x0, y0))
+
+def _power(base, length, modulus=None):
+    # `base` to the power `length` (for the 2-D convolution).
+    result = None
+    while length > 0:
+        if length & 1:
+            result = base if result is None else \
+                     _convolve(result, base, modulus)
+        length >>= 1
+        if length > 0:
+            base = _convolve(base, base, modulus)
+    return result
+
+def _unconstrained_modulo(args):
+    # Worker of `unconstrained_endpoints()` (at the top level, so that it can
+    # be pickled).
+    (deltas, length, modulus) = args
+    np = _numpy()
+    return _power(_inventory(deltas, np.int64)[0] % modulus, length, modulus)
+
+@_instrumentation.timed("counting.unconstrained_endpoints")
+def unconstrained_endpoints(stepset, length, exact=False, jobs=1):
+    """
+    Returns `(counts, origin)`, where `counts[x - x0, y - y0]` is the number
+    of unconstrained walks of `stepset` of size `length` that end at `(x, y)`,
+    and `origin` is `(x0, y0)`. By default, `counts` are the probabilities of
+    the endpoints (in floating point: the values below about 10^-13 times the
+    largest one are rounding noise, set to 0 when negative); with `exact`,
+    they are the exact numbers, as `int64` if they provably fit (see
+    `fits_int64()`), and as Python integers otherwise (computed modulo
+    several primes, in `jobs` processes).
+    """
+    np = _numpy()
+    deltas = list(map(lambda s: (s.x, s.y), stepset))
+    if length == 0:
+        return (np.ones((1, 1), dtype=np.int64 if exact else np.float64),
+                (0, 0))
+    (base, (x0, y0)) = _inventory(deltas, np.float64)
+    origin = (x0 * length, y0 * length)
+
+    if not exact:
+        counts = _power(base / len(deltas), length)
+        counts[counts < 0] = 0
+        return (counts, origin)
+
+    primes = modular_primes(len(deltas) ** length)
+    tasks = [ (deltas, length, p) for p in primes ]
+    if jobs == None or jobs <= 1:
+        residues = list(map(_unconstrained_modulo, tasks))
+    else:
+        import multiprocessing as _multiprocessing
+        pool = _multiprocessing.Pool(processes=min(jobs, len(tasks)))
+        try:
+            residues = pool.map(_unconstrained_modulo, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    _instrumentation.count("counting.unconstrained_endpoints",
+                           primes=len(primes))
+    counts = crt(residues, primes)
+    if fits_int64(stepset, length):
+        counts = counts.astype(np.int64)
+    return (counts, origin)
+
+# ==============================================================================
+# Floating-point counts
+
+def _ldexp_int(value, exponent):
+    # float(value * 2**exponent), for an integer `value` of any size.
+    import math as _math
+    shift = max(0, value.bit_length() - 64)
+    return _math.ldexp(float(value >> shift), shift + exponent)
+
+def _region_masks(region, origin, shape):
+    # Boolean arrays of the points of the box of `shape` from `origin` that
+    # are in the region (`test_function`) and where the walks may end
+    # (`end_position`); `None` means the quarter plane, and anywhere in it.
+    np = _numpy()
+    (test_function, end_position) = region
+    (xs, ys) = (np.arange(shape[0]) + origin[0], np.arange(shape[1]) + origin[1])
+    if test_function == None:
+        inside = (xs[:, None] >= 0) & (ys[None, :] >= 0)
+    else:
+        inside = np.array([ [ bool(test_function(x, y)) for y in ys.tolist() ]
+                            for x in xs.tolist() ], dtype=bool)
+        inside = inside.reshape(shape)
+    if end_position == None:
+        ends = inside
+    else:
+        ends = np.array([ [ bool(end_position(x, y)) for y in ys.tolist() ]
+                          for x in xs.tolist() ], dtype=bool)
+        ends = ends.reshape(shape) & inside
+    return (inside, ends)
+
+def exact_counter(stepset, test_function=None, end_position=None):
+    """
+    Returns a function mapping `i` and a list of points to the exact numbers
+    (Python integers) of walks of size `i` from these points, which remain
+    in the region of `test_function` and end at a point of `end_position`
+    (by default, the quarter plane). It runs the dynamic programming over
+    the box that the walks from these points can reach, with arrays of
+    Python integers, which is slow; it is meant for the few choices of
+    `DenseCountTable.sample()` that floating-point counts cannot decide.
+    """
+    steps = list(stepset)
+    east = max(0, max(map(lambda s: s.x, steps)))
+    north = max(0, max(map(lambda s: s.y, steps)))
+    west = max(0, -min(map(lambda s: s.x, steps)))
+    south = max(0, -min(map(lambda s: s.y, steps)))
+    region = (test_function, end_position)
+
+    def count(i, points):
+        np = _numpy()
+        xs = list(map(lambda p: p[0], points))
+        ys = list(map(lambda p: p[1], points))
+        (x0, y0) = (min(xs) - west * i, min(ys) - south * i)
+        shape = (max(xs) + east * i - x0 + 1, max(ys) + north * i - y0 + 1)
+        (inside, ends) = _region_masks(region, (x0, y0), shape)
+        curr = np.zeros(shape, dtype=object)
+        curr[ends] = 1
+        for _ in range(i):
+            # NOTE: The counts near the border of the box are wrong (some of
+            # their steps leave the box), but not those of the points, which
+            # are `i` steps away from it.
+            prev = curr
+            curr = np.zeros(shape, dtype=object)
+            for s in steps:
+                _shift_add(curr, prev, s.x, s.y)
+            curr[~inside] = 0
+        return [ int(curr[x - x0, y - y0]) for (x, y) in points ]
+
+    return count
+
+def _exact_choice(u, weights):
+    # Returns the index `s` such that `u * W` (with `W` the sum of the exact
+    # `weights`) is between the sums of the first `s` and `s + 1` weights,
+    # where `u` is the random float (with 53 random bits) that was drawn, to
+    # which more random bits are appended until the choice is certain.
+    import random as _random
+    bits = 53
+    k = int(u * 2**bits)
+    total = sum(weights)
+    while True:
+        # `u * W` is in `[k * W, (k + 1) * W) / 2**bits`.
+        (low, high) = (k * total, (k + 1) * total)
+        cumulated = 0
+        for (s, weight) in enumerate(weights):
+            (start, cumulated) = (cumulated, cumulated + weight)
+            if weight > 0 and (start << bits) <= low and \
+                    high <= (cumulated << bits):
+                return s
+        k = (k << 64) | _random.getrandbits(64)
+        bits += 64
+
+# ==============================================================================
+
+class DenseCountTable(object):
+
+    def __init__(self, counts, origin=(0, 0), storage=None, frontier=None,
+                 exponents=None, rounding=0, region=None):
+        """
+        Wraps the array `counts`, where `counts[i, x - x0, y - y0]` is the
+        number of walks of size `i` starting at `(x, y)` (times `2 **
+        -exponents[i]`, if `exponents` is given), and `origin` is `(x0,
+        y0)`; `storage` is the shared memory or file that holds the array,
+        if any. If `frontier` is `(east, north, west, south)`, the counts of
+        size `i` are only filled for `-west * (length - i) <= x <= east *
+        (length - i)` (and likewise for `y`); the other ones are 0. The
+        floating-point counts of size `i` have a relative error of at most
+        `(rounding * i + 1)` units in the last place (see `error_bound()`).
+        `region` is the pair `(test_function, end_position)` of the region
+        of the walks, if it is not the quarter plane.
+        """
+        self.__counts = counts
+        self.__origin = tuple(origin)
+        self.__storage = storage
+        self.__owner = False
+        self.__frontier = None if frontier == None else tuple(frontier)
+        self.__exponents = None if exponents is None else \
+                           list(map(int, exponents))
+        self.__rounding = rounding
+        self.__region = region
+
+    # ==========================================================================
+    # Construction
+
+    @classmethod
+    @_instrumentation.timed("counting.compute")
+    def compute(cls, stepset, length, dtype=None, frontier=True, scaled=None,
+                test_function=None, end_position=None):
+        """
+        Computes the table of the walks of `stepset` of size at most `length`
+        in the quarter plane, or in the region of `test_function` and ending
+        at a point of `end_position` (like `naive_random_generation_precompute`,
+        whose arguments these are). The counts are stored as `int64` if they
+        fit, and as `float64` otherwise (unless `dtype` is given). If
+        `frontier` is set, the counts of size `i` are only computed for the
+        points reachable from the origin in `length - i` steps (enough to
+        sample from the origin), which is about a third of the work.
+
+        Floating-point counts are rescaled (if `scaled` is set, which is the
+        default for them) by a power of 2 for each size, so that the largest
+        count of each size is between 1/2 and 1: they never overflow, and
+        keep a relative error of at most `(|S| - 1) * i + 1` units in the
+        last place for the size `i` (the counts are sums of non-negative
+        terms, and the rescaling is exact), except for those smaller than
+        2^-1022 times the largest count of their size, which lose precision
+        (the walks drawn from the origin reach them with negligible
+        probability).
+        """
+        np = _numpy()
+        steps = list(stepset)
+        if dtype == None:
+            dtype = np.int64 if len(steps) ** length < 2**63 else np.float64
+        dtype = np.dtype(dtype)
+        if scaled == None:
+            scaled = dtype.kind == "f"
+        if scaled and dtype.kind != "f":
+            raise ValueError("Only floating-point counts can be rescaled.")
+
+        # The walks started from the origin never go further than this.
+        east = max(0, max(map(lambda s: s.x, steps)))
+        north = max(0, max(map(lambda s: s.y, steps)))
+        (west, south) = (0, 0)
+        region = None
+        if test_function != None or end_position != None:
+            region = (test_function, end_position)
+            west = max(0, -min(map(lambda s: s.x, steps)))
+            south = max(0, -min(map(lambda s: s.y, steps)))
+        (x0, y0) = (-west * length, -south * length)
+        (width, height) = ((east + west) * length + 1,
+                           (north + south) * length + 1)
+
+        counts = np.zeros((length + 1, width, height), dtype=dtype)
+        if region == None:
+            counts[0] = 1
+            inside = None
+        else:
+            (inside, ends) = _region_masks(region, (x0, y0), (width, height))
+            counts[0][inside & ends] = 1
+
+        exponents = np.zeros(length + 1, dtype=np.int64) if scaled else None
+        cells = width * height
+        for i in range(1, length + 1):
+            # The window of the points reachable in `length - i` steps, and
+            # the part of the previous layer that it needs.
+            (a, b, c, d) = (0, width, 0, height)
+            if frontier:
+                r = length - i
+                (a, b) = (-x0 - west * r, -x0 + east * r + 1)
+                (c, d) = (-y0 - south * r, -y0 + north * r + 1)
+            (pa, pc) = (max(0, a - west), max(0, c - south))
+            window = counts[i, a:b, c:d]
+            for s in steps:
+                _shift_add(window, counts[i-1, pa:, pc:],
+                           s.x + a - pa, s.y + c - pc)
+            if inside is not None:
+                window *= inside[a:b, c:d]
+            if scaled:
+                largest = window.max() if window.size > 0 else 0
+                if largest > 0:
+                    exponent = int(np.frexp(largest)[1])
+                    window[...] = np.ldexp(window, -exponent)
+                    exponents[i] = exponents[i-1] + exponent
+                else:
+                    exponents[i] = exponents[i-1]
+            cells += (b - a) * (d - c)
+
+        _instrumentation.count("counting.compute", cells=cells)
+        return cls(counts, origin=(x0, y0),
+                   frontier=(east, north, west, south) if frontier else None,
+                   exponents=exponents,
+                   rounding=(len(steps) - 1) if dtype.kind == "f" else 0,
+                   region=region)
+
+    @classmethod
+    def from_dict(cls, tab, dtype=None):
+        """
+        Converts a table computed by `naive_random_generation_precompute`
+        (whatever its region).
+        """
+        np = _numpy()
+        keys = list(tab.keys())
+        (x0, x1) = (min(k[0] for k in keys), max(k[0] for k in keys))
+        (y0, y1) = (min(k[1] for k in keys), max(k[1] for k in keys))
+        length = max(k[2] for k in keys)
+        if dtype == None:
+            dtype = np.int64 if max(tab.values()) < 2**63 else np.float64
+
+        counts = np.zeros((length + 1, x1 - x0 + 1, y1 - y0 + 1), dtype=dtype)
+        exponents = None
+        if np.dtype(dtype).kind == "f":
+            # Rescales each size by a power of 2 (see `compute()`).
+            exponents = [0] * (length + 1)
+            for ((x, y, i), value) in tab.items():
+                exponents[i] = max(exponents[i], int(value).bit_length())
+            for ((x, y, i), value) in tab.items():
+                counts[i, x - x0, y - y0] = _ldexp_int(value, -exponents[i])
+        else:
+            for ((x, y, i), value) in tab.items():
+                counts[i, x - x0, y - y0] = value
+        return cls(counts, origin=(x0, y0), exponents=exponents)
+
+    # ==========================================================================
+    # Access
+
+    @property
+    def counts(self):
+        return self.__counts
+
+    @property
+    def origin(self):
+        return self.__origin
+
+    @property
+    def length(self):
+        return self.__counts.shape[0] - 1
+
+    @property
+    def dtype(self):
+        return self.__counts.dtype
+
+    @property
+    def nbytes(self):
+        return self.__counts.nbytes
+
+    @property
+    def is_exact(self):
+        return self.__counts.dtype.kind in "iu"
+
+    @property
+    def frontier(self):
+        return self.__frontier
+
+    @property
+    def exponents(self):
+        """
+        The power of 2 by which the counts of each size are multiplied (or
+        `None` if they are not rescaled).
+        """
+        return self.__exponents
+
+    def error_bound(self, i):
+        """
+        Bound on the relative error of the counts of size `i` (as floats).
+        """
+        import sys as _sys
+        epsilon = _sys.float_info.epsilon / 2
+        return 1.01 * (self.__rounding * i + 1) * epsilon
+
+    def __getitem__(self, key):
+        """
+        Returns the count of `(x, y, i)` (0 outside of the table), so that
+        the table can replace the `dict` of the reference implementation
+        (rescaled counts are returned as floats, which may be infinite; see
+        `log2()`).
+        """
+        import math as _math
+        (x, y, i) = key
+        (x, y) = (x - self.__origin[0], y - self.__origin[1])
+        (layers, width, height) = self.__counts.shape
+        if 0 <= x < width and 0 <= y < height and 0 <= i < layers:
+            value = self.__counts[i, x, y].item()
+            if self.__exponents != None:
+                try:
+                    return _math.ldexp(value, self.__exponents[i])
+                except OverflowError:
+                    return float("inf")
+            return value
+        return 0
+
+    def log2(self, key):
+        """
+        Returns the base-2 logarithm of the count of `(x, y, i)` (`-inf` if
+        it is 0), which is finite even when the count is not.
+        """
+        import math as _math
+        (x, y, i) = key
+        (x, y) = (x - self.__origin[0], y - self.__origin[1])
+        (layers, width, height) = self.__counts.shape
+        if not (0 <= x < width and 0 <= y < height and 0 <= i < layers):
+            return float("-inf")
+        value = self.__counts[i, x, y].item()
+        if value <= 0:
+            return float("-inf")
+        exponent = self.__exponents[i] if self.__exponents != None else 0
+        return _math.log(value, 2) + exponent
+
+    def __contains__(self, key):
+        return self[key] != 0
+
+    def lookup(self, i, x, y):
+        """
+        Returns the counts of the walks of size `i` starting at the points of
+        the arrays `x` and `y` (0 outside of the table), as stored (that is,
+        times `2 ** -exponents[i]` if the counts are rescaled).
+        """
+        np = _numpy()
+        (x, y) = (x - self.__origin[0], y - self.__origin[1])
+        (_, width, height) = self.__counts.shape
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        result = np.zeros(len(x), dtype=self.__counts.dtype)
+        result[inside] = self.__counts[i][x[inside], y[inside]]
+        return result
+
+    # ==========================================================================
+    # Sampling
+
+    def sample(self, stepset, num_walks, length=None, start=(0, 0),
+               exact=None):
+        """
+        Draws `num_walks` walks of size `length` (by default, that of the
+        table) from `start`, uniformly among those counted by the table, and
+        returns them as a `WalkBatch`. All the walks are drawn together, one
+        step at a time. The random numbers are seeded from `random`.
+
+        Each step is chosen by comparing a random float to the cumulated
+        (floating-point) counts of the possible steps. If `exact` is given,
+        the choices that are too close to call (given `error_bound()`) are
+        made again with the exact counts, which makes the distribution
+        exactly uniform: `exact` is a function mapping `i` and a list of
+        points to the exact counts of size `i` from these points, or `True`
+        for `exact_counter()` on the region of the table.
+        """
+        np = _numpy()
+        import random as _random
+        if length == None:
+            length = self.length
+        if length > self.length:
+            raise ValueError("The table only counts walks of size at most "
+                             "{}.".format(self.length))
+        if exact == True:
+            (test_function, end_position) = self.__region or (None, None)
+            exact = exact_counter(stepset, test_function, end_position)
+
+        steps = list(stepset)
+        dx = np.array(list(map(lambda s: s.x, steps)), dtype=np.int64)
+        dy = np.array(list(map(lambda s: s.y, steps)), dtype=np.int64)
+        rng = np.random.RandomState(_random.getrandbits(32))
+
+        x = np.full(num_walks, start[0], dtype=np.int64)
+        y = np.full(num_walks, start[1], dtype=np.int64)
+        if self.__frontier != None:
+            (east, north, west, south) = self.__frontier
+            r = self.length - length
+            if not (-west * r <= start[0] <= east * r and
+                    -south * r <= start[1] <= north * r):
+                raise ValueError("The table does not hold the counts of the "
+                                 "walks of size {} from {}.".format(length,
+                                                                    start))
+        if num_walks > 0 and self.lookup(length, x[:1], y[:1])[0] == 0:
+            raise ValueError("There is no walk of size {} from {}.".format(
+                length, start))
+
+        result = np.empty((num_walks, length), dtype=np.uint8)
+        for k in range(length):
+            i = length - k
+            weights = np.array([ self.lookup(i - 1, x + dx[s], y + dy[s])
+                                 for s in range(len(steps)) ],
+                               dtype=np.float64)
+            cumulated = np.cumsum(weights, axis=0)
+            u = rng.random_sample(num_walks)
+            r = u * cumulated[-1]
+            choice = (cumulated <= r).sum(axis=0)
+            # NOTE: Guards against the rounding of `r` up to the total.
+            last = len(steps) - 1 - np.argmax(weights[::-1] > 0, axis=0)
+            choice = np.minimum(choice, last)
+
+            if exact != None:
+                # The cumulated counts are sums of at most |S| counts, and
+                # `r` is one more rounding away from its exact value.
+                tolerance = 2.02 * (self.error_bound(i - 1) +
+                                    (len(steps) + 2) *
+                                    self.error_bound(0)) * cumulated[-1]
+                close = (np.abs(cumulated - r) <= tolerance).any(axis=0)
+                for j in np.flatnonzero(close).tolist():
+                    points = list(zip((x[j] + dx).tolist(),
+                                      (y[j] + dy).tolist()))
+                    choice[j] = _exact_choice(u[j], exact(i - 1, points))
+                _instrumentation.count("counting.sample",
+                                       exact=int(close.sum()))
+
+            result[:, k] = choice
+            x += dx[choice]
+            y += dy[choice]
+
+        return _WalkBatch(stepset, result)
+
+    def view(self):
+        """
+        Returns another table on the same counts (without copy), which can be
+        shared and closed independently of this one.
+        """
+        return DenseCountTable(self.__counts, origin=self.__origin,
+                               frontier=self.__frontier,
+                               exponents=self.__exponents,
+                               rounding=self.__rounding, region=self.__region)
+
+    def swapped(self):
+        """
+        Returns the table of the reflection `(x, y) -> (y, x)` of the walks (a
+        transposed view of this one, without copy).
+        """
+        frontier = self.__frontier
+        if frontier != None:
+            (east, north, west, south) = frontier
+            frontier = (north, east, south, west)
+        region = self.__region
+        if region != None:
+            region = tuple(map(lambda f: None if f == None else
+                               (lambda x, y: f(y, x)), region))
+        return DenseCountTable(self.__counts.transpose(0, 2, 1),
+                               origin=(self.__origin[1], self.__origin[0]),
+                               frontier=frontier, exponents=self.__exponents,
+                               rounding=self.__rounding, region=region)
+
+    # ==========================================================================
+    # Sharing between processes
+
+    def share(self, path=None):
+        """
+        Copies the table to shared memory (or to the file `path`, which is
+        then memory-mapped, if `path` is given or shared memory is not
+        available), and returns the handle with which other processes can
+        `attach()` to it. The table then uses the shared copy; call
+        `unlink()` to release it once all the processes are done. The
+        functions of the region of the table, if any, must be picklable.
+        """
+        np = _numpy()
+        counts = self.__counts
+        shared_memory = _shared_memory()
+        if self.__region != None:
+            # The exact counts of `sample(exact=True)` depend on the region.
+            import pickle as _pickle
+            try:
+                _pickle.dumps(self.__region)
+            except Exception:
+                raise ValueError("The region of the table cannot be shared "
+                                 "(its functions are not picklable).")
+
+        if path == None and shared_memory != None:
+            segment = shared_memory.SharedMemory(create=True,
+                                                 size=max(1, counts.nbytes))
+            handle = SharedTableHandle("shm", segment.name, counts.shape,
+                                       counts.dtype.str, self.__origin,
+                                       self.__frontier, self.__exponents,
+                                       self.__rounding, self.__region)
+            shared = np.ndarray(counts.shape, dtype=counts.dtype,
+                                buffer=segment.buf)
+        else:
+            if path == None:
+                import tempfile as _tempfile
+                (fd, path) = _tempfile.mkstemp(suffix=".counts")
+                import os as _os
+                _os.close(fd)
+            shared = np.memmap(path, dtype=counts.dtype, mode="w+",
+                               shape=counts.shape)
+            segment = shared
+            handle = SharedTableHandle("mmap", path, counts.shape,
+                                       counts.dtype.str, self.__origin,
+                                       self.__frontier, self.__exponents,
+                                       self.__rounding, self.__region)
+
+        shared[...] = counts
+        self.__counts = shared
+        self.__storage = segment
+        self.__owner = True
+        self.__handle = handle
+        return handle
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Attaches (read-only, without copy) to a table shared by `share()`.
+        """
+        np = _numpy()
+        if handle.kind == "shm":
+            segment = _open_shared_memory(handle.name)
+            counts = np.ndarray(tuple(handle.shape), dtype=handle.dtype,
+                                buffer=segment.buf)
+        elif handle.kind == "mmap":
+            counts = np.memmap(handle.name, dtype=handle.dtype, mode="r",
+                               shape=tuple(handle.shape))
+            segment = counts
+        else:
+            raise ValueError("Unknown kind of shared table '{}'.".format(
+                handle.kind))
+        counts.flags.writeable = False
+        return cls(counts, origin=handle.origin, storage=segment,
+                   frontier=handle.frontier, exponents=handle.exponents,
+                   rounding=handle.rounding, region=handle.region)
+
+    def close(self):
+        """
+        Detaches from the shared copy of the table (which then can no longer
+        be used by this object).
+        """
+        storage = self.__storage
+        self.__storage = None
+        self.__counts = None
+        if storage is not None and hasattr(storage, "close"):
+            try:
+                storage.close()
+            except BufferError:
+                # Some views on the table are still alive.
+                pass
+
+    def unlink(self):
+        """
+        Closes and destroys the shared copy created by `share()`.
+        """
+        if not self.__owner:
+            raise ValueError("Only the table that was shared can be unlinked.")
+        handle = self.__handle
+        storage = self.__storage
+        self.close()
+        self.__owner = False
+        if handle.kind == "shm":
+            storage.unlink()
+        else:
+            import os as _os
+            if _os.path.exists(handle.name):
+                _os.remove(handle.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.__owner:
+            self.unlink()
+        else:
+            self.close()
+        return False
+
+    def __repr__(self):
+        return "DenseCountTable(length={}, shape={}, dtype={})".format(
+            self.length, self.__counts.shape[1:], self.__counts.dtype)
+
+# ==============================================================================
+# Cache of tables
+#
+# The tables of the quarter plane are cached by the canonical form of their
+# stepset up to swapping the axes (see `StepSet.canonical_key`): the table of
+# a set that is the reflection of a cached one is a transposed view of it,
+# and a table of size `n` serves all the sizes up to `n`. The least recently
+# used tables are dropped once they take more than `TABLE_CACHE_BYTES`.
+
+TABLE_CACHE_BYTES = 1 << 30
+
+__tables = _collections.OrderedDict()
+
+def cached_table(stepset, length, dtype=None):
+    """
+    Returns a `DenseCountTable` of the walks of the `StepSet` `stepset` of
+    size at most (at least) `length`, in the quarter plane, computed (by
+    `DenseCountTable.compute()`) for the canonical form of the set if no
+    cached table is long enough. The result is a view on the cached table,
+    which can be shared (and unlinked) without affecting the cache.
+    """
+    np = _numpy()
+    if dtype == None:
+        dtype = np.int64 if len(stepset) ** length < 2**63 else np.float64
+    key = (stepset.canonical_key, np.dtype(dtype).str)
+    table = __tables.pop(key, None)
+    hit = table != None and table.length >= length
+    if not hit:
+        (canonical, _) = stepset.canonical()
+        table = DenseCountTable.compute(canonical, length, dtype=dtype)
+    __tables[key] = table
+    while sum(map(lambda t: t.nbytes, __tables.values())) > TABLE_CACHE_BYTES:
+        # A table larger than the cap is not kept at all.
+        __tables.popitem(last=False)
+    _instrumentation.count("counting.cached_table", hits=int(hit),
+                           misses=int(not hit))
+    if stepset.is_canonical:
+        return table.view()
+    return table.swapped()
+
+def clear_table_cache():
+    __tables.clear()
+
+# ==============================================================================
+# Incremental counts
+
+class IncrementalCountTable(object):
+    """
+    Counts the walks of `stepset` from the origin, by their endpoint and size,
+    which remain in the quarter plane (or in the region of `test_function`).
+    Unlike the table of the recursive method, which counts the walks of size
+    `i` from each point (and must be computed again for another length), the
+    counts of size `i` only depend on those of size `i - 1`: the table can be
+    extended by more sizes at the cost of these sizes only, saved, and
+    resumed later:
+
+        table = IncrementalCountTable(stepset)
+        table.extend(1500)
+        batch = table.sample(1000)          # walks of size 1500
+        table.save("table.npz")
+        ...
+        table = IncrementalCountTable.load("table.npz")
+        for (i, counts) in table.grow(500): # sizes 1501 to 2000
+            ...
+
+    The walks are drawn backwards, from an endpoint chosen with the counts of
+    the largest size (among those of `end_position`). The counts are `int64`
+    (exact, but `grow()` raises `OverflowError` once they may not fit) or
+    `float64` (the default), rescaled by a power of 2 for each size as in
+    `DenseCountTable.compute()`, with the same error bound.
+    """
+
+    def __init__(self, stepset, dtype=None, test_function=None,
+                 end_position=None):
+        np = _numpy()
+        self.__stepset = stepset
+        self.__steps = list(map(lambda s: (s.x, s.y), stepset))
+        self.__dtype = np.dtype(np.float64 if dtype == None else dtype)
+        if self.__dtype not in (np.dtype(np.int64), np.dtype(np.float64)):
+            raise ValueError("The counts are either int64 or float64.")
+        self.__region = (test_function, end_position)
+
+        # The walks of size `i` end in the box from `-(west, south) * i` to
+        # `(east, north) * i` (without its negative part in the quarter plane).
+        (xs, ys) = (list(map(lambda d: d[0], self.__steps)),
+                    list(map(lambda d: d[1], self.__steps)))
+        self.__east = max(0, max(xs))
+        self.__north = max(0, max(ys))
+        self.__west = 0
+        self.__south = 0
+        if test_function != None:
+            self.__west = max(0, -min(xs))
+            self.__south = max(0, -min(ys))
+
+        first = np.ones((1, 1), dtype=self.__dtype)
+        if test_function != None:
+            first *= _region_masks((test_function, None), (0, 0), (1, 1))[0]
+        self.__layers = [ first ]
+        self.__exponents = [ 0 ]
+
+    # ==========================================================================
+    # Growth
+
+    def grow(self, k):
+        """
+        Computes the counts of `k` more sizes, and yields each size with its
+        (rescaled) counts as it is computed (see `origin()`).
+        """
+        np = _numpy()
+        scaled = self.__dtype.kind == "f"
+        for _ in range(k):
+            i = len(self.__layers)
+            prev = self.__layers[-1]
+            if not scaled and prev.size > 0 and \
+                    int(prev.max()) * len(self.__steps) >= 2**63:
+                raise OverflowError("The counts of size {} may not fit in "
+                                    "int64.".format(i))
+            shape = ((self.__east + self.__west) * i + 1,
+                     (self.__north + self.__south) * i + 1)
+            curr = np.zeros(shape, dtype=self.__dtype)
+            for (dx, dy) in self.__steps:
+                # curr[p] += prev[p - s], and the box of size `i - 1` starts
+                # `(west, south)` after that of size `i`.
+                _shift_add(curr, prev, -dx - self.__west, -dy - self.__south)
+            if self.__region[0] != None:
+                curr *= _region_masks((self.__region[0], None),
+                                      self.origin(i), shape)[0]
+            exponent = self.__exponents[-1]
+            if scaled:
+                largest = curr.max()
+                if largest > 0:
+                    e = int(np.frexp(largest)[1])
+                    curr = np.ldexp(curr, -e)
+                    exponent += e
+            self.__layers.append(curr)
+            self.__exponents.append(exponent)
+            _instrumentation.count("counting.grow", cells=curr.size)
+            yield (i, curr)
+
+    def extend(self, k):
+        """
+        Computes the counts of `k` more sizes, and returns the table.
+        """
+        for _ in self.grow(k):
+            pass
+        return self
+
+    def extend_to(self, length):
+        """
+        Computes the counts up to the size `length` (if they are not yet).
+        """
+        return self.extend(max(0, length - self.length))
+
+    # ==========================================================================
+    # Access
+
+    @property
+    def stepset(self):
+        return self.__stepset
+
+    @property
+    def length(self):
+        return len(self.__layers) - 1
+
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @property
+    def exponents(self):
+        """
+        The power of 2 by which the counts of each size are multiplied (all 0
+        for `int64` counts).
+        """
+        return list(self.__exponents)
+
+    def origin(self, i):
+        """
+        Returns the point of index `[0, 0]` in the counts of size `i`.
+        """
+        return (-self.__west * i, -self.__south * i)
+
+    def layer(self, i):
+        """
+        Returns the (rescaled) counts of the walks of size `i`, where
+        `[x - x0, y - y0]` is the endpoint `(x, y)` and `(x0, y0)` is
+        `origin(i)`.
+        """
+        return self.__layers[i]
+
+    def __getitem__(self, key):
+        """
+        Returns the number of walks of size `i` that end at `(x, y)`, for the
+        key `(x, y, i)` (as a float, if the counts are rescaled).
+        """
+        import math as _math
+        (x, y, i) = key
+        if not 0 <= i <= self.length:
+            raise IndexError("The table counts walks of size at most "
+                             "{}.".format(self.length))
+        (x0, y0) = self.origin(i)
+        counts = self.__layers[i]
+        (x, y) = (x - x0, y - y0)
+        if not (0 <= x < counts.shape[0] and 0 <= y < counts.shape[1]):
+            return 0
+        value = counts[x, y].item()
+        if self.__dtype.kind == "f":
+            try:
+                return _math.ldexp(value, self.__exponents[i])
+            except OverflowError:
+                return float("inf")
+        return value
+
+    def __end_weights(self, i):
+        # The counts of size `i` of the walks that end at a point of
+        # `end_position`.
+        counts = self.__layers[i]
+        if self.__region[1] == None:
+            return counts
+        return counts * _region_masks(self.__region, self.origin(i),
+                                      counts.shape)[1]
+
+    def total(self, i):
+        """
+        Returns the number of walks of size `i` (which end at a point of
+        `end_position`); in the quarter plane, these are the totals of
+        `reference.tabulate_all_walks` (with a side of at least `i + 1`).
+        """
+        import math as _math
+        weights = self.__end_weights(i)
+        if self.__dtype.kind == "f":
+            return _math.ldexp(float(weights.sum()), self.__exponents[i])
+        return sum(map(int, weights.ravel().tolist()))
+
+    # ==========================================================================
+    # Sampling
+
+    def sample(self, num_walks, length=None):
+        """
+        Draws `num_walks` walks of size `length` (by default, the largest one
+        of the table) uniformly at random, and returns them as a `WalkBatch`.
+        The random numbers are seeded from `random`.
+        """
+        np = _numpy()
+        import random as _random
+        if length == None:
+            length = self.length
+        if length > self.length:
+            raise ValueError("The table only counts walks of size at most "
+                             "{}.".format(self.length))
+        rng = np.random.RandomState(_random.getrandbits(32))
+        dx = np.array(list(map(lambda d: d[0], self.__steps)), dtype=np.int64)
+        dy = np.array(list(map(lambda d: d[1], self.__steps)), dtype=np.int64)
+
+        # The endpoints, then the steps from the last one.
+        weights = self.__end_weights(length).astype(np.float64).ravel()
+        cumulated = np.cumsum(weights)
+        if num_walks > 0 and not cumulated[-1] > 0:
+            raise ValueError("There is no walk of size {}.".format(length))
+        cells = np.searchsorted(cumulated,
+                                rng.random_sample(num_walks) * cumulated[-1],
+                                side="right")
+        cells = np.minimum(cells, np.flatnonzero(weights)[-1])
+        height = self.__layers[length].shape[1]
+        (x0, y0) = self.origin(length)
+        x = cells // height + x0
+        y = cells % height + y0
+
+        result = np.empty((num_walks, length), dtype=np.uint8)
+        for i in range(length, 0, -1):
+            counts = self.__layers[i - 1]
+            (x0, y0) = self.origin(i - 1)
+            weights = np.zeros((len(self.__steps), num_walks), dtype=np.float64)
+            for s in range(len(self.__steps)):
+                (px, py) = (x - dx[s] - x0, y - dy[s] - y0)
+                valid = ((px >= 0) & (px < counts.shape[0]) &
+                         (py >= 0) & (py < counts.shape[1]))
+                weights[s, valid] = counts[px[valid], py[valid]]
+            cumulated = np.cumsum(weights, axis=0)
+            r = rng.random_sample(num_walks) * cumulated[-1]
+            choice = (cumulated <= r).sum(axis=0)
+            # NOTE: Guards against the rounding of `r` up to the total.
+            last = len(self.__steps) - 1 - np.argmax(weights[::-1] > 0, axis=0)
+            choice = np.minimum(choice, last)
+            result[:, i - 1] = choice
+            x -= dx[choice]
+            y -= dy[choice]
+
+        return _WalkBatch(self.__stepset, result)
+
+    # ==========================================================================
+    # Serialization
+
+    def save(self, path):
+        """
+        Saves the table (with its stepset and dtype) to the `.npz` file at
+        `path`, atomically, so that it can be used as a checkpoint. The
+        functions of the region are not saved (see `load()`).
+        """
+        import json as _json
+        import os as _os
+        np = _numpy()
+        (slope_p, slope_q) = getattr(self.__stepset, "slope", (None, None))
+        description = {
+            'steps': list(map(list, self.__steps)),
+            'slope': [slope_p, slope_q],
+            'dtype': self.__dtype.str,
+            'exponents': self.__exponents,
+            'region': list(map(lambda f: f != None, self.__region)),
+        }
+        arrays = dict(("layer_{}".format(i), counts)
+                      for (i, counts) in enumerate(self.__layers))
+        temporary = "{}.tmp".format(path)
+        with open(temporary, "wb") as f:
+            np.savez(f, description=np.array(_json.dumps(description)),
+                     **arrays)
+        _os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, stepset=None, test_function=None, end_position=None):
+        """
+        Loads a table saved by `save()`, to extend or sample it. The stepset is
+        rebuilt from the file (unless given), but the functions of the region
+        must be given again.
+        """
+        import json as _json
+        np = _numpy()
+        with np.load(path) as data:
+            description = _json.loads(str(data['description']))
+            layers = [ data["layer_{}".format(i)]
+                       for i in range(len(description['exponents'])) ]
+        if description['region'] != [test_function != None,
+                                     end_position != None]:
+            raise ValueError("The table was saved with another region.")
+        if stepset == None:
+            from reluctant_walks.plane import FrozenStepSet
+            (slope_p, slope_q) = description['slope']
+            stepset = FrozenStepSet(init_set=list(map(tuple,
+                                                      description['steps'])),
+                                    slope_p=slope_p, slope_q=slope_q)
+        table = cls(stepset, dtype=description['dtype'],
+                    test_function=test_function, end_position=end_position)
+        if table.__steps != list(map(tuple, description['steps'])):
+            raise ValueError("The table was saved with another stepset.")
+        table.__layers = layers
+        table.__exponents = description['exponents']
+        return table
+
+    def __repr__(self):
+        return "IncrementalCountTable(length={}, dtype={})".format(
+            self.length, self.__dtype)
@@ -0,0 +1,413 @@
+# @Date:   2026-10-18-14:20
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: exits.py
+# @Last modified time: 2026-10-18-14:20
+
+# Exit detection for many walks at once: the batch counterparts of
+# `reference.walk_exit_step` and `reference.is_quarter_plane`. The walks can be
+# given as a `WalkBatch`, as a list of walks (lists of `Step` objects), or as a
+# two-dimensional array of step indices padded to the same size (with the
+# actual size of each walk in `lengths`):
+#
+#     (exit_steps, inside) = exits(walks)
+#     inside = in_quarter_plane(padded, stepset=stepset, lengths=lengths,
+#                               threads=4)
+#
+# The positions are computed by cumulative sums, and the first exit of each
+# walk by `argmax`, chunk by chunk (so that the temporary arrays stay small);
+# since `numpy` releases the GIL, the chunks can be processed by a pool of
+# threads. For long walks of small models, `BlockExitTable` checks the walks a
+# block of (up to 8) steps at a time, using a table precomputed for each
+# possible block.
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.batch import _numpy
+import reluctant_walks.instrumentation as _instrumentation
+
+# ==============================================================================
+
+# Number of steps processed at once (per thread).
+_CHUNK_STEPS = 1 << 20
+
+def _deltas(stepset):
+    np = _numpy()
+    steps = list(stepset)
+    dx = np.array(list(map(lambda s: s.x, steps)), dtype=np.int32)
+    dy = np.array(list(map(lambda s: s.y, steps)), dtype=np.int32)
+    return (dx, dy)
+
+def _padded_exits(dxs, dys, lengths):
+    # Exits of the walks whose steps have coordinates `dxs[i, :lengths[i]]`
+    # and `dys[i, :lengths[i]]`.
+    np = _numpy()
+    (count, size) = dxs.shape
+    outside = np.cumsum(dxs, axis=1, dtype=np.int32) < 0
+    outside |= np.cumsum(dys, axis=1, dtype=np.int32) < 0
+    if lengths is not None:
+        outside &= np.arange(size) < lengths[:, None]
+    else:
+        lengths = np.full(count, size, dtype=np.int64)
+    first = outside.argmax(axis=1) if size > 0 else np.zeros(count, dtype=np.int64)
+    exited = outside[np.arange(count), first] if size > 0 else \
+             np.zeros(count, dtype=bool)
+    return (np.where(exited, first + 1, lengths), ~exited)
+
+def _ragged_exits(dxs, dys, offsets):
+    # Exits of the walks whose steps have coordinates `dxs[offsets[i]:
+    # offsets[i+1]]` and `dys[...]` (with `offsets[0] == 0`).
+    np = _numpy()
+    lengths = np.diff(offsets)
+    starts = np.repeat(offsets[:-1], lengths)
+    cx = np.cumsum(dxs, dtype=np.int64)
+    cy = np.cumsum(dys, dtype=np.int64)
+    # Position after each step: the sum since the start of its walk.
+    base_x = np.concatenate(([0], cx))[starts]
+    base_y = np.concatenate(([0], cy))[starts]
+    outside = np.flatnonzero((cx - base_x < 0) | (cy - base_y < 0))
+
+    walks = np.searchsorted(offsets, outside, side='right') - 1
+    (walks, first) = np.unique(walks, return_index=True)
+    exit_steps = lengths.copy()
+    exit_steps[walks] = outside[first] - offsets[walks] + 1
+    inside = np.ones(len(lengths), dtype=bool)
+    inside[walks] = False
+    return (exit_steps, inside)
+
+def _chunks(lengths, chunk_steps):
+    # Splits the walks into consecutive ranges of about `chunk_steps` steps.
+    np = _numpy()
+    ends = np.cumsum(lengths)
+    bounds = [0]
+    while bounds[-1] < len(lengths):
+        start = bounds[-1]
+        limit = (ends[start - 1] if start > 0 else 0) + chunk_steps
+        stop = int(np.searchsorted(ends, limit, side='right'))
+        bounds.append(max(stop, start + 1))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _map_chunks(function, chunks, threads):
+    np = _numpy()
+    if threads == None or threads <= 1 or len(chunks) <= 1:
+        results = list(map(function, chunks))
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(function, chunks))
+    if len(results) == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+    return (np.concatenate(list(map(lambda r: r[0], results))),
+            np.concatenate(list(map(lambda r: r[1], results))))
+
+# ==============================================================================
+# Block lookup tables
+
+# Largest number of entries of a block table (for 8 steps, blocks of 6 steps).
+_BLOCK_ENTRIES = 1 << 20
+
+_BLOCK_SIZE = 8
+
+# Below this size, checking walks by blocks is not worth it.
+_BLOCK_MIN_LENGTH = 64
+
+class BlockExitTable(object):
+
+    def __init__(self, stepset, block=None):
+        """
+        Precomputes, for every sequence of `block` steps of `stepset` (by
+        default, as many as possible up to 8, with at most about a million
+        sequences), its displacement and the minimum of each coordinate over
+        its prefixes. A walk can then be checked one block at a time: it can
+        only exit the quarter plane within a block if its position at the
+        start of the block plus the minimum of the block is negative, and
+        only that block needs to be scanned step by step.
+        """
+        np = _numpy()
+        (dx, dy) = _deltas(stepset)
+        size = len(dx)
+        if block == None:
+            block = 1
+            while block < _BLOCK_SIZE and size ** (block + 1) <= _BLOCK_ENTRIES:
+                block += 1
+        self.__stepset = stepset
+        self.__dx = dx
+        self.__dy = dy
+        self.__block = block
+        self.__powers = size ** np.arange(block, dtype=np.int64)
+
+        # The code of a block is the number whose digits (in base `size`,
+        # least significant first) are the indices of its steps.
+        codes = np.arange(size ** block, dtype=np.int64)
+        (x, y) = (np.zeros(len(codes), dtype=np.int32),
+                  np.zeros(len(codes), dtype=np.int32))
+        (min_x, min_y) = (np.full(len(codes), 2**30, dtype=np.int32),
+                          np.full(len(codes), 2**30, dtype=np.int32))
+        for j in range(block):
+            digits = (codes // self.__powers[j]) % size
+            x += dx[digits]
+            y += dy[digits]
+            np.minimum(min_x, x, out=min_x)
+            np.minimum(min_y, y, out=min_y)
+        self.__block_dx = x
+        self.__block_dy = y
+
+        # The four values of each block are stored together (as 4 bytes if
+        # possible), so that a block is looked up by a single access.
+        records = np.stack((x, y, min_x, min_y), axis=1)
+        if np.abs(records).max(initial=0) < 128:
+            records = np.ascontiguousarray(records.astype(np.int8))
+            self.__records = records.view(np.int32).reshape(len(codes))
+        else:
+            self.__records = records
+
+    @property
+    def block(self):
+        return self.__block
+
+    @property
+    def nbytes(self):
+        return self.__records.nbytes
+
+    def __lookup(self, codes):
+        # Returns the array of the (dx, dy, min_x, min_y) of the blocks.
+        np = _numpy()
+        records = self.__records[codes]
+        if records.dtype == np.int32 and records.ndim == codes.ndim:
+            records = records.view(np.int8).reshape(codes.shape + (4,))
+        return records
+
+    def codes(self, steps):
+        """
+        Returns the codes of the consecutive blocks of the rows of the array
+        of step indices `steps` (whose number of columns must be a multiple
+        of the size of the blocks).
+        """
+        np = _numpy()
+        (count, size) = steps.shape
+        block = self.__block
+        blocks = steps.reshape(count, size // block, block)
+        # Horner's scheme, in place (the codes fit in 32 bits).
+        codes = blocks[:, :, block - 1].astype(np.int32)
+        for j in range(block - 2, -1, -1):
+            codes *= len(self.__dx)
+            codes += blocks[:, :, j]
+        return codes
+
+    def __scan(self, steps, rows, x, y, start, count, exits):
+        # Advances the walks `rows` (at positions `x`, `y`) one step at a
+        # time, for `count` steps from the columns `start`, and records their
+        # first exit in `exits`.
+        for j in range(count):
+            if len(rows) == 0:
+                break
+            column = start + j
+            step = steps[rows, column]
+            x = x + self.__dx[step]
+            y = y + self.__dy[step]
+            out = (x < 0) | (y < 0)
+            exits[rows[out]] = column[out] + 1
+            keep = ~out
+            (rows, x, y, start) = (rows[keep], x[keep], y[keep], start[keep])
+
+    def exits(self, steps, lengths=None):
+        """
+        Returns the arrays `(exit_steps, inside)` of the walks of the array of
+        step indices `steps`, where walk `i` is made of the first `lengths[i]`
+        steps of row `i` (see `exits()`).
+        """
+        np = _numpy()
+        steps = np.asarray(steps)
+        (count, size) = steps.shape
+        if steps.dtype.kind != 'u' or steps.max(initial=0) >= len(self.__dx):
+            # NOTE: Padding values are made valid indices (the steps past the
+            # end of a walk do not matter, as only the first exit is sought).
+            steps = np.clip(steps, 0, len(self.__dx) - 1)
+        block = self.__block
+        full = size - size % block
+
+        # Step of the first exit of each walk (0 if it does not exit).
+        exits = np.zeros(count, dtype=np.int64)
+
+        if full > 0:
+            # Positions at the start of each block, and the first block in
+            # which each walk may exit.
+            records = self.__lookup(self.codes(steps[:, :full]))
+            (block_dx, block_dy) = (records[:, :, 0], records[:, :, 1])
+            ends_x = np.cumsum(block_dx, axis=1, dtype=np.int32)
+            ends_y = np.cumsum(block_dy, axis=1, dtype=np.int32)
+            outside = ((ends_x - block_dx + records[:, :, 2] < 0) |
+                       (ends_y - block_dy + records[:, :, 3] < 0))
+            first = outside.argmax(axis=1)
+            candidates = outside[np.arange(count), first]
+
+            # Scan the block of the exit, step by step.
+            rows = np.flatnonzero(candidates)
+            blocks = first[rows]
+            self.__scan(steps, rows,
+                        ends_x[rows, blocks] - block_dx[rows, blocks],
+                        ends_y[rows, blocks] - block_dy[rows, blocks],
+                        blocks * block, block, exits)
+
+            rows = np.flatnonzero(~candidates)
+            (x, y) = (ends_x[rows, -1], ends_y[rows, -1])
+        else:
+            rows = np.arange(count)
+            x = y = np.zeros(count, dtype=np.int32)
+
+        # Scan the incomplete last block of the walks that did not exit.
+        self.__scan(steps, rows, x, y, np.full(len(rows), full), size - full,
+                    exits)
+
+        if lengths is None:
+            lengths = np.full(count, size, dtype=np.int64)
+        else:
+            lengths = np.asarray(lengths, dtype=np.int64)
+        inside = (exits == 0) | (exits > lengths)
+        return (np.where(inside, lengths, exits), inside)
+
+    def endpoints(self, steps):
+        """
+        Returns the arrays `(x, y)` of the endpoints of the walks of the array
+        of step indices `steps` (all of the same size).
+        """
+        np = _numpy()
+        steps = np.asarray(steps)
+        full = steps.shape[1] - steps.shape[1] % self.__block
+        codes = self.codes(steps[:, :full])
+        x = self.__block_dx[codes].sum(axis=1, dtype=np.int64)
+        y = self.__block_dy[codes].sum(axis=1, dtype=np.int64)
+        x += self.__dx[steps[:, full:]].sum(axis=1, dtype=np.int64)
+        y += self.__dy[steps[:, full:]].sum(axis=1, dtype=np.int64)
+        return (x, y)
+
+__block_tables = {}
+
+def block_table(stepset):
+    """
+    Returns the (cached) `BlockExitTable` of `stepset`.
+    """
+    key = tuple(map(lambda s: (s.x, s.y), stepset))
+    if key not in __block_tables:
+        __block_tables[key] = BlockExitTable(stepset)
+    return __block_tables[key]
+
+# ==============================================================================
+
+@_instrumentation.timed("exits.exits")
+def exits(walks, stepset=None, lengths=None, threads=1,
+          chunk_steps=_CHUNK_STEPS, method="auto"):
+    """
+    Returns the arrays `(exit_steps, inside)` of the walks: the step at which
+    each walk first exits the quarter plane (counting from 1, or its size if
+    it never does), and whether it never does. `walks` is a `WalkBatch`, a
+    list of walks, or a two-dimensional array of the indices of the steps (in
+    `stepset`), where walk `i` is made of the first `lengths[i]` steps of row
+    `i` (by default, of all of them). The walks are processed by chunks of
+    about `chunk_steps` steps, in `threads` threads.
+
+    Arrays of steps (and batches of walks of the same size) are checked by
+    blocks of steps (see `BlockExitTable`) if `method` is "block", or, if it
+    is "auto", when the stepset has at most 8 steps and the walks are long
+    enough; otherwise (`method` "cumsum"), step by step.
+    """
+    np = _numpy()
+    if method not in ("auto", "block", "cumsum"):
+        raise ValueError("Unknown method '{}'.".format(method))
+
+    if isinstance(walks, _WalkBatch):
+        (dx, dy) = _deltas(walks.stepset)
+        if walks.is_uniform and len(walks) > 0:
+            (stepset, lengths) = (walks.stepset, None)
+            walks = walks.as_array()
+        else:
+            (steps, offsets) = (walks.steps, walks.offsets)
+            def function(chunk):
+                (a, b) = chunk
+                (start, end) = (offsets[a], offsets[b])
+                return _ragged_exits(dx[steps[start:end]],
+                                     dy[steps[start:end]],
+                                     offsets[a:b+1] - start)
+            result = _map_chunks(function,
+                                 _chunks(walks.lengths, chunk_steps), threads)
+            _instrumentation.count("exits.exits", walks=len(walks))
+            return result
+
+    elif not hasattr(walks, "ndim"):
+        # List of walks (lists of `Step` objects).
+        walks = list(map(list, walks))
+        lengths = np.fromiter(map(len, walks), dtype=np.int64,
+                              count=len(walks))
+        offsets = np.zeros(len(walks) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        total = int(offsets[-1])
+        dxs = np.fromiter((s.x for w in walks for s in w), dtype=np.int32,
+                          count=total)
+        dys = np.fromiter((s.y for w in walks for s in w), dtype=np.int32,
+                          count=total)
+        def function(chunk):
+            (a, b) = chunk
+            (start, end) = (offsets[a], offsets[b])
+            return _ragged_exits(dxs[start:end], dys[start:end],
+                                 offsets[a:b+1] - start)
+        result = _map_chunks(function, _chunks(lengths, chunk_steps), threads)
+        _instrumentation.count("exits.exits", walks=len(walks))
+        return result
+
+    # Two-dimensional array of step indices (possibly padded).
+    if stepset == None:
+        raise ValueError("The stepset is required to decode arrays of steps.")
+    (dx, dy) = _deltas(stepset)
+    walks = np.asarray(walks)
+    (count, size) = walks.shape
+    if lengths is not None:
+        lengths = np.asarray(lengths, dtype=np.int64)
+
+    def function(chunk):
+        (a, b) = chunk
+        # NOTE: `clip` makes any padding value a valid index (the steps past
+        # the end of a walk are ignored anyway).
+        rows = walks[a:b]
+        return _padded_exits(np.take(dx, rows, mode='clip'),
+                             np.take(dy, rows, mode='clip'),
+                             None if lengths is None else lengths[a:b])
+
+    if method == "block" or (method == "auto" and len(dx) <= 8 and
+                             size >= _BLOCK_MIN_LENGTH):
+        table = block_table(stepset)
+        def function(chunk):
+            (a, b) = chunk
+            return table.exits(walks[a:b],
+                               None if lengths is None else lengths[a:b])
+
+    per_chunk = max(1, chunk_steps // max(1, size))
+    chunks = [ (a, min(a + per_chunk, count))
+               for a in range(0, count, per_chunk) ]
+    result = _map_chunks(function, chunks, threads)
+    _instrumentation.count("exits.exits", walks=count)
+    return result
+
+def exit_steps(walks, stepset=None, lengths=None, threads=1,
+               chunk_steps=_CHUNK_STEPS, method="auto"):
+    """
+    Returns the step at which each walk first exits the quarter plane (see
+    `exits()`), like `reference.walk_exit_step`.
+    """
+    return exits(walks, stepset, lengths, threads, chunk_steps, method)[0]
+
+def in_quarter_plane(walks, stepset=None, lengths=None, threads=1,
+                     chunk_steps=_CHUNK_STEPS, method="auto"):
+    """
+    Returns a boolean mask of the walks that never exit the quarter plane
+    (see `exits()`), like `reference.is_quarter_plane`.
+    """
+    return exits(walks, stepset, lengths, threads, chunk_steps, method)[1]
+
+def filter_quarter_plane(batches, threads=1, chunk_steps=_CHUNK_STEPS,
+                         method="auto"):
+    """
+    Yields the walks of each `WalkBatch` of the stream `batches` (such as
+    `WalkFileReader.iter_batches()`, or `generate(..., stream=True,
+    as_batch=True)` of the compilers) that remain in the quarter plane.
+    """
+    for batch in batches:
+        yield batch[in_quarter_plane(batch, threads=threads,
+                                     chunk_steps=chunk_steps, method=method)]
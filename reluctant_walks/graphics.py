@@ -9,23 +9,40 @@ import matplotlib.pyplot as _plt
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes as _inset_axes
 from mpl_toolkits.axes_grid1.inset_locator import zoomed_inset_axes as _zoomed_inset_axes
 
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+
+def _batch_paths(batch):
+    """
+    Returns the list of the paths of the walks of a `WalkBatch`, each as an
+    array of points (starting at the origin).
+    """
+    import numpy as np
+
+    (x, y) = batch.positions()
+    points = np.stack((x, y), axis=1)
+    origin = np.zeros((1, 2), dtype=points.dtype)
+    offsets = batch.offsets.tolist()
+    return [ np.concatenate((origin, points[offsets[i]:offsets[i+1]]))
+             for i in range(len(batch)) ]
+
 def plot_walk(walk, color='red', alpha=0.04, fig=None, ax=None, figsize=None, dpi=None):
     """
+    Plots a walk, or all the walks of a `WalkBatch` (as a single collection
+    of lines).
     """
-    Xcur = 0
-    Ycur = 0
-    Xvec = []
-    Yvec = []
-    for i in range(len(walk)):
-        step = walk[i]
-        Xnex = Xcur + step.x
-        Ynex = Ycur + step.y
-        Xvec.append(Xcur)
-        Yvec.append(Ycur)
-        Xcur = Xnex
-        Ycur = Ynex
-    Xvec.reverse()
-    Yvec.reverse()
+    if not isinstance(walk, _WalkBatch):
+        Xcur = 0
+        Ycur = 0
+        Xvec = [Xcur]
+        Yvec = [Ycur]
+        for i in range(len(walk)):
+            step = walk[i]
+            Xcur = Xcur + step.x
+            Ycur = Ycur + step.y
+            Xvec.append(Xcur)
+            Yvec.append(Ycur)
+        Xvec.reverse()
+        Yvec.reverse()
 
     if fig == None and ax == None:
         if figsize == None and dpi == None:
@@ -42,7 +59,13 @@ def plot_walk(walk, color='red', alpha=0.04, fig=None, ax=None, figsize=None, dp
     elif ax == None:
         ax = fig.add_axes([0,0,1,1])
 
-    ax.plot(Xvec, Yvec, color=color, alpha=alpha)
+    if isinstance(walk, _WalkBatch):
+        from matplotlib.collections import LineCollection as _LineCollection
+        ax.add_collection(_LineCollection(_batch_paths(walk),
+                                          colors=color, alpha=alpha))
+        ax.autoscale_view()
+    else:
+        ax.plot(Xvec, Yvec, color=color, alpha=alpha)
 
     return (fig, ax)
 
@@ -53,10 +76,18 @@ def plot_walk_region(walks, fig=None, ax=None, figsize=None, inset_stepset=None,
     """
     # NOTE: Import should not be moved to top-level or will create cyclic
     # dependency.
-    from reluctant_walks.reference import is_quarter_plane as _is_quarter_plane
+    from reluctant_walks.exits import in_quarter_plane as _in_quarter_plane
 
-    unrestricted_walks = walks
-    restricted_walks = filter(_is_quarter_plane, unrestricted_walks)
+    if isinstance(walks, _WalkBatch):
+        # Each set of walks is plotted at once.
+        unrestricted_walks = [walks]
+        restricted_walks = [walks[_in_quarter_plane(walks)]]
+    else:
+        # The walks are all checked at once.
+        unrestricted_walks = list(walks)
+        mask = _in_quarter_plane(unrestricted_walks)
+        restricted_walks = [ walk for (walk, inside)
+                             in zip(unrestricted_walks, mask) if inside ]
 
     for walk in unrestricted_walks:
         (fig, ax) = plot_walk(walk, color='grey', alpha=0.04, fig=fig, ax=ax, figsize=figsize, **args)
@@ -0,0 +1,185 @@
+# @Date:   2026-10-18-10:12
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: instrumentation.py
+# @Last modified time: 2026-10-18-10:12
+
+# Opt-in instrumentation of the hot paths of the package (grammar compilers,
+# counting tables, tabulation of walks). Nothing is recorded unless an
+# `Instrumentation` object is active:
+#
+#     with Instrumentation() as stats:
+#         GenRGenSWalkCompiler(stepset).generate(100, 1000)
+#     print(stats.to_json())
+#
+# Each stage (for instance "genrgens.startup") records its number of calls, its
+# total wall-clock time, and any counter the instrumented code reports (bytes
+# read, walks, cells, ...).
+
+import threading as _threading
+
+try:
+    # Python 3
+    from time import perf_counter as _clock
+except ImportError:
+    # Python 2
+    from timeit import default_timer as _clock
+
+# ==============================================================================
+
+# Stack of the active `Instrumentation` objects (they can be nested, in which
+# case all of them record the stages).
+_ACTIVE = []
+
+def enabled():
+    """
+    Returns whether some instrumentation is currently active.
+    """
+    return len(_ACTIVE) > 0
+
+# ==============================================================================
+
+class Instrumentation(object):
+
+    def __init__(self):
+        self.__stages = {}
+        self.__lock = _threading.Lock()
+        self.__started = None
+        self.__elapsed = 0.
+
+    def __enter__(self):
+        _ACTIVE.append(self)
+        self.__started = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__elapsed += _clock() - self.__started
+        _ACTIVE.remove(self)
+        return False
+
+    def record(self, stage, seconds=None, calls=1, **counters):
+        """
+        Adds a call of `stage` (which took `seconds`, if specified), and adds
+        the values of `counters` to those of the stage.
+        """
+        with self.__lock:
+            entry = self.__stages.get(stage, None)
+            if entry == None:
+                entry = { 'calls': 0, 'time': 0. }
+                self.__stages[stage] = entry
+            entry['calls'] += calls
+            if seconds != None:
+                entry['time'] += seconds
+            for (name, value) in counters.items():
+                entry[name] = entry.get(name, 0) + value
+
+    def reset(self):
+        with self.__lock:
+            self.__stages = {}
+            self.__elapsed = 0.
+
+    def __getitem__(self, stage):
+        return self.__stages[stage]
+
+    def __contains__(self, stage):
+        return stage in self.__stages
+
+    @property
+    def stages(self):
+        return sorted(self.__stages.keys())
+
+    @property
+    def elapsed(self):
+        return self.__elapsed
+
+    def as_dict(self):
+        with self.__lock:
+            return dict((stage, dict(entry))
+                        for (stage, entry) in self.__stages.items())
+
+    def to_json(self, **kwargs):
+        import json as _json
+        kwargs.setdefault('sort_keys', True)
+        return _json.dumps({ 'elapsed': self.__elapsed,
+                             'stages': self.as_dict() }, **kwargs)
+
+    def __repr__(self):
+        s = "Instrumentation ({:.6f}s)\n".format(self.__elapsed)
+        for stage in self.stages:
+            entry = self.__stages[stage]
+            counters = ", ".join("{}={}".format(k, entry[k])
+                                 for k in sorted(entry)
+                                 if k not in ('calls', 'time'))
+            s += "    {}: {} call(s), {:.6f}s{}\n".format(
+                stage, entry['calls'], entry['time'],
+                " ({})".format(counters) if counters else "")
+        return s
+
+# ==============================================================================
+
+class _Stage(object):
+
+    def __init__(self, name):
+        self.__name = name
+        self.__counters = {}
+
+    def __enter__(self):
+        self.__started = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = _clock() - self.__started
+        for instrumentation in list(_ACTIVE):
+            instrumentation.record(self.__name, seconds, **self.__counters)
+        return False
+
+    def count(self, **counters):
+        for (name, value) in counters.items():
+            self.__counters[name] = self.__counters.get(name, 0) + value
+
+class _NullStage(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def count(self, **counters):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+def stage(name):
+    """
+    Returns a context manager that times the stage `name` (and to which
+    counters can be reported with its `count()` method); this is a shared
+    no-op object when no instrumentation is active.
+    """
+    if len(_ACTIVE) == 0:
+        return _NULL_STAGE
+    return _Stage(name)
+
+def count(name, **counters):
+    """
+    Adds the values of `counters` to the stage `name`, without timing it.
+    """
+    if len(_ACTIVE) == 0:
+        return
+    for instrumentation in list(_ACTIVE):
+        instrumentation.record(name, calls=0, **counters)
+
+def timed(name):
+    """
+    Decorator that times every call of the decorated function as the stage
+    `name`.
+    """
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            if len(_ACTIVE) == 0:
+                return function(*args, **kwargs)
+            with _Stage(name):
+                return function(*args, **kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorator
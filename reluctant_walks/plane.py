@@ -11,10 +11,11 @@ except ImportError:
 # Utility function to transform a float to a rationales
 from reluctant_walks.config import farey_rat_approx as _farey_rat_approx
 from reluctant_walks.config import package_ensure as _package_ensure
-import reluctant_walks.graphics as _graphics
 
 class Step(object):
     __kind = 'plane'
+    __slots__ = ('__x_delta', '__y_delta', '__slope_p', '__slope_q',
+                 '__id', '__name')
     COUNT = 0
 
     def __init__(self, x_delta, y_delta, slope_p = 0, slope_q = 1):
@@ -93,42 +94,122 @@ class Step(object):
 
 
 
+def swap_slope(slope):
+    """
+    Returns the slope of the reflection `(x, y) -> (y, x)` of a set of slope
+    `slope` (an integer `p` for `(p, 1)`, or a pair `(p, q)`), so that the
+    steps keep their weights; `None` (unknown) for `None` and 0, which is also
+    the default slope.
+    """
+    if slope == None or slope == 0:
+        return None
+    if type(slope) is tuple:
+        return (slope[1], slope[0])
+    return 1 if slope == 1 else (1, slope)
+
+__best_slopes = {}
+
+def register_best_slope(steps, slope, rat_precision=10):
+    """
+    Records the best slope of the steps (of any iterable), so that the sets
+    with the same canonical form (see `StepSet.canonical_key`) reuse it.
+    """
+    steps = list(map(lambda s: (s.x, s.y) if isinstance(s, Step) else
+                     tuple(s), steps))
+    key = tuple(sorted(steps))
+    canonical = canonical_key(steps)
+    if key != canonical:
+        slope = swap_slope(slope)
+    if slope != None and slope != 0:
+        __best_slopes[(canonical, rat_precision)] = slope
+
+def _registered_best_slope(steps, rat_precision=10):
+    slope = __best_slopes.get((canonical_key(steps), rat_precision), None)
+    if slope != None and tuple(sorted(steps)) != canonical_key(steps):
+        slope = swap_slope(slope)
+    return slope
+
+def canonical_key(steps):
+    """
+    Returns the smallest of the sorted tuples of the coordinates of the
+    steps (pairs), and of their reflections `(y, x)`: the sets that only
+    differ by swapping the axes have the same canonical key.
+    """
+    steps = list(steps)
+    return min(tuple(sorted(steps)),
+               tuple(sorted(map(lambda p: (p[1], p[0]), steps))))
+
+def is_diagonally_symmetric(steps):
+    """
+    Returns whether the steps (of any iterable) are invariant under the
+    reflection `(x, y) -> (y, x)`.
+    """
+    points = set(map(lambda s: (s.x, s.y), steps))
+    return points == set(map(lambda p: (p[1], p[0]), points))
+
 class StepSet(object):
     __kind = 'plane'
 
     def __init__(self, init_set = [], slope_p = 0, slope_q = 1,
                  cached_bestslope=None, cached_bestslope_ratprecision=10):
         self.__set = []
+        self.__by_symbol = {}
+        self.__cache = {}
         self.__slope_p = slope_p
         self.__slope_q = slope_q
         for step in init_set:
-            self.add(Step(step[0],step[1]))
+            self.__add(Step(step[0],step[1]))
 
         # caching system for 'best slopes' (so this can be useful without Sage)
         self.__cached_bestslope = cached_bestslope
         self.__cached_bestslope_ratprecision = cached_bestslope_ratprecision
 
-    def add(self, step):
-        if not step.symbol in map(lambda s: s.symbol, self.__set):
+    def __add(self, step):
+        if not step.symbol in self.__by_symbol:
             step.slope = (self.__slope_p, self.__slope_q)
-            self.__set += [step]
+            self.__append(step)
+
+    def __append(self, step):
+        self.__set += [step]
+        self.__by_symbol[step.symbol] = step
+        self.__cache = {}
+
+    def add(self, step):
+        self.__add(step)
 
     def add_step(self, x_delta, y_delta):
-        self.__set += [Step(x_delta, y_delta)]
+        self.__append(Step(x_delta, y_delta))
 
     def __iter__(self):
         for s in self.__set:
             yield s
 
+    def __len__(self):
+        return len(self.__set)
+
     def get(self, symbol):
+        step = self.__by_symbol.get(symbol, None)
+        if step == None:
+            step = self.__by_symbol.get("Z" + symbol, None)
+        return step
+
+    def __cached(self, key, compute):
+        # NOTE: The derived properties are cached until the slope of the set
+        # changes, or a step is added; modifying a `Step` of the set directly
+        # is not detected.
+        if not key in self.__cache:
+            self.__cache[key] = compute()
+        return self.__cache[key]
+
+    def __build_weight_index(self):
+        index = {}
         for s in self.__set:
-            if s.symbol == symbol or s.symbol == "Z" + symbol:
-                return s
+            index.setdefault(s.weight, []).append(s)
+        return dict((w, tuple(steps)) for (w, steps) in index.items())
 
     def select(self, weight):
-        for s in self.__set:
-            if s.weight == weight:
-                yield s
+        return iter(self.__cached('weights', self.__build_weight_index).get(
+            weight, ()))
 
     def __repr__(self):
         return self.__str__()
@@ -141,23 +222,95 @@ class StepSet(object):
 
     @property
     def figure(self):
+        # NOTE: Imported here so that matplotlib is only loaded when needed.
+        import reluctant_walks.graphics as _graphics
         return _graphics.plot_stepset(self.__set)
 
     @property
     def max_up(self):
-        return reduce(max, map(lambda s: s.weight, self.__set), 0)
+        return self.__cached('max_up', lambda:
+            reduce(max, map(lambda s: s.weight, self.__set), 0))
 
     @property
     def min_down(self):
-        return (-reduce(min, map(lambda s: s.weight, self.__set), 0))
+        return self.__cached('min_down', lambda:
+            (-reduce(min, map(lambda s: s.weight, self.__set), 0)))
 
     @property
     def drift(self):
-        drift = 0
-        for step in self.__set:
-            drift += step.x
-            drift += step.y
-        return drift
+        def compute():
+            drift = 0
+            for step in self.__set:
+                drift += step.x
+                drift += step.y
+            return drift
+        return self.__cached('drift', compute)
+
+    @property
+    def is_diagonally_symmetric(self):
+        """
+        Whether the set is invariant under the reflection `(x, y) -> (y, x)`,
+        in which case so are the counts of its walks in the quarter plane.
+        """
+        return self.__cached('diagonal', lambda:
+            is_diagonally_symmetric(self.__set))
+
+    @property
+    def canonical_key(self):
+        """
+        Key of the set up to the reflection `(x, y) -> (y, x)` (see
+        `canonical_key()`), for the caches that can be shared by both.
+        """
+        return self.__cached('canonical', lambda:
+            canonical_key(map(lambda s: (s.x, s.y), self.__set)))
+
+    @property
+    def is_canonical(self):
+        """
+        Whether the set is its own canonical form (or the reflection of its
+        canonical form, see `swapped()`).
+        """
+        return self.steps_key == self.canonical_key
+
+    def swapped(self):
+        """
+        Returns the reflection `(x, y) -> (y, x)` of the set, with its steps in
+        the same order (the walk with the same step indices is the mirror
+        image) and the same weights (see `swap_slope()`).
+        """
+        cls = FrozenStepSet if isinstance(self, FrozenStepSet) else StepSet
+        return cls(init_set=list(map(lambda s: (s.y, s.x), self.__set)),
+                   slope_p=self.__slope_q, slope_q=self.__slope_p,
+                   cached_bestslope=swap_slope(self.__cached_bestslope),
+                   cached_bestslope_ratprecision= \
+                       self.__cached_bestslope_ratprecision)
+
+    def canonical(self):
+        """
+        Returns `(canonical, swapped)`: the canonical form of the set (itself
+        or `swapped()`), and whether it is the reflection of the set.
+        """
+        if self.is_canonical:
+            return (self, False)
+        return (self.swapped(), True)
+
+    @property
+    def steps_key(self):
+        """
+        Sorted tuple of the coordinates of the steps, which identifies the
+        set regardless of the order and symbols of its steps.
+        """
+        return tuple(sorted(map(lambda s: (s.x, s.y), self.__set)))
+
+    def freeze(self):
+        """
+        Returns an immutable (and hashable) copy of this set.
+        """
+        return FrozenStepSet(
+            init_set=list(map(lambda s: (s.x, s.y), self.__set)),
+            slope_p=self.__slope_p, slope_q=self.__slope_q,
+            cached_bestslope=self.__cached_bestslope,
+            cached_bestslope_ratprecision=self.__cached_bestslope_ratprecision)
 
     def __is_positive_real(self, v):
         try:
@@ -215,6 +368,18 @@ class StepSet(object):
             return self.__cached_bestslope
         # ======================================================
 
+        # The slope of a set with the same canonical form, if known.
+        steps = list(map(lambda s: (s.x, s.y), self.__set))
+        if not force:
+            slope = _registered_best_slope(steps, rat_precision)
+            if slope != None:
+                return slope
+
+        slope = self.__compute_best_slope(rat_precision)
+        register_best_slope(steps, slope, rat_precision)
+        return slope
+
+    def __compute_best_slope(self, rat_precision):
         (p, solutions) = self.solve_inventory_equation()
         if len(solutions) == 0:
             return 0
@@ -270,3 +435,67 @@ class StepSet(object):
             self.__slope_q = 1
         for s in self.__set:
             s.slope = (self.__slope_p, self.__slope_q)
+        self.__cache = {}
+
+# ==============================================================================
+
+class FrozenStepSet(StepSet):
+    """
+    Immutable `StepSet`: steps cannot be added and the slope cannot be changed
+    (see `with_slope()`), so that the set can be hashed, and used as the key
+    of caches. Two frozen sets are equal if they have the same steps (in any
+    order) and the same slope.
+    """
+
+    def add(self, step):
+        raise TypeError("A FrozenStepSet cannot be modified.")
+
+    def add_step(self, x_delta, y_delta):
+        raise TypeError("A FrozenStepSet cannot be modified.")
+
+    @property
+    def slope(self):
+        return StepSet.slope.fget(self)
+
+    @slope.setter
+    def slope(self, value):
+        raise TypeError("A FrozenStepSet cannot be modified, see with_slope().")
+
+    def with_slope(self, value):
+        """
+        Returns a copy of this set with the slope `value`.
+        """
+        if type(value) is tuple and len(value) == 2:
+            (slope_p, slope_q) = value
+        else:
+            (slope_p, slope_q) = (value, 1)
+        copy = StepSet(init_set=list(map(lambda s: (s.x, s.y), self)),
+                       slope_p=slope_p, slope_q=slope_q)
+        return copy.freeze()
+
+    def freeze(self):
+        return self
+
+    def __key(self):
+        return (self.steps_key, self.slope)
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenStepSet):
+            return NotImplemented
+        return self.__key() == other.__key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(self.__key())
+
+    @property
+    def content_hash(self):
+        """
+        Hexadecimal digest of the steps and slope, stable across processes
+        and sessions (unlike `hash()`), to key caches stored on disk.
+        """
+        import hashlib as _hashlib
+        return _hashlib.sha1(repr(self.__key()).encode("utf-8")).hexdigest()
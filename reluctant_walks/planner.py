@@ -0,0 +1,413 @@
+# @Date:   2026-10-18-10:41
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: planner.py
+# @Last modified time: 2026-10-18-10:41
+
+# Cost-based choice of a sampling algorithm. Given a model, a length and a
+# number of walks, `plan_sampler()` estimates the time and memory of each
+# available strategy, and picks the fastest that fits the budgets:
+#
+#     plan = plan_sampler(stepset, length=500, num_walks=100,
+#                         memory_cap=2*2**30)
+#     print(plan.explain())
+#     walks = plan.run()
+#
+# The strategies are:
+#
+#  - 'recursive': recursive method (`reference.naive_random_generation` with
+#    `precision="float"`, or `counting.DenseCountTable` for the command line),
+#    whose table has O(n^3) cells (`int64` or rescaled `float64`);
+#  - 'rejection': unconstrained walks drawn uniformly and rejected when they
+#    exit the quarter plane (`reference.naive_rejection_generation`);
+#  - 'genrgens', 'maple': walks drawn from the grammar of the half-plane walks
+#    (tilted by the best slope) by an external backend, and rejected when they
+#    exit the quarter plane.
+#
+# The costs of the rejection strategies depend on their acceptance rates:
+# these are cached (see `record_acceptance()`), and otherwise computed exactly
+# (for 'rejection' and short walks, see `reference.exit_time_distribution()`)
+# or estimated by a short pilot run (for 'rejection') or a prior (for the
+# grammars, and when no walk of the pilot run is accepted, which only bounds
+# the rate).
+
+import math as _math
+
+from reluctant_walks.config import package_ensure as _package_ensure
+from reluctant_walks.config import UnavailableException as _UnavailableException
+import reluctant_walks.reference as _reference
+from reluctant_walks.plane import FrozenStepSet as _FrozenStepSet
+from reluctant_walks.plane import StepSet as _StepSet
+
+# ==============================================================================
+
+STRATEGIES = ('recursive', 'rejection', 'genrgens', 'maple')
+
+# Constants of the cost model (in seconds and bytes), measured on CPython 3;
+# they are only meant to compare the strategies with one another.
+_COST_TABLE_CELL_STEP = 10e-9     # per cell of the frontier, per step of the set
+_COST_RECURSIVE_STEP = 0.15e-6    # per step of a walk, per step of the set
+_COST_REJECTION_STEP = 0.7e-6     # per step of a candidate walk
+_COST_PARSE_STEP = 1.5e-6         # per step of a walk output by a backend
+_COST_BACKEND_STEP = { 'genrgens': 0.5e-6, 'maple': 20e-6 }
+_COST_BACKEND_STARTUP = { 'genrgens': 0.5, 'maple': 2.0 }
+
+_BYTES_TABLE_CELL = 8             # `int64` or `float64` count
+_BYTES_WALK_STEP = 8              # per step of a walk (list of `Step`)
+_BYTES_OUTPUT_STEP = 6            # per step of the text output of a backend
+
+_PILOT_STEPS = 200000             # budget of steps of the pilot run
+_EXACT_MAX_LENGTH = 200           # longest walks of the exact exit-time DP
+_BACKEND_BATCH = 1000             # walks requested from a backend at once
+
+# ==============================================================================
+# Cache of acceptance rates
+
+__acceptance = {}
+
+def _model_key(stepset):
+    # The acceptance rates in the quarter plane do not change when the axes
+    # are swapped.
+    return stepset.canonical_key
+
+def record_acceptance(stepset, length, strategy, accepted, attempts):
+    """
+    Records that `accepted` out of `attempts` walks of size `length` drawn
+    with `strategy` remained in the quarter plane.
+    """
+    key = (_model_key(stepset), length, strategy)
+    (a, t) = __acceptance.get(key, (0, 0))
+    __acceptance[key] = (a + accepted, t + attempts)
+
+def acceptance_rate(stepset, length, strategy):
+    """
+    Returns the recorded acceptance rate of `strategy` for walks of size
+    `length`, or `None` if no walk has been accepted (see
+    `acceptance_bound()`).
+    """
+    (accepted, attempts) = __acceptance.get(
+        (_model_key(stepset), length, strategy), (0, 0))
+    if accepted == 0:
+        return None
+    return (accepted + 0.5) / (attempts + 1.)
+
+def acceptance_bound(stepset, length, strategy):
+    """
+    Returns an upper bound on the acceptance rate of `strategy` for walks of
+    size `length` when none of the recorded attempts was accepted (1 if
+    nothing has been recorded).
+    """
+    (accepted, attempts) = __acceptance.get(
+        (_model_key(stepset), length, strategy), (0, 0))
+    return 1. / (attempts + 1)
+
+def clear_acceptance_cache():
+    __acceptance.clear()
+
+def _pilot_rejection(stepset, length):
+    attempts = max(32, min(2000, _PILOT_STEPS // max(1, length)))
+    (walks, attempts) = _reference._naive_rejection_generation_sample(
+        list(stepset), length, attempts, max_attempts=attempts)
+    record_acceptance(stepset, length, 'rejection', len(walks), attempts)
+
+# ==============================================================================
+# Estimates
+
+def _best_slope(stepset):
+    try:
+        return stepset.get_best_slope()
+    except _UnavailableException:
+        return None
+
+def _backend_available(strategy):
+    if strategy == 'genrgens':
+        return (_package_ensure('genrgens', fail=False) and
+                _package_ensure('java', fail=False))
+    elif strategy == 'maple':
+        return _package_ensure('maple', fail=False)
+    elif strategy == 'recursive':
+        try:
+            import numpy
+        except ImportError:
+            return False
+    return True
+
+def table_cells(stepset, length):
+    """
+    Returns the number of cells of the `counting.DenseCountTable` of the
+    recursive method for walks of size `length`, and the number of them
+    that are computed: for each size `i`, those of the quarter plane
+    reachable in at most `length - i` steps (its frontier).
+    """
+    max_east = max(0, max(map(lambda s: s.x, stepset)))
+    max_north = max(0, max(map(lambda s: s.y, stepset)))
+    cells = (length + 1) * (max_east*length + 1) * (max_north*length + 1)
+    computed = sum((max_east*r + 1) * (max_north*r + 1)
+                   for r in range(length + 1))
+    return (cells, computed)
+
+def _estimate_recursive(stepset, length, num_walks):
+    size = len(list(stepset))
+    (cells, computed) = table_cells(stepset, length)
+
+    memory = (cells * _BYTES_TABLE_CELL +
+              num_walks * length * _BYTES_WALK_STEP)
+    time = (computed * size * _COST_TABLE_CELL_STEP +
+            num_walks * length * size * _COST_RECURSIVE_STEP)
+
+    return {
+        'acceptance': 1.,
+        'acceptance_source': 'exact',
+        'time': time,
+        'memory': memory,
+        'note': "table of {} cells".format(cells),
+    }
+
+def _exact_rejection(stepset, length):
+    # Acceptance rate, and expected number of steps drawn per accepted walk.
+    try:
+        distribution = _reference.exit_time_distribution(stepset, length)
+    except _UnavailableException:
+        return None
+    rate = float(distribution.survival[length])
+    if rate <= 0:
+        return None
+    return (rate, length + float(distribution.wasted[length]))
+
+def _estimate_rejection(stepset, length, num_walks, pilot):
+    rate = acceptance_rate(stepset, length, 'rejection')
+    source = 'cached'
+    if rate == None and length <= _EXACT_MAX_LENGTH:
+        exact = _exact_rejection(stepset, length)
+        if exact != None:
+            (rate, steps) = exact
+            return {
+                'acceptance': rate,
+                'acceptance_source': 'exact',
+                'time': num_walks * steps * _COST_REJECTION_STEP,
+                'memory': (num_walks + 1) * length * _BYTES_WALK_STEP,
+                'note': "about {:.3g} candidate walks".format(num_walks / rate),
+            }
+    if rate == None and pilot:
+        _pilot_rejection(stepset, length)
+        rate = acceptance_rate(stepset, length, 'rejection')
+        source = 'pilot'
+    if rate == None:
+        # Without any accepted walk, assume the worst reasonable case for a
+        # reluctant model: survival decays geometrically with the length.
+        rate = min(0.5 ** min(length, 1000),
+                   acceptance_bound(stepset, length, 'rejection'))
+        source = 'prior'
+
+    # A rejected walk is abandoned on its first exit, but assume the worst.
+    attempts = num_walks / rate
+    return {
+        'acceptance': rate,
+        'acceptance_source': source,
+        'time': attempts * length * _COST_REJECTION_STEP,
+        'memory': (num_walks + 1) * length * _BYTES_WALK_STEP,
+        'note': "about {:.3g} candidate walks".format(attempts),
+    }
+
+def _estimate_grammar(strategy, stepset, length, num_walks, best_slope):
+    rate = acceptance_rate(stepset, length, strategy)
+    source = 'cached'
+    if rate == None:
+        # Walks of the tilted half plane remain in the quarter plane with a
+        # polynomially small probability (Lumbroso, Mishna, Ponty, 2017).
+        rate = min(1. / max(1, length),
+                   acceptance_bound(stepset, length, strategy))
+        source = 'prior'
+
+    attempts = num_walks / rate
+    batch = min(attempts, _BACKEND_BATCH)
+    batches = int(_math.ceil(attempts / batch))
+    return {
+        'acceptance': rate,
+        'acceptance_source': source,
+        'time': (batches * _COST_BACKEND_STARTUP[strategy] +
+                 attempts * length * (_COST_BACKEND_STEP[strategy] +
+                                      _COST_PARSE_STEP)),
+        'memory': (batch * length * (_BYTES_OUTPUT_STEP + _BYTES_WALK_STEP) +
+                   num_walks * length * _BYTES_WALK_STEP),
+        'note': "slope {}, about {:.3g} candidate walks".format(
+            best_slope, attempts),
+    }
+
+# ==============================================================================
+
+class SamplerPlan(object):
+
+    def __init__(self, stepset, length, num_walks, strategy, estimates,
+                 best_slope=None, memory_cap=None, time_budget=None):
+        self.__stepset = stepset
+        self.__length = length
+        self.__num_walks = num_walks
+        self.__strategy = strategy
+        self.__estimates = estimates
+        self.__best_slope = best_slope
+        self.__memory_cap = memory_cap
+        self.__time_budget = time_budget
+
+    @property
+    def strategy(self):
+        return self.__strategy
+
+    @property
+    def estimates(self):
+        return self.__estimates
+
+    @property
+    def estimate(self):
+        return self.__estimates.get(self.__strategy, None)
+
+    def explain(self):
+        s = "Sampling {} walk(s) of size {} (memory cap: {}, time budget: {})\n".format(
+            self.__num_walks, self.__length,
+            _format_bytes(self.__memory_cap), _format_seconds(self.__time_budget))
+        for strategy in STRATEGIES:
+            if not strategy in self.__estimates:
+                continue
+            e = self.__estimates[strategy]
+            mark = "*" if strategy == self.__strategy else " "
+            if not e['available']:
+                s += "  {} {:<10} unavailable\n".format(mark, strategy)
+                continue
+            s += "  {} {:<10} time ~{:>10}, memory ~{:>10}, acceptance {:.3g} ({}); {}{}\n".format(
+                mark, strategy,
+                _format_seconds(e['time']), _format_bytes(e['memory']),
+                e['acceptance'], e['acceptance_source'], e['note'],
+                "" if e['fits'] else " [exceeds budget]")
+        if self.__strategy == None:
+            s += "No available strategy fits the memory cap."
+        else:
+            s += "Selected '{}': fastest {}strategy.".format(
+                self.__strategy,
+                "" if self.estimate['fits'] else "(over time budget) ")
+        return s
+
+    def __repr__(self):
+        return "SamplerPlan({})".format(self.__strategy)
+
+    def run(self):
+        """
+        Samples the walks with the selected strategy.
+        """
+        if self.__strategy == None:
+            raise _UnavailableException(
+                "No sampling strategy fits the memory cap.")
+
+        steps = list(self.__stepset)
+
+        if self.__strategy == 'recursive':
+            return _reference.naive_random_generation(
+                steps, self.__length, self.__num_walks, precision="float")
+
+        if self.__strategy == 'rejection':
+            (walks, attempts) = _reference._naive_rejection_generation_sample(
+                steps, self.__length, self.__num_walks)
+            record_acceptance(self.__stepset, self.__length, 'rejection',
+                              len(walks), attempts)
+            return walks
+
+        return self.__run_grammar()
+
+    def __run_grammar(self):
+        from reluctant_walks.compilers import GenRGenSWalkCompiler
+        from reluctant_walks.compilers import MapleWalkCompiler
+        from reluctant_walks.exits import in_quarter_plane
+
+        compiler_class = { 'genrgens': GenRGenSWalkCompiler,
+                           'maple': MapleWalkCompiler }[self.__strategy]
+
+        # Tilt a copy of the model, so as to not modify the caller's.
+        stepset = self.__stepset
+        if self.__best_slope != None:
+            if isinstance(stepset, _FrozenStepSet):
+                stepset = stepset.with_slope(self.__best_slope)
+            else:
+                slope = self.__best_slope
+                (slope_p, slope_q) = slope if type(slope) is tuple else \
+                                     (slope, 1)
+                stepset = _StepSet(init_set=list(map(lambda s: (s.x, s.y),
+                                                     stepset)),
+                                   slope_p=slope_p, slope_q=slope_q)
+        compiler = compiler_class(stepset, retention="none")
+
+        walks = []
+        while len(walks) < self.__num_walks:
+            rate = self.estimate['acceptance']
+            missing = self.__num_walks - len(walks)
+            batch = int(min(_BACKEND_BATCH, _math.ceil(missing / rate)))
+            generated = compiler.generate(batch, self.__length, as_batch=True)
+            if len(generated) == 0:
+                raise Exception("The backend '{}' did not return any walk.".format(
+                    self.__strategy))
+            accepted = generated[in_quarter_plane(generated)]
+            record_acceptance(self.__stepset, self.__length, self.__strategy,
+                              len(accepted), len(generated))
+            walks += accepted[:missing].to_walks()
+        return walks
+
+def plan_sampler(stepset, length, num_walks, memory_cap=None,
+                 time_budget=None, strategies=STRATEGIES, pilot=True):
+    """
+    Estimates the cost of sampling `num_walks` walks of size `length` from
+    `stepset` with each available strategy, and returns a `SamplerPlan` for
+    the fastest one whose memory fits `memory_cap` (in bytes) and, if
+    possible, whose time fits `time_budget` (in seconds).
+    """
+    best_slope = _best_slope(stepset)
+    estimates = {}
+
+    for strategy in strategies:
+        if not strategy in STRATEGIES:
+            raise ValueError("Unknown strategy '{}'.".format(strategy))
+
+        if not _backend_available(strategy):
+            estimates[strategy] = { 'available': False, 'fits': False }
+            continue
+
+        if strategy == 'recursive':
+            e = _estimate_recursive(stepset, length, num_walks)
+        elif strategy == 'rejection':
+            e = _estimate_rejection(stepset, length, num_walks, pilot)
+        else:
+            e = _estimate_grammar(strategy, stepset, length, num_walks,
+                                  best_slope)
+
+        e['available'] = True
+        e['fits_memory'] = memory_cap == None or e['memory'] <= memory_cap
+        e['fits'] = e['fits_memory'] and (
+            time_budget == None or e['time'] <= time_budget)
+        estimates[strategy] = e
+
+    candidates = list(filter(lambda s: estimates[s]['available'] and
+                                       estimates[s]['fits_memory'],
+                             estimates))
+    # Prefer the strategies within the time budget, then the fastest.
+    candidates.sort(key=lambda s: (not estimates[s]['fits'],
+                                   estimates[s]['time']))
+    strategy = candidates[0] if len(candidates) > 0 else None
+
+    return SamplerPlan(stepset, length, num_walks, strategy, estimates,
+                       best_slope=best_slope, memory_cap=memory_cap,
+                       time_budget=time_budget)
+
+# ==============================================================================
+
+def _format_seconds(value):
+    if value == None:
+        return "none"
+    if value >= 86400:
+        return "{:.3g}d".format(value / 86400.)
+    if value >= 1:
+        return "{:.3g}s".format(value)
+    return "{:.3g}ms".format(value * 1e3)
+
+def _format_bytes(value):
+    if value == None:
+        return "none"
+    for (unit, factor) in (("GiB", 2.**30), ("MiB", 2.**20), ("KiB", 2.**10)):
+        if value >= factor:
+            return "{:.3g}{}".format(value / factor, unit)
+    return "{}B".format(int(value))
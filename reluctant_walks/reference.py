@@ -5,10 +5,20 @@
 # @Filename: reference.py
 # @Last modified time: 2018-03-29-19:39
 
+import collections as _collections
+try:
+    # Python 3
+    import collections.abc as _collections_abc
+except ImportError:
+    _collections_abc = _collections
 import copy as _copy
 
 from reluctant_walks.plane import StepSet as _StepSet
+from reluctant_walks.plane import is_diagonally_symmetric as \
+    _is_diagonally_symmetric
+from reluctant_walks.batch import WalkBatch as _WalkBatch
 from reluctant_walks.config import package_raise as _package_raise
+import reluctant_walks.instrumentation as _instrumentation
 
 # ==============================================================================
 
@@ -185,6 +195,18 @@ def __compute_nt_stepsets_slope(rat_precision=10, force=False):
         __nt_stepsets_slope = nt_stepsets_slope
         __nt_stepsets_slope_ratprecision = rat_precision
 
+def __register_nt_best_slopes():
+    # The best slopes of the models are shared with the sets that only differ
+    # by swapping the axes (see `StepSet.canonical_key`).
+    from reluctant_walks.plane import register_best_slope
+    for key in __nt_stepsets:
+        for (steps, slope) in zip(__nt_stepsets[key],
+                                  __nt_stepsets_slope[key]):
+            register_best_slope(steps, slope,
+                                __nt_stepsets_slope_ratprecision)
+
+__register_nt_best_slopes()
+
 __nt_stepsets_records = None
 
 def __build_nt_stepsets_records():
@@ -217,15 +239,25 @@ def __build_nt_stepsets_records():
 
     return objs
 
-__nt_stepsets_records = __build_nt_stepsets_records()
+# NOTE: The records (and their `StepSet` objects) are only built the first time
+# they are requested, see `get_nontrivial_qw_model()`; the constants below are
+# derived directly from the raw tables so that importing this module is cheap.
+
+def __raw_drift(steps):
+    return sum(map(lambda s: s[0] + s[1], steps))
 
 # consts
-POSSIBLE_NT_DRIFTS=set(map(lambda r: r['drift'], __nt_stepsets_records))
+POSSIBLE_NT_DRIFTS=set(__raw_drift(steps)
+                       for key in __nt_stepsets
+                       for steps in __nt_stepsets[key])
 POSSIBLE_NT_SLOPES=set(filter(lambda x: x != None,
-                           map(lambda r: r['best_slope'],
-                               __nt_stepsets_records)))
-POSSIBLE_NT_SIZES=set(map(lambda r: r['size'], __nt_stepsets_records))
-POSSIBLE_NT_IDS=set(range(len(__nt_stepsets_records)))
+                              [slope
+                               for key in __nt_stepsets_slope
+                               for slope in __nt_stepsets_slope[key]]))
+POSSIBLE_NT_SIZES=set(len(steps)
+                      for key in __nt_stepsets
+                      for steps in __nt_stepsets[key])
+POSSIBLE_NT_IDS=set(range(sum(map(len, __nt_stepsets.values()))))
 
 def get_nontrivial_qw_model(by_drift=POSSIBLE_NT_DRIFTS,
                             by_best_slope=POSSIBLE_NT_SLOPES,
@@ -234,7 +266,7 @@ def get_nontrivial_qw_model(by_drift=POSSIBLE_NT_DRIFTS,
 
     global __nt_stepsets_records
 
-    if not "__nt_stepsets_records" in globals():
+    if __nt_stepsets_records == None:
         __nt_stepsets_records = __build_nt_stepsets_records()
 
     def filter_function(record):
@@ -258,8 +290,12 @@ def get_nontrivial_qw_model(by_drift=POSSIBLE_NT_DRIFTS,
 
 def walk_exit_step(walk):
     """
-    Determines the step at which a walk exits the upper quarterplane.
+    Determines the step at which a walk exits the upper quarterplane. If
+    `walk` is a `WalkBatch`, returns an array with the exit step of each walk.
     """
+    if isinstance(walk, _WalkBatch):
+        return walk.exit_steps()
+
     x, y = 0, 0
     i = 0
     for step in walk:
@@ -272,20 +308,37 @@ def walk_exit_step(walk):
 
 def is_quarter_plane(walk):
     """
-    Determines whether a given walk exit the upper quarterplane.
+    Determines whether a given walk remains in the upper quarterplane. If
+    `walk` is a `WalkBatch`, returns a boolean mask of its walks that do.
     """
-    return walk_exit_step(walk) == len(walk)
+    if isinstance(walk, _WalkBatch):
+        return walk.in_quarter_plane()
+
+    # NOTE: Not using `walk_exit_step(walk) == len(walk)`, which does not
+    # distinguish a walk that exits on its last step.
+    x, y = 0, 0
+    for step in walk:
+        x += step.x
+        y += step.y
+        if x < 0 or y < 0:
+            return False
+    return True
 
 
 # ==============================================================================
 
+@_instrumentation.timed("reference.tabulate_endpoints_sparse")
 def tabulate_endpoints_sparse(walks):
     """
     Compute the endpoint of each walk that is provided and return a dictionary
     that maps to each possible endpoint the number of walks (1 or more) that
     end in this endpoint. This implementation uses a Python `dict`.
     """
+    if isinstance(walks, _WalkBatch):
+        return _tabulate_endpoints_sparse_batch(walks)
+
     endpoints = {}
+    (accepted, rejected) = (0, 0)
 
     for walk in walks:
         x, y = 0, 0
@@ -302,25 +355,49 @@ def tabulate_endpoints_sparse(walks):
                 quarter_plane = False
                 break
         if quarter_plane:
+            accepted += 1
             if not (x,y) in endpoints:
                 endpoints[(x,y)] = 0
             endpoints[(x,y)] += 1
+        else:
+            rejected += 1
+
+    _instrumentation.count("reference.tabulate_endpoints_sparse",
+                           walks=accepted, rejected=rejected)
 
     return endpoints
 
+def _tabulate_endpoints_sparse_batch(batch):
+    from reluctant_walks.walkstats import EndpointHistogram
+
+    histogram = EndpointHistogram()
+    histogram.add(batch)
+    _instrumentation.count("reference.tabulate_endpoints_sparse",
+                           walks=histogram.total, rejected=histogram.rejected)
+
+    return histogram.to_dict()
+
+@_instrumentation.timed("reference.tabulate_endpoints_dense")
 def tabulate_endpoints_dense(walks, side=10):
     """
     Compute the endpoint of each walk that is provided and return a dictionary
     that maps to each possible endpoint the number of walks (1 or more) that
     end in this endpoint. This implementation uses a `numpy` array (and requires
-    the `numpy` package).
+    the `numpy` package), of side `side`: the endpoints outside of it are not
+    counted, unless `side` is `None`, in which case the array is large enough
+    for all of them. To accumulate the endpoints of many batches of walks, see
+    `walkstats.EndpointHistogram`.
     """
     try:
         import numpy as np
     except ImportError:
         _package_raise("numpy")
 
+    if isinstance(walks, _WalkBatch) or side == None:
+        return _tabulate_endpoints_dense_histogram(walks, side)
+
     endpoints = np.array([[0]*side]*side)
+    (accepted, rejected) = (0, 0)
     for walk in walks:
         x, y = 0, 0
         i = 0
@@ -334,45 +411,154 @@ def tabulate_endpoints_dense(walks, side=10):
                 quarter_plane = False
                 break
         if quarter_plane:
+            accepted += 1
             if x < side and y < side:
                 endpoints[x,y] += 1
+        else:
+            rejected += 1
+
+    _instrumentation.count("reference.tabulate_endpoints_dense",
+                           walks=accepted, rejected=rejected,
+                           cells=side*side)
 
     return endpoints
 
-# ==============================================================================
+def _tabulate_endpoints_dense_histogram(walks, side):
+    from reluctant_walks.walkstats import EndpointHistogram
+
+    histogram = EndpointHistogram()
+    histogram.add(walks)
+    endpoints = histogram.to_array(side)
+    _instrumentation.count("reference.tabulate_endpoints_dense",
+                           walks=histogram.total, rejected=histogram.rejected,
+                           cells=endpoints.size)
 
-def _push_steps(tab, stepset, x, y, val=0):
-    for s in stepset:
-        nx = x + s.x
-        ny = y + s.y
-        if (nx >= 0 and nx < len(tab) and
-                ny >= 0 and ny < len(tab[0])):
-            tab[nx,ny] += val
+    return endpoints
+
+# ==============================================================================
 
-def tabulate_all_walks(stepset, side=10, N=10):
+@_instrumentation.timed("reference.tabulate_all_walks")
+def tabulate_all_walks(stepset, side=10, N=10, output="final", dtype=None,
+                       exact=False, jobs=1):
     """
-    Tabulates all possible walks of size `N`. This implementation uses
-    a `numpy` array (and requires the `numpy` package).
+    Tabulates all possible walks of size `N` that remain in the box of side
+    `side` of the quarter plane: returns the array of the number of such
+    walks ending at each point (if `output` is "final"), the arrays of all
+    the sizes from 0 to `N` (if `output` is "layers", indexed by `[i, x,
+    y]`), or only the total number of walks of each size (if `output` is
+    "totals"). The counts are `int64` (which overflow for long walks)
+    unless `dtype` is given. This implementation uses a `numpy` array (and
+    requires the `numpy` package), which is updated one step of the stepset
+    at a time by adding a shifted slice of the previous layer, over the
+    part of the box reachable by the walks.
+
+    If `exact` is set, the counts are exact: `int64` when they provably fit,
+    and otherwise Python integers (in an array of objects), computed modulo
+    several primes (in `jobs` processes) and reconstructed by the Chinese
+    remainder theorem (see `counting.tabulate_exact`).
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        _package_raise("numpy")
+    from reluctant_walks.counting import _tabulate, tabulate_exact
+
+    if output not in ("final", "layers", "totals"):
+        raise ValueError("Unknown output '{}'.".format(output))
+    if exact:
+        return tabulate_exact(stepset, side, N, output=output, jobs=jobs)
+    if dtype == None:
+        dtype = np.int64
+
+    (result, cells) = _tabulate(list(map(lambda s: (s.x, s.y), stepset)),
+                                side, N, output, dtype)
+    _instrumentation.count("reference.tabulate_all_walks", cells=cells)
+    return result
+
+# Exact distribution of the first exit time of random walks (see
+# `exit_time_distribution()`), for all the sizes up to `length`:
+#  - `exit[k]`: probability that a walk first exits the quarter plane on its
+#    step `k` (and `exit[0] == 0`);
+#  - `survival[n]`: probability that a walk of size `n` never exits;
+#  - `wasted[n]`: expected number of steps drawn in vain (by the walks that
+#    are rejected, abandoned on their first exit) per walk of size `n` that
+#    is accepted by rejection sampling.
+ExitTimeDistribution = _collections.namedtuple(
+    "ExitTimeDistribution", ["exit", "survival", "wasted"])
+
+def step_probabilities(stepset, weights=None, tilt=None):
+    """
+    Returns the probabilities of the steps of `stepset` (in its order): by
+    default uniform, proportional to `weights` (one per step) otherwise, and
+    further tilted by `tilt ** s.weight` for each step `s` if `tilt` is given
+    (the weight of a step depends on the slope of the stepset).
+    """
+    steps = list(stepset)
+    if weights == None:
+        weights = [1.] * len(steps)
+    weights = list(map(float, weights))
+    if len(weights) != len(steps):
+        raise ValueError("There must be one weight per step.")
+    if tilt != None:
+        weights = [ w * float(tilt) ** s.weight
+                    for (w, s) in zip(weights, steps) ]
+    total = sum(weights)
+    if total <= 0 or min(weights) < 0:
+        raise ValueError("The weights must be non-negative, and not all 0.")
+    return [ w / total for w in weights ]
+
+@_instrumentation.timed("reference.exit_time_distribution")
+def exit_time_distribution(stepset, length, weights=None, tilt=None):
+    """
+    Computes exactly (up to floating-point rounding) the distribution of the
+    first exit time from the quarter plane of the walks of `stepset` whose
+    steps are drawn independently with the probabilities of
+    `step_probabilities(stepset, weights, tilt)`, for all the sizes up to
+    `length`, and returns it as an `ExitTimeDistribution`. This predicts the
+    cost of rejection sampling without sampling. This implementation uses
+    `numpy` arrays of the probability of each position of the surviving
+    walks, one step at a time (and requires the `numpy` package).
     """
     try:
         import numpy as np
     except ImportError:
         _package_raise("numpy")
-    import numpy as np
-
-    blank = np.array([[0]*side]*side)
 
-    curr = blank.copy()
-    curr[0,0] = 1
+    steps = list(stepset)
+    probabilities = step_probabilities(steps, weights, tilt)
+    east = max(0, max(map(lambda s: s.x, steps)))
+    north = max(0, max(map(lambda s: s.y, steps)))
 
-    for step in range(N):
+    exit_at = np.zeros(length + 1)
+    survival = np.ones(length + 1)
+    curr = np.ones((1, 1))
+    for k in range(1, length + 1):
         prev = curr
-        curr = blank.copy()
-        for i in range(min(step+1, side)):
-            for j in range(min(step+1, side)):
-                _push_steps(curr, stepset, i, j, prev[i,j])
-
-    return curr
+        # The box of the positions that can be reached in `k` steps.
+        curr = np.zeros((east * k + 1, north * k + 1))
+        (w, h) = prev.shape
+        for (s, p) in zip(steps, probabilities):
+            if p == 0:
+                continue
+            # The walks at (x, y) move to (x + dx, y + dy): they exit if one
+            # of the coordinates becomes negative.
+            (x0, y0) = (max(0, -s.x), max(0, -s.y))
+            if x0 < w and y0 < h:
+                curr[x0 + s.x:w + s.x, y0 + s.y:h + s.y] += p * prev[x0:, y0:]
+            exit_at[k] += p * (prev.sum() - prev[x0:, y0:].sum())
+        survival[k] = curr.sum()
+
+    # NOTE: The rejected walks of size `n` are those that exit at some step
+    # `k <= n`, after which they are abandoned.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wasted = np.cumsum(np.arange(length + 1) * exit_at) / survival
+    wasted[survival == 0] = np.inf
+
+    _instrumentation.count("reference.exit_time_distribution",
+                           cells=sum((east*k + 1) * (north*k + 1)
+                                     for k in range(length + 1)))
+
+    return ExitTimeDistribution(exit_at, survival, wasted)
 
 def print_matrix(mat, prec=2):
     fstring = "%%6.0%df" % prec
@@ -411,46 +597,218 @@ def in_quarter_plane(x,y):
     return (x>=0) and (y>=0)
 
 def end_anywhere_quarterplane(x,y):
-    return quarterplane(x,y)
+    return in_quarter_plane(x,y)
+
+def _reachable_cells(steps, length, test_function=in_quarter_plane):
+    # Breadth-first search of the cells of the region reachable from the
+    # origin (without leaving the region): returns the list of these cells by
+    # increasing distance, and the number `bounds[r]` of those at distance at
+    # most `r`, for `r` from 0 to `length`.
+    cells = [(0, 0)] if test_function(0, 0) else []
+    seen = set(cells)
+    bounds = [len(cells)]
+    start = 0
+    for r in range(1, length+1):
+        for k in range(start, bounds[-1]):
+            (x, y) = cells[k]
+            for s in steps:
+                cell = (x+s.x, y+s.y)
+                if not cell in seen and test_function(*cell):
+                    seen.add(cell)
+                    cells.append(cell)
+        start = bounds[-1]
+        bounds.append(len(cells))
+    return (cells, bounds)
+
+class DiagonalTable(_collections_abc.Mapping):
+    """
+    Read-only table of counts keyed by `(x, y, i)` that are invariant under
+    the reflection `(x, y) -> (y, x)`: only the keys with `x <= y` are stored
+    (in the `dict` `half`), and the others are reconstructed on access.
+    """
+
+    def __init__(self, half):
+        self.__half = half
+        self.__len = sum(1 if x == y else 2 for (x, y, i) in half)
 
+    @property
+    def half(self):
+        return self.__half
+
+    def __getitem__(self, key):
+        (x, y, i) = key
+        return self.__half[(x, y, i) if x <= y else (y, x, i)]
+
+    def get(self, key, default=None):
+        (x, y, i) = key
+        return self.__half.get((x, y, i) if x <= y else (y, x, i), default)
+
+    def __contains__(self, key):
+        (x, y, i) = key
+        return ((x, y, i) if x <= y else (y, x, i)) in self.__half
+
+    def __iter__(self):
+        for (x, y, i) in self.__half:
+            yield (x, y, i)
+            if x != y:
+                yield (y, x, i)
+
+    def __len__(self):
+        return self.__len
+
+@_instrumentation.timed("reference.precompute")
 def naive_random_generation_precompute(steps, length,
                                        test_function=in_quarter_plane,
                                        end_position=end_anywhere_quarterplane):
     """
+    Computes the table mapping `(x, y, i)` to the number of walks of size `i`
+    that start at `(x, y)`, remain in the region of `test_function`, and end
+    at a point of `end_position`. Only the points from which the walks drawn
+    from the origin can continue are tabulated: for the size `i`, those that
+    are reachable from the origin in at most `length - i` steps (the active
+    frontier); and only the non-zero counts are stored.
+
+    If the steps are symmetric under the reflection `(x, y) -> (y, x)` (see
+    `StepSet.is_diagonally_symmetric`), and so is the region (for the default
+    functions), only the points with `x <= y` are computed, and the table is
+    a `DiagonalTable`.
     """
-    max_north = max([s.y for s in steps])
-    max_south = min([s.y for s in steps])
-    max_east = max([s.x for s in steps])
-    max_west = min([s.x for s in steps])
+    steps = list(steps)
+    (cells, bounds) = _reachable_cells(steps, length, test_function)
+    if (test_function is in_quarter_plane and
+            end_position is end_anywhere_quarterplane and
+            _is_diagonally_symmetric(steps)):
+        return _naive_random_generation_precompute_diagonal(
+            steps, length, cells, bounds)
+
     tab = {
         (x, y, 0) : 1
-                for x in range(max_west*length,1+max_east*length)
-                for y in range(max_south*length,1+max_north*length)
-                if test_function(x,y) and end_position(x,y)
+                for (x, y) in cells[:bounds[length]]
+                if end_position(x,y)
                 }
 
+    scanned = 0
     for i in range(1, length+1):
-        for x in range(max_west*length, 1+max_east*length):
-            for y in range(max_south*length, 1+max_north*length):
-                acc = 0
-                if test_function(x, y):
-                    for s in steps:
-                        (nx,ny) = (x+s.x,y+s.y)
-                        if test_function(nx,ny) and (nx,ny,i-1) in tab:
-                            acc += tab[(nx,ny,i-1)]
-                    tab[(x,y,i)] = acc
+        for (x, y) in cells[:bounds[length-i]]:
+            acc = 0
+            for s in steps:
+                # NOTE: Only the points of the region are in the table.
+                acc += tab.get((x+s.x, y+s.y, i-1), 0)
+            if acc != 0:
+                tab[(x,y,i)] = acc
+        scanned += bounds[length-i]
+
+    _instrumentation.count("reference.precompute", cells=len(tab),
+                           scanned=scanned)
+
     return tab
 
+def _naive_random_generation_precompute_diagonal(steps, length, cells, bounds):
+    # The points with `x <= y` keep their rank among the reachable points, so
+    # the frontier of each size is a prefix of them.
+    half_cells = []
+    half_bounds = []
+    k = 0
+    for bound in bounds:
+        while k < bound:
+            if cells[k][0] <= cells[k][1]:
+                half_cells.append(cells[k])
+            k += 1
+        half_bounds.append(len(half_cells))
+
+    tab = dict(((x, y, 0), 1) for (x, y) in half_cells[:half_bounds[length]])
+
+    scanned = 0
+    for i in range(1, length+1):
+        for (x, y) in half_cells[:half_bounds[length-i]]:
+            acc = 0
+            for s in steps:
+                (nx, ny) = (x+s.x, y+s.y)
+                acc += tab.get((nx, ny, i-1) if nx <= ny else (ny, nx, i-1), 0)
+            if acc != 0:
+                tab[(x,y,i)] = acc
+        scanned += half_bounds[length-i]
+
+    _instrumentation.count("reference.precompute", cells=len(tab),
+                           scanned=scanned)
+
+    return DiagonalTable(tab)
+
 def naive_random_generation(steps,length,num_walks,
                             test_function=in_quarter_plane,
-                            end_position=end_anywhere_quarterplane):
-    walks = []
+                            end_position=end_anywhere_quarterplane,
+                            precision="exact", cache=False):
+    """
+    Draws `num_walks` walks of size `length` uniformly at random among those
+    that remain in the region of `test_function` and end at a point of
+    `end_position`, by the recursive method. With `precision="float"`, the
+    counts are rescaled floats in an array (see `counting.DenseCountTable`),
+    rather than exact integers in a `dict`, and the few choices that they
+    cannot decide are made with exact counts, so the walks are still
+    uniform; with `cache` as well, the table of the quarter plane is kept
+    for the next calls (see `counting.cached_table()`).
+    """
+    if precision == "float":
+        return _naive_random_generation_float(steps, length, num_walks,
+                                              test_function, end_position,
+                                              cache)
+    if precision != "exact":
+        raise ValueError("Unknown precision: {!r}".format(precision))
     tab = naive_random_generation_precompute(steps,length,test_function,end_position)
+    with _instrumentation.stage("reference.sample") as stage:
+        walks = _naive_random_generation_sample(
+            tab, steps, length, num_walks, test_function)
+        stage.count(walks=len(walks))
+    return walks
+
+def _naive_random_generation_float(steps, length, num_walks,
+                                   test_function=in_quarter_plane,
+                                   end_position=end_anywhere_quarterplane,
+                                   cache=False):
+    try:
+        import numpy
+    except ImportError:
+        _package_raise("numpy")
+    from reluctant_walks.counting import DenseCountTable as _DenseCountTable
+    # The defaults are those of the quarter plane, which is faster.
+    if test_function is in_quarter_plane:
+        test_function = None
+    if end_position is end_anywhere_quarterplane:
+        end_position = None
+    if test_function != None or end_position != None or not cache:
+        table = _DenseCountTable.compute(steps, length, dtype=numpy.float64,
+                                         test_function=test_function,
+                                         end_position=end_position)
+        with _instrumentation.stage("reference.sample") as stage:
+            walks = table.sample(steps, num_walks, exact=True).to_walks()
+            stage.count(walks=len(walks))
+        return walks
+
+    # The cached table of the quarter plane is that of the canonical form of
+    # the steps, whose walks are then mirrored if needed.
+    from reluctant_walks.counting import cached_table as _cached_table
+    steps = list(steps)
+    (canonical, swapped) = _StepSet(
+        init_set=list(map(lambda s: (s.x, s.y), steps))).canonical()
+    table = _cached_table(canonical, length, dtype=numpy.float64)
+    with _instrumentation.stage("reference.sample") as stage:
+        batch = table.sample(canonical, num_walks, length, exact=True)
+        if swapped:
+            batch = batch.swapped(steps)
+        else:
+            batch = _WalkBatch(steps, batch.steps, batch.offsets)
+        walks = batch.to_walks()
+        stage.count(walks=len(walks))
+    return walks
+
+def _naive_random_generation_sample(tab, steps, length, num_walks,
+                                    test_function=in_quarter_plane):
+    walks = []
     for w in range(num_walks):
         x,y = 0,0
         curr_walk = []
         for i in range(length,0,-1):
-            r = _random.random() * tab[(x,y,i)]
+            r = _random.random() * tab.get((x,y,i), 0)
             found = False
             for s in steps:
                 if not found:
@@ -464,4 +822,43 @@ def naive_random_generation(steps,length,num_walks,
         walks.append(curr_walk)
     return walks
 
+def naive_rejection_generation(steps, length, num_walks,
+                               test_function=in_quarter_plane,
+                               max_attempts=None):
+    """
+    Draws unconstrained walks of size `length` uniformly at random, and only
+    keeps those that remain in the region defined by `test_function`, until
+    `num_walks` walks have been kept (or `max_attempts` walks have been drawn).
+    This requires no precomputation, but the number of attempts grows very
+    quickly with the length for reluctant walks.
+    """
+    with _instrumentation.stage("reference.rejection") as stage:
+        (walks, attempts) = _naive_rejection_generation_sample(
+            steps, length, num_walks, test_function, max_attempts)
+        stage.count(walks=len(walks), rejected=attempts-len(walks))
+    return walks
+
+def _naive_rejection_generation_sample(steps, length, num_walks,
+                                       test_function=in_quarter_plane,
+                                       max_attempts=None):
+    steps = list(steps)
+    walks = []
+    attempts = 0
+    while len(walks) < num_walks:
+        if max_attempts != None and attempts >= max_attempts:
+            break
+        attempts += 1
+        x,y = 0,0
+        curr_walk = []
+        for i in range(length):
+            s = _random.choice(steps)
+            x,y = x+s.x,y+s.y
+            if not test_function(x,y):
+                curr_walk = None
+                break
+            curr_walk.append(s)
+        if curr_walk != None:
+            walks.append(curr_walk)
+    return (walks, attempts)
+
 # ==============================================================================
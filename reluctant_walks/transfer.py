@@ -0,0 +1,307 @@
+# @Date:   2026-10-18-16:10
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: transfer.py
+# @Last modified time: 2026-10-18-16:10
+
+# Walks confined to a box `0 <= x <= width`, `0 <= y <= height`, through the
+# powers of its transfer matrix: the box has `m = (width + 1) * (height + 1)`
+# points, and `T[p, q]` is 1 if `q - p` is a step (both in the box). The number
+# of walks of size `n` from `p` to `q` is `T^n[p, q]`, and the powers
+# `T^(2^k)` are computed by repeated squaring (and cached), so that counting
+# and drawing walks of size `n` only take `O(log n)` products of `m x m`
+# matrices:
+#
+#     box = TransferMatrix(stepset, 4, 4)
+#     box.count(10**4)                     # exact (a Python integer)
+#     counts = box.endpoints(1000)         # distribution of the endpoints
+#     batch = box.sample(100, 1000)        # uniformly at random
+#
+# The walks are drawn by backward conditioning on the cached powers: the
+# points after each block of `2^k` steps (one per bit of `n`) are drawn
+# first, then the middle of each block, and so on, down to the steps. The
+# counts are exact (`int64` while they provably fit, Python integers
+# otherwise), so that the walks are exactly uniform; with `exact=False`, they
+# are floats rescaled by powers of 2, which is faster for long walks. A strip
+# `0 <= x <= width` of the quarter plane is the box of height `n` times the
+# largest vertical step, for walks of size `n`. The exact counts that do not
+# fit in `int64` are computed modulo primes (see `counting.tabulate_exact()`);
+# exact sampling then needs the powers as Python integers, which is slow for
+# long walks.
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.batch import _numpy
+from reluctant_walks.counting import crt as _crt
+from reluctant_walks.counting import fits_int64 as _fits_int64
+from reluctant_walks.counting import modular_primes as _modular_primes
+import reluctant_walks.instrumentation as _instrumentation
+
+# ==============================================================================
+
+# Maximum number of cells of the temporary arrays of weights.
+_CHUNK_CELLS = 1 << 22
+
+def _rescale(a):
+    # Divides the float array `a` by a power of 2, so that its largest value
+    # is between 1/2 and 1 (exactly, without overflow).
+    np = _numpy()
+    largest = a.max() if a.size > 0 else 0
+    if largest > 0:
+        a = np.ldexp(a, -int(np.frexp(largest)[1]))
+    return a
+
+def _dot_modulo(a, b, modulus):
+    # The product of the `int64` matrices (or vectors) `a` and `b` of residues
+    # modulo `modulus` (below 2^31): `b` is split in halves of 16 bits, so
+    # that the sums of products fit in `int64` (for fewer than 2^16 points).
+    (high, low) = (b >> 16, b & 0xffff)
+    return (a.dot(low) % modulus +
+            a.dot(high) % modulus * (1 << 16) % modulus) % modulus
+
+# ==============================================================================
+
+class TransferMatrix(object):
+
+    def __init__(self, stepset, width, height):
+        """
+        The transfer matrix of the walks of `stepset` that remain in the box
+        `0 <= x <= width`, `0 <= y <= height`.
+        """
+        np = _numpy()
+        if width < 0 or height < 0:
+            raise ValueError("The box must contain the origin.")
+        self.__stepset = stepset
+        self.__steps = list(map(lambda s: (s.x, s.y), stepset))
+        self.__width = width
+        self.__height = height
+        self.__size = (width + 1) * (height + 1)
+        if self.__size >= 2**16:
+            # See `_dot_modulo()`.
+            raise ValueError("The box has too many points ({}, at most "
+                             "2^16 - 1).".format(self.__size))
+
+        # The transition of each pair of points (-1 if there is none).
+        self.__transitions = -np.ones((self.__size, self.__size),
+                                      dtype=np.int64)
+        for p in range(self.__size):
+            (x, y) = divmod(p, height + 1)
+            for (s, (dx, dy)) in enumerate(self.__steps):
+                if 0 <= x + dx <= width and 0 <= y + dy <= height:
+                    self.__transitions[p, self.index(x + dx, y + dy)] = s
+        self.__powers = { "int64": [], "object": [], "float": [] }
+
+    # ==========================================================================
+    # Powers
+
+    def index(self, x, y):
+        """
+        Returns the index of the point `(x, y)` in the matrices.
+        """
+        if not (0 <= x <= self.__width and 0 <= y <= self.__height):
+            raise ValueError("The point {} is not in the box.".format((x, y)))
+        return x * (self.__height + 1) + y
+
+    def __kind(self, length, exact):
+        if not exact:
+            return "float"
+        return "int64" if _fits_int64(self.__stepset, length) else "object"
+
+    def power(self, k, kind="object"):
+        """
+        Returns `T^(2^k)`, as `int64` (if `kind` is "int64", which the caller
+        must check fits), Python integers ("object"), or floats rescaled by a
+        power of 2 ("float").
+        """
+        np = _numpy()
+        powers = self.__powers[kind]
+        if len(powers) == 0:
+            matrix = (self.__transitions >= 0).astype(
+                { "int64": np.int64, "object": object,
+                  "float": np.float64 }[kind])
+            powers.append(matrix)
+        while len(powers) <= k:
+            with _instrumentation.stage("transfer.square") as stage:
+                square = powers[-1].dot(powers[-1])
+                if kind == "float":
+                    square = _rescale(square)
+                powers.append(square)
+                stage.count(points=self.__size)
+        return powers[k]
+
+    def __blocks(self, length):
+        # The sizes `2^k` of the blocks of a walk of size `length` (its bits).
+        return [ k for k in range(length.bit_length() - 1, -1, -1)
+                 if (length >> k) & 1 ]
+
+    def __suffixes(self, length, kind):
+        # The (rescaled) numbers of walks from each point made of the blocks
+        # from the `j`-th on, for each `j`.
+        np = _numpy()
+        blocks = self.__blocks(length)
+        dtype = { "int64": np.int64, "object": object,
+                  "float": np.float64 }[kind]
+        suffixes = [ np.ones(self.__size, dtype=dtype) ]
+        for k in reversed(blocks):
+            suffix = self.power(k, kind).dot(suffixes[0])
+            if kind == "float":
+                suffix = _rescale(suffix)
+            suffixes.insert(0, suffix)
+        return suffixes
+
+    def __modular(self, length, start, modulus, forward):
+        # The numbers of walks of size `length` from `start` modulo `modulus`:
+        # to each point (if `forward`), or in total.
+        np = _numpy()
+        blocks = self.__blocks(length)
+        power = (self.__transitions >= 0).astype(np.int64)
+        powers = [ power ]
+        for _ in range(blocks[0] if blocks else 0):
+            powers.append(_dot_modulo(powers[-1], powers[-1], modulus))
+        if forward:
+            counts = np.zeros(self.__size, dtype=np.int64)
+            counts[self.index(*start)] = 1
+            for k in blocks:
+                counts = _dot_modulo(counts, powers[k], modulus)
+            return counts
+        counts = np.ones(self.__size, dtype=np.int64)
+        for k in reversed(blocks):
+            counts = _dot_modulo(powers[k], counts, modulus)
+        return counts[self.index(*start)]
+
+    def __exact(self, length, start, forward):
+        # The numbers of walks of `__modular()`, modulo enough primes to be
+        # reconstructed exactly.
+        np = _numpy()
+        primes = _modular_primes(len(self.__steps) ** length)
+        residues = [ np.asarray(self.__modular(length, start, p, forward))
+                     for p in primes ]
+        _instrumentation.count("transfer.exact", primes=len(primes))
+        return _crt(residues, primes)
+
+    # ==========================================================================
+    # Counting
+
+    @property
+    def stepset(self):
+        return self.__stepset
+
+    @property
+    def shape(self):
+        return (self.__width + 1, self.__height + 1)
+
+    def count(self, length, start=(0, 0)):
+        """
+        Returns the (exact) number of walks of size `length` from `start` that
+        remain in the box.
+        """
+        if self.__kind(length, True) == "int64":
+            return int(self.__suffixes(length, "int64")[0][self.index(*start)])
+        return int(self.__exact(length, start, False))
+
+    def endpoints(self, length, start=(0, 0), exact=False):
+        """
+        Returns the array of the probabilities of the endpoints `[x, y]` of
+        the walks of size `length` from `start` that remain in the box (or,
+        with `exact`, their numbers).
+        """
+        np = _numpy()
+        kind = self.__kind(length, exact)
+        if kind == "object":
+            return self.__exact(length, start, True).reshape(self.shape)
+        dtype = np.int64 if kind == "int64" else np.float64
+        counts = np.zeros(self.__size, dtype=dtype)
+        counts[self.index(*start)] = 1
+        for k in self.__blocks(length):
+            counts = counts.dot(self.power(k, kind))
+            if kind == "float":
+                counts = _rescale(counts)
+        if kind == "float" and counts.sum() > 0:
+            counts = counts / counts.sum()
+        return counts.reshape(self.shape)
+
+    # ==========================================================================
+    # Sampling
+
+    def __choose(self, weights, kind, rng):
+        # Draws an index of each row of `weights` with probability
+        # proportional to its weight.
+        import random as _random
+        np = _numpy()
+        if kind == "object":
+            choice = np.empty(len(weights), dtype=np.int64)
+            for (j, row) in enumerate(weights):
+                r = _random.randrange(sum(row))
+                for (q, weight) in enumerate(row):
+                    r -= weight
+                    if r < 0:
+                        choice[j] = q
+                        break
+            return choice
+        cumulated = np.cumsum(weights, axis=1)
+        if kind == "int64":
+            r = rng.randint(0, cumulated[:, -1], dtype=np.int64)
+        else:
+            r = rng.random_sample(len(weights)) * cumulated[:, -1]
+        choice = (cumulated <= r[:, None]).sum(axis=1)
+        # NOTE: Guards against the rounding of `r` up to the total.
+        last = weights.shape[1] - 1 - np.argmax(weights[:, ::-1] > 0, axis=1)
+        return np.minimum(choice, last)
+
+    def __bridge(self, a, b, k, kind, rng):
+        # Draws the middle points of walks of size `2^k` from the points `a`
+        # to the points `b` (arrays of indices).
+        np = _numpy()
+        half = self.power(k - 1, kind)
+        result = np.empty(len(a), dtype=np.int64)
+        rows = max(1, _CHUNK_CELLS // self.__size)
+        for i in range(0, len(a), rows):
+            weights = half[a[i:i+rows], :] * half[:, b[i:i+rows]].T
+            result[i:i+rows] = self.__choose(weights, kind, rng)
+        return result
+
+    @_instrumentation.timed("transfer.sample")
+    def sample(self, num_walks, length, start=(0, 0), exact=True):
+        """
+        Draws `num_walks` walks of size `length` from `start` that remain in
+        the box, uniformly at random (exactly, unless `exact` is false), and
+        returns them as a `WalkBatch`. The random numbers are seeded from
+        `random`.
+        """
+        np = _numpy()
+        import random as _random
+        kind = self.__kind(length, exact)
+        rng = np.random.RandomState(_random.getrandbits(32))
+        suffixes = self.__suffixes(length, kind)
+        if suffixes[0][self.index(*start)] == 0:
+            raise ValueError("There is no walk of size {} from {} in the "
+                             "box.".format(length, start))
+
+        # The points of the walks, first after each block.
+        points = np.zeros((num_walks, length + 1), dtype=np.int64)
+        points[:, 0] = self.index(*start)
+        offset = 0
+        for (j, k) in enumerate(self.__blocks(length)):
+            power = self.power(k, kind)
+            current = points[:, offset]
+            rows = max(1, _CHUNK_CELLS // self.__size)
+            for i in range(0, num_walks, rows):
+                weights = power[current[i:i+rows], :] * suffixes[j + 1][None, :]
+                points[i:i+rows, offset + (1 << k)] = \
+                    self.__choose(weights, kind, rng)
+            # Then the middle of each half, and so on.
+            for level in range(k, 0, -1):
+                half = 1 << (level - 1)
+                middles = np.arange(offset + half, offset + (1 << k),
+                                    2 * half)
+                a = points[:, middles - half].ravel()
+                b = points[:, middles + half].ravel()
+                points[:, middles] = self.__bridge(a, b, level, kind, rng) \
+                    .reshape(num_walks, len(middles))
+            offset += 1 << k
+
+        steps = self.__transitions[points[:, :-1], points[:, 1:]]
+        _instrumentation.count("transfer.sample", walks=num_walks)
+        return _WalkBatch(self.__stepset, steps.astype(np.uint8))
+
+    def __repr__(self):
+        return "TransferMatrix(width={}, height={}, steps={})".format(
+            self.__width, self.__height, len(self.__steps))
@@ -0,0 +1,386 @@
+# @Date:   2026-10-18-12:40
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: walkfile.py
+# @Last modified time: 2026-10-18-12:40
+
+# Binary file format for (many) walks, which packs each step in as few bits as
+# the stepset allows (3 bits for the models of `reference.py`, which have at
+# most 8 steps). The layout of a file is:
+#
+#     header:  magic "RWLK", version (u16), bits per step (u8), flags (u8),
+#              size of the JSON description (u32), then the JSON description
+#              (steps, slope, metadata), padded to a multiple of 8 bytes;
+#     data:    the walks, each packed (most significant bit first) from the
+#              beginning of a byte;
+#     index:   the byte offset of each walk in the data (u64, plus the end of
+#              the data), then the size of each walk (u32);
+#     footer:  offset of the index (u64), number of walks (u64), "RWIX".
+#
+# Files can be appended to (the index is rewritten when the writer is closed),
+# and are read through `mmap`, so that walk `i` can be decoded without reading
+# the rest of the file. With `bits=8`, the steps are stored unpacked, and the
+# reader returns batches that are views on the mapped file (without copy).
+
+import json as _json
+import mmap as _mmap
+import os as _os
+import struct as _struct
+from array import array as _array
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.batch import _numpy
+
+# ==============================================================================
+
+_MAGIC = b"RWLK"
+_MAGIC_INDEX = b"RWIX"
+_VERSION = 1
+
+_HEADER = _struct.Struct("<4sHBBI")
+_FOOTER = _struct.Struct("<QQ4s")
+
+# ==============================================================================
+
+def bits_per_step(stepset):
+    """
+    Returns the number of bits needed to store the index of a step of
+    `stepset`.
+    """
+    bits = 1
+    while (1 << bits) < len(list(stepset)):
+        bits += 1
+    return bits
+
+def _groups(bits):
+    # Steps are packed by groups of `g` steps, which fill `g * bits / 8` bytes
+    # exactly (e.g. 8 steps in 3 bytes, for 3 bits per step).
+    g = 8
+    while g % 2 == 0 and (g // 2) * bits % 8 == 0:
+        g //= 2
+    return (g, g * bits // 8)
+
+def _spread(values, lengths, offsets, padded_lengths):
+    # Copies the walks of `values` (given by `lengths` and `offsets`) to a
+    # buffer where walk `i` has `padded_lengths[i]` entries, padded with 0.
+    # Returns the new buffer and its offsets.
+    np = _numpy()
+    padded_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(padded_lengths, out=padded_offsets[1:])
+    if (padded_lengths == lengths).all():
+        return (values, padded_offsets)
+    result = np.zeros(int(padded_offsets[-1]), dtype=values.dtype)
+    result[np.arange(len(values), dtype=np.int64) +
+           np.repeat(padded_offsets[:-1] - offsets[:-1], lengths)] = values
+    return (result, padded_offsets)
+
+def _trim(values, lengths, padded_offsets):
+    # Inverse of `_spread`: keeps the first `lengths[i]` entries of each walk.
+    np = _numpy()
+    padded_lengths = np.diff(padded_offsets)
+    if (padded_lengths == lengths).all():
+        return values
+    within = (np.arange(len(values), dtype=np.int64) -
+              np.repeat(padded_offsets[:-1], padded_lengths))
+    return values[within < np.repeat(lengths, padded_lengths)]
+
+def _pack(batch, bits):
+    # Returns the packed bytes of the walks of `batch`, and the (relative)
+    # byte offset of each walk; each walk starts at the beginning of a byte.
+    np = _numpy()
+    lengths = batch.lengths
+    sizes = (lengths * bits + 7) // 8
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+
+    if bits == 8:
+        return (np.ascontiguousarray(batch.steps, dtype=np.uint8).tobytes(),
+                offsets)
+
+    (g, group_bytes) = _groups(bits)
+    groups = (lengths + g - 1) // g
+    (steps, _) = _spread(batch.steps, lengths, batch.offsets, groups * g)
+    steps = steps.reshape(-1, g)
+
+    words = np.zeros(len(steps), dtype=np.uint64)
+    for k in range(g):
+        words |= steps[:, k].astype(np.uint64) << np.uint64(bits * (g - 1 - k))
+    data = words.astype(">u8").view(np.uint8).reshape(-1, 8)[:, 8-group_bytes:]
+
+    # The last group of a walk may end with bytes of padding only.
+    data = _trim(data.reshape(-1), sizes, np.concatenate(
+        ([0], np.cumsum(groups * group_bytes))))
+    return (data.tobytes(), offsets)
+
+def _unpack(data, lengths, offsets, bits):
+    # Inverse of `_pack`: `data` is a `uint8` array of the packed walks,
+    # `offsets` the (relative) byte offset of each walk in `data`.
+    np = _numpy()
+    (g, group_bytes) = _groups(bits)
+    groups = (lengths + g - 1) // g
+    (data, _) = _spread(data, np.diff(offsets), offsets, groups * group_bytes)
+    data = data.reshape(-1, group_bytes)
+
+    words = np.zeros(len(data), dtype=np.uint64)
+    for k in range(group_bytes):
+        words |= data[:, k].astype(np.uint64) << np.uint64(8 * (group_bytes - 1 - k))
+    steps = np.empty((len(data), g), dtype=np.uint8)
+    mask = np.uint64((1 << bits) - 1)
+    for k in range(g):
+        steps[:, k] = (words >> np.uint64(bits * (g - 1 - k))) & mask
+
+    steps_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=steps_offsets[1:])
+    steps = _trim(steps.reshape(-1), lengths, np.concatenate(
+        ([0], np.cumsum(groups * g))))
+    return (steps, steps_offsets)
+
+# ==============================================================================
+
+class WalkFileWriter(object):
+
+    def __init__(self, path, stepset=None, bits=None, metadata=None,
+                 append=False):
+        """
+        Opens `path` to write walks of `stepset`. If `append` is set and the
+        file exists, the walks are added to those already in the file (and
+        `stepset` must then be the same, or omitted).
+        """
+        self.__path = path
+        self.__offsets = _array('q')
+        self.__lengths = _array('q')
+
+        if append and _os.path.exists(path):
+            reader = WalkFileReader(path)
+            try:
+                if stepset != None and (list(map(lambda s: (s.x, s.y), stepset))
+                                        != reader.steps):
+                    raise ValueError("The stepset differs from that of the file.")
+                self.__stepset = reader.stepset
+                self.__bits = reader.bits
+                self.__data_start = reader.data_start
+                self.__offsets.extend(reader.offsets[:-1].tolist())
+                self.__lengths.extend(reader.lengths.tolist())
+                self.__end = int(reader.offsets[-1])
+            finally:
+                reader.close()
+            # The index is rewritten after the new walks, on close.
+            self.__file = open(path, "r+b")
+            self.__file.truncate(self.__end)
+            self.__file.seek(self.__end)
+            return
+
+        if stepset == None:
+            raise ValueError("A stepset is required to create a walk file.")
+        self.__stepset = stepset
+        self.__bits = bits if bits != None else bits_per_step(stepset)
+        if (1 << self.__bits) < len(list(stepset)) or self.__bits > 8:
+            raise ValueError("Cannot store {} steps on {} bits.".format(
+                len(list(stepset)), self.__bits))
+
+        (slope_p, slope_q) = stepset.slope
+        description = _json.dumps({
+            'steps': list(map(lambda s: [s.x, s.y], stepset)),
+            'slope': [slope_p, slope_q],
+            'metadata': metadata or {},
+        }).encode("utf-8")
+
+        self.__file = open(path, "wb")
+        self.__file.write(_HEADER.pack(_MAGIC, _VERSION, self.__bits, 0,
+                                       len(description)))
+        self.__file.write(description)
+        padding = (-(_HEADER.size + len(description))) % 8
+        self.__file.write(b"\0" * padding)
+        self.__data_start = _HEADER.size + len(description) + padding
+        self.__end = self.__data_start
+
+    @property
+    def stepset(self):
+        return self.__stepset
+
+    def __len__(self):
+        return len(self.__lengths)
+
+    def write(self, walks):
+        """
+        Appends walks, given as a `WalkBatch` or as lists of `Step` objects.
+        """
+        if not isinstance(walks, _WalkBatch):
+            walks = _WalkBatch.from_walks(walks, self.__stepset)
+        (data, offsets) = _pack(walks, self.__bits)
+        self.__file.write(data)
+        self.__offsets.extend((offsets[:-1] + self.__end).tolist())
+        self.__lengths.extend(walks.lengths.tolist())
+        self.__end += len(data)
+
+    def close(self):
+        if self.__file == None:
+            return
+        np = _numpy()
+        index_offset = self.__end
+        offsets = np.array(list(self.__offsets) + [self.__end], dtype="<u8")
+        lengths = np.array(self.__lengths, dtype="<u4")
+        self.__file.write(offsets.tobytes())
+        self.__file.write(lengths.tobytes())
+        self.__file.write(_FOOTER.pack(index_offset, len(self.__lengths),
+                                       _MAGIC_INDEX))
+        self.__file.close()
+        self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+# ==============================================================================
+
+class WalkFileReader(object):
+
+    def __init__(self, path):
+        """
+        Maps the walk file `path` in memory (read-only).
+        """
+        np = _numpy()
+        self.__file = open(path, "rb")
+        self.__map = _mmap.mmap(self.__file.fileno(), 0,
+                                access=_mmap.ACCESS_READ)
+
+        (magic, version, bits, _, size) = _HEADER.unpack_from(self.__map, 0)
+        if magic != _MAGIC:
+            raise ValueError("'{}' is not a walk file.".format(path))
+        if version > _VERSION:
+            raise ValueError("Unsupported walk file version {}.".format(version))
+        description = _json.loads(
+            self.__map[_HEADER.size:_HEADER.size + size].decode("utf-8"))
+        self.__bits = bits
+        self.__steps = list(map(tuple, description['steps']))
+        self.__slope = tuple(description['slope'])
+        self.__metadata = description['metadata']
+        self.__data_start = _HEADER.size + size + ((-(_HEADER.size + size)) % 8)
+
+        (index_offset, count, magic) = _FOOTER.unpack_from(
+            self.__map, len(self.__map) - _FOOTER.size)
+        if magic != _MAGIC_INDEX:
+            raise ValueError("The index of '{}' is missing (was the writer "
+                             "closed?).".format(path))
+        self.__offsets = np.frombuffer(self.__map, dtype="<u8",
+                                       count=count + 1,
+                                       offset=index_offset).astype(np.int64)
+        self.__lengths = np.frombuffer(self.__map, dtype="<u4", count=count,
+                                       offset=index_offset + 8*(count + 1)
+                                       ).astype(np.int64)
+        self.__stepset = None
+
+    @property
+    def bits(self):
+        return self.__bits
+
+    @property
+    def steps(self):
+        return list(self.__steps)
+
+    @property
+    def metadata(self):
+        return self.__metadata
+
+    @property
+    def data_start(self):
+        return self.__data_start
+
+    @property
+    def offsets(self):
+        return self.__offsets
+
+    @property
+    def lengths(self):
+        return self.__lengths
+
+    @property
+    def stepset(self):
+        if self.__stepset == None:
+            from reluctant_walks.plane import FrozenStepSet
+            self.__stepset = FrozenStepSet(init_set=self.__steps,
+                                           slope_p=self.__slope[0],
+                                           slope_q=self.__slope[1])
+        return self.__stepset
+
+    def __len__(self):
+        return len(self.__lengths)
+
+    def read_batch(self, start=0, stop=None):
+        """
+        Returns the walks `start` to `stop` (excluded) as a `WalkBatch`; with
+        8 bits per step, the batch is a view on the mapped file.
+        """
+        np = _numpy()
+        if stop == None or stop > len(self):
+            stop = len(self)
+        start = max(0, min(start, stop))
+
+        (begin, end) = (int(self.__offsets[start]), int(self.__offsets[stop]))
+        data = np.frombuffer(self.__map, dtype=np.uint8, count=end - begin,
+                             offset=begin)
+        lengths = self.__lengths[start:stop]
+
+        if self.__bits == 8:
+            return _WalkBatch(self.stepset, data,
+                              self.__offsets[start:stop+1] - begin)
+
+        (steps, offsets) = _unpack(data, lengths,
+                                   self.__offsets[start:stop+1] - begin,
+                                   self.__bits)
+        return _WalkBatch(self.stepset, steps, offsets)
+
+    def iter_batches(self, size=10000):
+        """
+        Yields the walks of the file as successive batches of `size` walks.
+        """
+        for start in range(0, len(self), size):
+            yield self.read_batch(start, start + size)
+
+    def __getitem__(self, i):
+        """
+        Returns walk `i` as a list of `Step` objects.
+        """
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("Walk index out of range.")
+        return self.read_batch(i, i + 1)[0]
+
+    def __iter__(self):
+        for batch in self.iter_batches():
+            for walk in batch:
+                yield walk
+
+    def close(self):
+        if self.__map != None:
+            try:
+                self.__map.close()
+            except BufferError:
+                # Batches returned by `read_batch` are still views on the
+                # map, which is then unmapped once they are released.
+                pass
+            self.__file.close()
+            self.__map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def open_walk_file(path, mode="r", **kwargs):
+    """
+    Opens a walk file for reading (`mode` "r"), writing ("w") or appending
+    ("a"); the keyword arguments are passed to `WalkFileWriter`.
+    """
+    if mode == "r":
+        return WalkFileReader(path)
+    elif mode == "w":
+        return WalkFileWriter(path, **kwargs)
+    elif mode == "a":
+        return WalkFileWriter(path, append=True, **kwargs)
+    raise ValueError("Unknown mode '{}'.".format(mode))
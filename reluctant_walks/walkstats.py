@@ -0,0 +1,722 @@
+# @Date:   2026-10-18-15:10
+# @Email:  lumbroso@cs.princeton.edu
+# @Filename: walkstats.py
+# @Last modified time: 2026-10-18-15:10
+
+# Statistics accumulated over many walks, batch after batch, without keeping
+# the walks. An `EndpointHistogram` counts the walks ending at each point; its
+# bounds grow as needed, and histograms filled by different processes (or from
+# different files) can be merged:
+#
+#     histogram = EndpointHistogram()
+#     for batch in reader.iter_batches():
+#         histogram.add(batch)
+#     histogram.merge(other)
+#     histogram[(3, 2)]
+#
+# By default, only the walks that remain in the quarter plane are counted (like
+# `reference.tabulate_endpoints_sparse`), and the others are counted as
+# rejected.
+#
+# A `WalkStatistics` similarly accumulates the moments (`Moments`) and the
+# histograms (`ValueHistogram`) of statistics of the walks (exit time, maximum
+# coordinates, contacts with the axes, area, occurrences of each step, or any
+# vectorized function of a `WalkBatch`) from any source of walks:
+#
+#     statistics = WalkStatistics(["exit_time", "max_y", "area"])
+#     statistics.consume(compiler.generate(10**6, 100, stream=True,
+#                                          as_batch=True))
+#     statistics.add(naive_random_generation(steps, 100, 1000), steps)
+#     statistics.moments("exit_time").mean
+
+from reluctant_walks.batch import WalkBatch as _WalkBatch
+from reluctant_walks.batch import _numpy
+import reluctant_walks.exits as _exits
+import reluctant_walks.instrumentation as _instrumentation
+
+# ==============================================================================
+
+def _batch_endpoints(batch):
+    # Endpoints of the walks of a batch, without computing (and caching) all
+    # the positions of the walks; walks of the same size are processed by
+    # chunks (and by blocks of steps, as in `exits.exits()`).
+    np = _numpy()
+    (dx, dy) = _exits._deltas(batch.stepset)
+    if batch.is_uniform and len(batch) > 0:
+        steps = batch.as_array()
+        (count, size) = steps.shape
+        if len(dx) <= 8 and size >= _exits._BLOCK_MIN_LENGTH:
+            function = _exits.block_table(batch.stepset).endpoints
+        else:
+            function = lambda rows: (dx[rows].sum(axis=1, dtype=np.int64),
+                                     dy[rows].sum(axis=1, dtype=np.int64))
+        (x, y) = (np.empty(count, dtype=np.int64),
+                  np.empty(count, dtype=np.int64))
+        per_chunk = max(1, _exits._CHUNK_STEPS // max(1, size))
+        for a in range(0, count, per_chunk):
+            (x[a:a + per_chunk], y[a:a + per_chunk]) = \
+                function(steps[a:a + per_chunk])
+        return (x, y)
+    (steps, offsets) = (batch.steps, batch.offsets)
+    cx = np.concatenate(([0], np.cumsum(dx[steps], dtype=np.int64)))
+    cy = np.concatenate(([0], np.cumsum(dy[steps], dtype=np.int64)))
+    return (cx[offsets[1:]] - cx[offsets[:-1]],
+            cy[offsets[1:]] - cy[offsets[:-1]])
+
+def _walks_endpoints(walks):
+    # Endpoints of walks given as lists of `Step` objects.
+    np = _numpy()
+    x = np.fromiter((sum(s.x for s in w) for w in walks), dtype=np.int64,
+                    count=len(walks))
+    y = np.fromiter((sum(s.y for s in w) for w in walks), dtype=np.int64,
+                    count=len(walks))
+    return (x, y)
+
+# ==============================================================================
+
+class EndpointHistogram(object):
+
+    def __init__(self, quarter_plane=True):
+        """
+        Creates an empty histogram; if `quarter_plane` is set, only the walks
+        that remain in the quarter plane are counted.
+        """
+        self.__quarter_plane = quarter_plane
+        # The counts are stored in an array larger than the box of the points
+        # seen so far (`__low` to `__high`, inclusive), whose cell (0, 0) is
+        # the point `__origin`.
+        self.__counts = None
+        self.__origin = (0, 0)
+        self.__low = None
+        self.__high = None
+        self.__total = 0
+        self.__rejected = 0
+
+    # ==========================================================================
+    # Accumulation
+
+    def add(self, walks, threads=1):
+        """
+        Counts the endpoints of `walks` (a `WalkBatch`, or a list of walks);
+        exits are detected with `exits.exits()`, in `threads` threads.
+        """
+        if not isinstance(walks, _WalkBatch):
+            walks = list(map(list, walks))
+        if len(walks) == 0:
+            return
+        if isinstance(walks, _WalkBatch):
+            (x, y) = _batch_endpoints(walks)
+        else:
+            (x, y) = _walks_endpoints(walks)
+        if self.__quarter_plane:
+            mask = _exits.in_quarter_plane(walks, threads=threads)
+            (x, y) = (x[mask], y[mask])
+        self.__rejected += len(walks) - len(x)
+        self.add_points(x, y)
+
+    def add_points(self, x, y):
+        """
+        Counts one walk ending at each point `(x[i], y[i])`.
+        """
+        np = _numpy()
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        if len(x) == 0:
+            return
+        self.__fit((int(x.min()), int(y.min())), (int(x.max()), int(y.max())))
+
+        (width, height) = self.__counts.shape
+        cells = (x - self.__origin[0]) * height + (y - self.__origin[1])
+        flat = self.__counts.reshape(-1)
+        if 4 * len(cells) >= flat.size:
+            flat += np.bincount(cells, minlength=flat.size)
+        else:
+            np.add.at(flat, cells, 1)
+        self.__total += len(cells)
+        _instrumentation.count("walkstats.endpoints", walks=len(cells))
+
+    def merge(self, other):
+        """
+        Adds the counts of the histogram `other` (for instance, filled by
+        another process) to this one.
+        """
+        if other.quarter_plane != self.__quarter_plane:
+            raise ValueError("Cannot merge histograms that count different "
+                             "walks.")
+        self.__rejected += other.rejected
+        if other.total == 0:
+            return self
+        ((x0, y0), (x1, y1)) = other.bounds
+        self.__fit((x0, y0), (x1, y1))
+        (ox, oy) = (x0 - self.__origin[0], y0 - self.__origin[1])
+        self.__counts[ox:ox + x1 - x0 + 1, oy:oy + y1 - y0 + 1] += other.counts
+        self.__total += other.total
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __fit(self, low, high):
+        # Makes sure that the array covers the box from `low` to `high`,
+        # growing it (at least twofold along each side that grows, so that
+        # the number of copies stays logarithmic) if needed.
+        np = _numpy()
+        if self.__low != None:
+            low = (min(low[0], self.__low[0]), min(low[1], self.__low[1]))
+            high = (max(high[0], self.__high[0]), max(high[1], self.__high[1]))
+        (self.__low, self.__high) = (low, high)
+
+        if self.__counts is not None:
+            (x0, y0) = self.__origin
+            (width, height) = self.__counts.shape
+            if (x0 <= low[0] and y0 <= low[1] and
+                    high[0] < x0 + width and high[1] < y0 + height):
+                return
+            (slack_x, slack_y) = (width, height)
+        else:
+            (slack_x, slack_y) = (0, 0)
+
+        def grow(first, last, start, size, slack):
+            # New range of one coordinate, covering [first, last].
+            if start == None:
+                return (first, last - first + 1)
+            end = start + size
+            if first < start:
+                start = min(first, start - slack)
+            if last >= end:
+                end = max(last + 1, end + slack)
+            return (start, end - start)
+
+        old = self.__counts
+        if old is None:
+            ((nx0, width), (ny0, height)) = (grow(low[0], high[0], None, 0, 0),
+                                            grow(low[1], high[1], None, 0, 0))
+        else:
+            (x0, y0) = self.__origin
+            (nx0, width) = grow(low[0], high[0], x0, old.shape[0], slack_x)
+            (ny0, height) = grow(low[1], high[1], y0, old.shape[1], slack_y)
+        counts = np.zeros((width, height), dtype=np.int64)
+        if old is not None:
+            (ox, oy) = (self.__origin[0] - nx0, self.__origin[1] - ny0)
+            counts[ox:ox + old.shape[0], oy:oy + old.shape[1]] = old
+        self.__counts = counts
+        self.__origin = (nx0, ny0)
+
+    # ==========================================================================
+    # Access
+
+    @property
+    def quarter_plane(self):
+        return self.__quarter_plane
+
+    @property
+    def total(self):
+        """
+        Number of walks counted.
+        """
+        return self.__total
+
+    @property
+    def rejected(self):
+        """
+        Number of walks not counted because they exit the quarter plane.
+        """
+        return self.__rejected
+
+    @property
+    def bounds(self):
+        """
+        Returns the corners `((x0, y0), (x1, y1))` of the smallest box that
+        contains all the endpoints (or `None` if there is none).
+        """
+        if self.__low == None:
+            return None
+        return (self.__low, self.__high)
+
+    @property
+    def counts(self):
+        """
+        Returns the array of the counts over `bounds`: `counts[x - x0, y - y0]`
+        is the number of walks ending at `(x, y)` (a view, not a copy).
+        """
+        np = _numpy()
+        if self.__low == None:
+            return np.zeros((0, 0), dtype=np.int64)
+        (ox, oy) = (self.__low[0] - self.__origin[0],
+                    self.__low[1] - self.__origin[1])
+        (x0, y0) = self.__low
+        (x1, y1) = self.__high
+        return self.__counts[ox:ox + x1 - x0 + 1, oy:oy + y1 - y0 + 1]
+
+    def __getitem__(self, point):
+        (x, y) = point
+        if self.__low == None:
+            return 0
+        if not (self.__low[0] <= x <= self.__high[0] and
+                self.__low[1] <= y <= self.__high[1]):
+            return 0
+        return int(self.__counts[x - self.__origin[0], y - self.__origin[1]])
+
+    def __len__(self):
+        """
+        Number of distinct endpoints.
+        """
+        return int((self.counts != 0).sum())
+
+    def to_dict(self):
+        """
+        Returns the histogram as a `dict` mapping each endpoint to its count
+        (like `reference.tabulate_endpoints_sparse`).
+        """
+        np = _numpy()
+        counts = self.counts
+        (xs, ys) = np.nonzero(counts)
+        values = counts[xs, ys].tolist()
+        (x0, y0) = self.__low if self.__low != None else (0, 0)
+        return dict(zip(zip((xs + x0).tolist(), (ys + y0).tolist()), values))
+
+    def to_array(self, side=None):
+        """
+        Returns the counts in an array indexed by `[x, y]` from the origin
+        (like `reference.tabulate_endpoints_dense`): of side `side`, or large
+        enough for all the endpoints of non-negative coordinates.
+        """
+        np = _numpy()
+        if side == None:
+            side = 0 if self.__high == None else \
+                   max(self.__high[0], self.__high[1]) + 1
+        result = np.zeros((side, side), dtype=np.int64)
+        if self.__low == None:
+            return result
+        (x0, y0) = (max(0, self.__low[0]), max(0, self.__low[1]))
+        (x1, y1) = (min(side - 1, self.__high[0]),
+                    min(side - 1, self.__high[1]))
+        if x0 <= x1 and y0 <= y1:
+            result[x0:x1 + 1, y0:y1 + 1] = self.__counts[
+                x0 - self.__origin[0]:x1 + 1 - self.__origin[0],
+                y0 - self.__origin[1]:y1 + 1 - self.__origin[1]]
+        return result
+
+    def __repr__(self):
+        return "EndpointHistogram(total={}, rejected={}, bounds={})".format(
+            self.__total, self.__rejected, self.bounds)
+
+# ==============================================================================
+# Online moments and histograms
+
+class Moments(object):
+
+    def __init__(self):
+        """
+        Running count, mean, variance, minimum and maximum of a statistic
+        (scalar, or a vector of fixed size), updated a batch of values at a
+        time and mergeable (with the pairwise formulas of Chan et al.).
+        """
+        self.__count = 0
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__min = None
+        self.__max = None
+
+    def add(self, values):
+        """
+        Adds the values of the array `values` (one per row).
+        """
+        np = _numpy()
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        self.__combine(len(values), mean, m2,
+                       values.min(axis=0), values.max(axis=0))
+
+    def merge(self, other):
+        """
+        Adds the values summarized by `other` to this one.
+        """
+        if other.count > 0:
+            self.__combine(other.count, other.mean, other.m2,
+                           other.min, other.max)
+        return self
+
+    def __combine(self, count, mean, m2, low, high):
+        np = _numpy()
+        if self.__count == 0:
+            (self.__count, self.__mean, self.__m2) = (count, mean, m2)
+            (self.__min, self.__max) = (low, high)
+            return
+        total = self.__count + count
+        delta = mean - self.__mean
+        self.__mean = self.__mean + delta * (float(count) / total)
+        self.__m2 = (self.__m2 + m2 +
+                     delta ** 2 * (float(self.__count) * count / total))
+        self.__count = total
+        self.__min = np.minimum(self.__min, low)
+        self.__max = np.maximum(self.__max, high)
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def mean(self):
+        return self.__mean
+
+    @property
+    def m2(self):
+        """
+        Sum of the squared deviations from the mean.
+        """
+        return self.__m2
+
+    @property
+    def variance(self):
+        """
+        Variance (of the population) of the values.
+        """
+        if self.__count == 0:
+            return 0.0
+        return self.__m2 / self.__count
+
+    @property
+    def std(self):
+        np = _numpy()
+        return np.sqrt(self.variance)
+
+    @property
+    def min(self):
+        return self.__min
+
+    @property
+    def max(self):
+        return self.__max
+
+    def __repr__(self):
+        return "Moments(count={}, mean={}, std={})".format(
+            self.__count, self.__mean, self.std)
+
+class ValueHistogram(object):
+
+    def __init__(self):
+        """
+        Histogram of integer values, whose range grows as needed.
+        """
+        self.__counts = None
+        self.__low = 0
+
+    def add(self, values):
+        np = _numpy()
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        if values.dtype.kind not in "iub":
+            raise ValueError("Only integer values can be tabulated.")
+        values = values.astype(np.int64, copy=False)
+        self.__fit(int(values.min()), int(values.max()))
+        self.__counts += np.bincount(values - self.__low,
+                                     minlength=len(self.__counts))
+
+    def merge(self, other):
+        counts = other.counts
+        if len(counts) > 0:
+            self.__fit(other.low, other.low + len(counts) - 1)
+            start = other.low - self.__low
+            self.__counts[start:start + len(counts)] += counts
+        return self
+
+    def __fit(self, low, high):
+        np = _numpy()
+        if self.__counts is None:
+            self.__counts = np.zeros(high - low + 1, dtype=np.int64)
+            self.__low = low
+            return
+        size = len(self.__counts)
+        if self.__low <= low and high < self.__low + size:
+            return
+        # Grows at least twofold, so that the number of copies stays small.
+        new_low = min(low, self.__low - size) if low < self.__low else \
+                  self.__low
+        new_high = max(high, self.__low + 2 * size - 1) \
+                   if high >= self.__low + size else self.__low + size - 1
+        counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+        start = self.__low - new_low
+        counts[start:start + size] = self.__counts
+        (self.__counts, self.__low) = (counts, new_low)
+
+    @property
+    def low(self):
+        """
+        Smallest value tabulated (`counts[i]` is the number of `low + i`).
+        """
+        if self.__counts is None:
+            return 0
+        nonzero = _numpy().flatnonzero(self.__counts)
+        return self.__low + (int(nonzero[0]) if len(nonzero) > 0 else 0)
+
+    @property
+    def counts(self):
+        np = _numpy()
+        if self.__counts is None:
+            return np.zeros(0, dtype=np.int64)
+        nonzero = np.flatnonzero(self.__counts)
+        if len(nonzero) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.__counts[nonzero[0]:nonzero[-1] + 1]
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def __getitem__(self, value):
+        counts = self.counts
+        i = value - self.low
+        return int(counts[i]) if 0 <= i < len(counts) else 0
+
+    def to_dict(self):
+        np = _numpy()
+        counts = self.counts
+        values = np.flatnonzero(counts)
+        return dict(zip((values + self.low).tolist(), counts[values].tolist()))
+
+    def __repr__(self):
+        return "ValueHistogram(low={}, size={})".format(self.low,
+                                                        len(self.counts))
+
+# ==============================================================================
+# Statistics of walks
+#
+# Each statistic is a function of a `WalkBatch`, which returns one value (or
+# one row of values) per walk.
+
+def _reduce(ufunc, values, batch, initial):
+    # Reduces `values` (one per step, concatenated like the steps of `batch`)
+    # over each walk, with the value `initial` for the empty walks.
+    np = _numpy()
+    lengths = batch.lengths
+    result = np.full(len(batch), initial, dtype=values.dtype)
+    nonempty = lengths > 0
+    if len(values) > 0:
+        result[nonempty] = ufunc.reduceat(values, batch.offsets[:-1][nonempty])
+    return result
+
+def _statistic_exit_time(batch):
+    return _exits.exit_steps(batch)
+
+def _statistic_length(batch):
+    return batch.lengths
+
+def _statistic_end_x(batch):
+    return _batch_endpoints(batch)[0]
+
+def _statistic_end_y(batch):
+    return _batch_endpoints(batch)[1]
+
+def _statistic_max_x(batch):
+    # NOTE: The maximum includes the starting point (0, 0).
+    np = _numpy()
+    return np.maximum(_reduce(np.maximum, batch.positions()[0], batch, 0), 0)
+
+def _statistic_max_y(batch):
+    np = _numpy()
+    return np.maximum(_reduce(np.maximum, batch.positions()[1], batch, 0), 0)
+
+def _statistic_contacts(batch):
+    # Number of steps that end on one of the axes.
+    np = _numpy()
+    (x, y) = batch.positions()
+    return _reduce(np.add, ((x == 0) | (y == 0)).astype(np.int64), batch, 0)
+
+def _statistic_area(batch):
+    # Area under the path: the sum of the ordinates after each step.
+    np = _numpy()
+    return _reduce(np.add, batch.positions()[1].astype(np.int64), batch, 0)
+
+def _statistic_steps(batch):
+    # Number of occurrences of each step of the stepset, in each walk.
+    np = _numpy()
+    size = len(list(batch.stepset))
+    walks = np.repeat(np.arange(len(batch), dtype=np.int64), batch.lengths)
+    counts = np.bincount(walks * size + batch.steps,
+                         minlength=len(batch) * size)
+    return counts.reshape(len(batch), size)
+
+STATISTICS = {
+    'exit_time': _statistic_exit_time,
+    'length': _statistic_length,
+    'end_x': _statistic_end_x,
+    'end_y': _statistic_end_y,
+    'max_x': _statistic_max_x,
+    'max_y': _statistic_max_y,
+    'contacts': _statistic_contacts,
+    'area': _statistic_area,
+    'steps': _statistic_steps,
+}
+
+# The statistics that are tabulated by default (the other ones are only
+# summarized by their moments).
+_HISTOGRAMS = ('exit_time', 'end_x', 'end_y', 'max_x', 'max_y', 'contacts')
+
+class WalkStatistics(object):
+
+    def __init__(self, statistics=None, histograms=None, quarter_plane=False,
+                 chunk_steps=None):
+        """
+        Accumulates, batch after batch and in constant memory, the moments
+        (and, for the names in `histograms`, the histogram) of each of the
+        `statistics` of the walks: names of `STATISTICS` (by default, all of
+        them), or pairs `(name, function)` of a function of a `WalkBatch`
+        returning one value (or row of values) per walk. If `quarter_plane`
+        is set, only the walks that remain in the quarter plane are counted.
+        The batches are processed by chunks of about `chunk_steps` steps.
+        """
+        if statistics == None:
+            statistics = sorted(STATISTICS.keys())
+        self.__functions = []
+        for statistic in statistics:
+            if isinstance(statistic, tuple):
+                (name, function) = statistic
+            elif statistic in STATISTICS:
+                (name, function) = (statistic, STATISTICS[statistic])
+            else:
+                raise ValueError("Unknown statistic '{}'.".format(statistic))
+            self.__functions.append((name, function))
+        names = list(map(lambda p: p[0], self.__functions))
+        if histograms == None:
+            histograms = [ name for name in names if name in _HISTOGRAMS ]
+        for name in histograms:
+            if name not in names:
+                raise ValueError("Unknown statistic '{}'.".format(name))
+
+        self.__quarter_plane = quarter_plane
+        self.__chunk_steps = chunk_steps or _exits._CHUNK_STEPS
+        self.__moments = dict((name, Moments()) for name in names)
+        self.__histograms = dict((name, ValueHistogram())
+                                 for name in histograms)
+        self.__count = 0
+        self.__rejected = 0
+
+    # ==========================================================================
+    # Accumulation
+
+    def add(self, walks, stepset=None):
+        """
+        Adds the walks of `walks`: a `WalkBatch`, or a list of walks (as
+        returned by `reference.naive_random_generation`, for instance) of the
+        steps of `stepset`.
+        """
+        if not isinstance(walks, _WalkBatch):
+            if stepset == None:
+                raise ValueError("The stepset is required to add a list of "
+                                 "walks.")
+            walks = _WalkBatch.from_walks(walks, stepset)
+        for (a, b) in _exits._chunks(walks.lengths, self.__chunk_steps):
+            self.__add_chunk(walks[a:b])
+
+    def __add_chunk(self, batch):
+        if self.__quarter_plane:
+            inside = _exits.in_quarter_plane(batch)
+            self.__rejected += len(batch) - int(inside.sum())
+            if not inside.all():
+                batch = batch[inside]
+        for (name, function) in self.__functions:
+            values = function(batch)
+            self.__moments[name].add(values)
+            if name in self.__histograms:
+                self.__histograms[name].add(values)
+        self.__count += len(batch)
+        _instrumentation.count("walkstats.statistics", walks=len(batch))
+
+    def consume(self, batches, stepset=None):
+        """
+        Adds all the walks of the iterable `batches`: batches (such as
+        `WalkFileReader.iter_batches()`, or `generate(..., stream=True,
+        as_batch=True)` of a compiler), or lists of walks of `stepset`.
+        Returns `self`.
+        """
+        for batch in batches:
+            self.add(batch, stepset)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the statistics accumulated by `other` (with the same
+        configuration, for instance in another process) to these ones.
+        """
+        if (other.names != self.names or
+                other.quarter_plane != self.__quarter_plane):
+            raise ValueError("Cannot merge statistics of different "
+                             "configurations.")
+        for name in self.names:
+            self.__moments[name].merge(other.moments(name))
+            if name in self.__histograms:
+                self.__histograms[name].merge(other.histogram(name))
+        self.__count += other.count
+        self.__rejected += other.rejected
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    # ==========================================================================
+    # Access
+
+    @property
+    def names(self):
+        return list(map(lambda p: p[0], self.__functions))
+
+    @property
+    def quarter_plane(self):
+        return self.__quarter_plane
+
+    @property
+    def count(self):
+        """
+        Number of walks counted.
+        """
+        return self.__count
+
+    @property
+    def rejected(self):
+        """
+        Number of walks not counted because they exit the quarter plane.
+        """
+        return self.__rejected
+
+    def moments(self, name):
+        return self.__moments[name]
+
+    def histogram(self, name):
+        """
+        Returns the `ValueHistogram` of the statistic `name` (or `None` if it
+        is not tabulated).
+        """
+        return self.__histograms.get(name, None)
+
+    def summary(self):
+        """
+        Returns a `dict` mapping each statistic to its mean, standard
+        deviation, minimum and maximum.
+        """
+        summary = {}
+        for name in self.names:
+            moments = self.__moments[name]
+            summary[name] = {
+                'mean': moments.mean, 'std': moments.std,
+                'min': moments.min, 'max': moments.max,
+            }
+        return summary
+
+    def __getstate__(self):
+        # NOTE: Only the functions of `STATISTICS` are pickled (the others may
+        # be lambdas); `merge()` only needs the results.
+        state = self.__dict__.copy()
+        key = "_WalkStatistics__functions"
+        builtins = list(STATISTICS.values())
+        state[key] = list(map(lambda p: (p[0], p[1] if p[1] in builtins
+                                         else None), state[key]))
+        return state
+
+    def __repr__(self):
+        return "WalkStatistics({}, count={})".format(", ".join(self.names),
+                                                     self.__count)
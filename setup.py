@@ -19,6 +19,11 @@ setup(
 	url = "https://github.com/jlumbroso/reluctant-walks",
 	keywords = ['combinatorics', 'random walks', 'sampling'],
 	license = 'LGPLv3',
+	entry_points = {
+		'console_scripts': [
+			'reluctant-walks = reluctant_walks.cli:main',
+		],
+	},
 	classifiers = [
 		'Programming Language :: Python :: 2',
 		'Programming Language :: Python :: 2.7',